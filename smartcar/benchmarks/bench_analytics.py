@@ -0,0 +1,232 @@
+"""
+分析流程基准：用合成的逐帧检测流（可配置同时在场车辆数、车辆密度与轨迹长度）驱动 ProcessingOperations 的分析路径，
+不需要 YOLO、Tk 或视频。分别测量重叠框过滤、compute_iou、calculate_speed、过线计数、轨迹角度检查与碰撞检测的单帧耗时，
+按车辆数给出扩展曲线；可保存为基线 JSON，之后与基线比较以发现性能回退。
+在 smartcar 目录下运行：
+    python -m benchmarks.bench_analytics --save-baseline benchmarks/baseline_analytics.json
+    python -m benchmarks.bench_analytics --compare benchmarks/baseline_analytics.json
+"""
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import numpy as np
+
+from show_relative.constants import VEHICLE_TYPE_DISTANCE
+from show_relative.detection_batch import DetectionBatch
+from show_relative.headless_operations import HeadlessApp
+
+# 被测路径：名称 -> 说明
+PATHS = {
+    'filter': "重叠框过滤 filter_overlapping_boxes",
+    'compute_iou': "候选框对逐对 compute_iou",
+    'speed': "逐车 calculate_speed",
+    'flow': "过线计数与碰撞检测（analyze_detections，不测速、不判异常）",
+    'flow_speed': "+ 测速与超速判断",
+    'full': "+ 轨迹角度与异常输出（完整 analyze_detections）",
+    'frame': "完整 process_frame（不绘制）",
+}
+
+
+def synthetic_stream(rng, vehicles, frames, density=1.0, lifetime=150, width=1920, height=1080):
+    """
+    生成逐帧的 DetectionBatch：车辆沿车道自上而下行驶，驶出画面或达到寿命后以新 ID 重新进入；
+    少数车辆会突然横向变道，以触发轨迹角度检查。
+    :param vehicles: 画面中同时存在的车辆数
+    :param density: 车辆尺寸放大系数，越大车辆之间重叠越多
+    :param lifetime: 轨迹的平均长度（帧）
+    """
+    names = dict(enumerate(VEHICLE_TYPE_DISTANCE))
+    lanes = max(4, vehicles // 10)
+    lane_width = width / lanes
+    next_id = 0
+
+    def spawn(count, anywhere):
+        nonlocal next_id
+        ids = np.arange(next_id, next_id + count)
+        next_id += count
+        lane = rng.integers(0, lanes, count)
+        w = rng.uniform(0.45, 0.8, count) * lane_width * density
+        h = w * rng.uniform(0.6, 1.2, count)
+        x = (lane + 0.5) * lane_width - w / 2 + rng.normal(0, 0.05 * lane_width, count)
+        y = rng.uniform(-h, height, count) if anywhere else -h + rng.uniform(0, 20, count)
+        return {
+            'id': ids, 'cls': rng.integers(0, len(names), count), 'x': x, 'y': y, 'w': w, 'h': h,
+            'vx': np.zeros(count), 'vy': rng.uniform(4, 12, count),
+            'life': rng.exponential(lifetime, count).astype(int) + 5, 'age': np.zeros(count, dtype=int),
+        }
+
+    state = spawn(vehicles, anywhere=True)
+    for _ in range(frames):
+        swerve = rng.random(vehicles) < 0.01
+        state['vx'][swerve] = rng.choice([-1, 1], swerve.sum()) * state['vy'][swerve] * 1.5
+        state['vx'][~swerve] *= 0.8
+        state['x'] += state['vx']
+        state['y'] += state['vy']
+        state['age'] += 1
+        expired = (state['age'] > state['life']) | (state['y'] > height)
+        if expired.any():
+            fresh = spawn(int(expired.sum()), anywhere=False)
+            for key in state:
+                state[key][expired] = fresh[key]
+        boxes = np.stack([state['x'], state['y'], state['x'] + state['w'], state['y'] + state['h']], axis=1)
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width - 1)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height - 1)
+        visible = (boxes[:, 2] - boxes[:, 0] > 2) & (boxes[:, 3] - boxes[:, 1] > 2)
+        yield DetectionBatch(state['id'][visible], state['cls'][visible], boxes[visible],
+                             rng.uniform(0.3, 0.99, int(visible.sum())), names)
+
+
+def new_app(speed, exception, height=1080):
+    app = HeadlessApp()
+    app.is_speed_processing = speed
+    app.is_exception_processing = exception
+    app.y_max = height
+    app.line_y = height // 2
+    return app
+
+
+def run_path(path, batches):
+    """在一个全新的应用状态上逐帧运行被测路径，返回每帧耗时（毫秒）。"""
+    app = new_app(speed=path not in ('flow',), exception=path in ('full', 'frame'))
+    ops = app.processing_ops
+    costs = np.empty(len(batches))
+    for frame_num, batch in enumerate(batches):
+        if path == 'compute_iou':
+            detections = batch.to_dicts()
+            pair_i, pair_j, _ = batch.overlap_pairs()
+            pairs = [(detections[i], detections[j]) for i, j in zip(pair_i.tolist(), pair_j.tolist())]
+        elif path in ('speed', 'flow', 'flow_speed', 'full'):
+            detections = batch.to_dicts()
+        start = time.perf_counter()
+        if path == 'filter':
+            ops.filter_overlapping_boxes(batch)
+        elif path == 'compute_iou':
+            for det1, det2 in pairs:
+                ops.compute_iou(det1, det2)
+        elif path == 'speed':
+            app.current_frame_num = frame_num
+            app.current_timestamp = frame_num / app.fps
+            for det in detections:
+                ops.calculate_speed(det['id'], (det['x1'] + det['x2']) / 2, (det['y1'] + det['y2']) / 2,
+                                    0, 0, det['y2'] - det['y1'], det['class_name'])
+        elif path == 'frame':
+            ops.process_frame(None, frame_num, render=False, detections=batch)
+        else:
+            app.current_frame_num = frame_num
+            app.current_timestamp = frame_num / app.fps
+            ops.analyze_detections(detections, frame_num, overlap_pairs=batch.overlap_pairs(), boxes=batch.boxes)
+        costs[frame_num] = (time.perf_counter() - start) * 1000
+        # 每帧的 overlap_pairs 结果会缓存在 DetectionBatch 上，清掉以免后续路径直接复用
+        batch._iou = batch._pairs = None
+    return costs
+
+
+def run_suite(counts, frames, density, lifetime, paths, seed, warmup, repeats):
+    results = []
+    for count in counts:
+        rng = np.random.default_rng(seed)
+        batches = list(synthetic_stream(rng, count, warmup + frames, density, lifetime))
+        pairs = np.mean([len(b.overlap_pairs()[0]) for b in batches[warmup:]])
+        for b in batches:
+            b._iou = b._pairs = None
+        row = {'vehicles': count, 'overlap_pairs': float(pairs), 'paths': {}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in paths:
+                # 重复运行取单帧耗时中位数最小的一次，减小机器负载波动的影响
+                costs = min((run_path(path, batches)[warmup:] for _ in range(repeats)), key=np.median)
+                row['paths'][path] = {'median_ms': float(np.median(costs)), 'mean_ms': float(costs.mean()),
+                                      'p95_ms': float(np.percentile(costs, 95))}
+        results.append(row)
+    return results
+
+
+def print_results(results, paths):
+    print(f"{'车辆数':>6} {'相交对':>7} " + " ".join(f"{path:>11}" for path in paths) + "   (ms/帧，中位数)")
+    for row in results:
+        print(f"{row['vehicles']:>6} {row['overlap_pairs']:>7.1f} " +
+              " ".join(f"{row['paths'][path]['median_ms']:>11.3f}" for path in paths))
+    print(f"\n{'车辆数':>6} {'':>7} " + " ".join(f"{path:>11}" for path in paths) + "   (ms/帧，p95)")
+    for row in results:
+        print(f"{row['vehicles']:>6} {'':>7} " +
+              " ".join(f"{row['paths'][path]['p95_ms']:>11.3f}" for path in paths))
+    # 扩展曲线：每辆车的平均耗时，随车辆数明显上升说明该路径的复杂度高于线性
+    print(f"\n{'车辆数':>6} {'':>7} " + " ".join(f"{path:>11}" for path in paths) + "   (us/车)")
+    for row in results:
+        print(f"{row['vehicles']:>6} {'':>7} " +
+              " ".join(f"{row['paths'][path]['median_ms'] * 1000 / row['vehicles']:>11.2f}" for path in paths))
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """与基线逐项比较单帧耗时中位数，超过 tolerance 倍且绝对差值超过 min_delta_ms 的记为回退。"""
+    reference = {row['vehicles']: row['paths'] for row in baseline['results']}
+    regressions = []
+    print(f"\n与基线比较（{baseline['machine']}，{baseline['time']}）：当前 / 基线")
+    for row in results:
+        base = reference.get(row['vehicles'])
+        if base is None:
+            continue
+        cells = []
+        for path, cost in row['paths'].items():
+            if path not in base or base[path]['median_ms'] <= 0:
+                cells.append(f"{'-':>11}")
+                continue
+            ratio = cost['median_ms'] / base[path]['median_ms']
+            # 耗时只有几十微秒的路径受计时抖动影响很大，差值过小时不判为回退
+            regressed = ratio > tolerance and cost['median_ms'] - base[path]['median_ms'] > min_delta_ms
+            cells.append(f"{ratio:>10.2f}{'!' if regressed else ' '}")
+            if regressed:
+                regressions.append((row['vehicles'], path, ratio))
+        print(f"{row['vehicles']:>6} {'':>7} " + " ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析流程基准（合成检测流）")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 25, 50, 100, 200, 400],
+                        help="画面中同时存在的车辆数")
+    parser.add_argument("--frames", type=int, default=300, help="每种配置计时的帧数")
+    parser.add_argument("--warmup", type=int, default=30, help="不计时的预热帧数")
+    parser.add_argument("--repeats", type=int, default=3, help="每种配置重复运行的次数，取最快的一次")
+    parser.add_argument("--density", type=float, default=1.0, help="车辆尺寸放大系数，越大重叠越多")
+    parser.add_argument("--lifetime", type=int, default=150, help="轨迹的平均长度（帧）")
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH", help="把本次结果保存为基线 JSON")
+    parser.add_argument("--compare", metavar="PATH", help="与基线 JSON 比较")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="当前耗时超过基线多少倍视为回退（默认 1.5）")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="判为回退所需的最小绝对差值（ms/帧，默认 0.05）")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        print(f"{path:>11}: {PATHS[path]}")
+    print()
+    results = run_suite(args.counts, args.frames, args.density, args.lifetime, args.paths, args.seed, args.warmup,
+                        max(1, args.repeats))
+    print_results(results, args.paths)
+
+    config = {'frames': args.frames, 'warmup': args.warmup, 'density': args.density, 'lifetime': args.lifetime,
+              'seed': args.seed}
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+                       'machine': f"{platform.node()} / {platform.processor() or platform.machine()} / "
+                                  f"Python {platform.python_version()}",
+                       'config': config, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存: {args.save_baseline}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print(f"注意：基线的配置 {baseline['config']} 与本次 {config} 不同，结果不可直接比较。")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            sys.exit("性能回退: " + "，".join(f"{path} @ {count} 辆 {ratio:.2f}x" for count, path, ratio in regressions))
+        print("未发现性能回退。")
+
+
+if __name__ == "__main__":
+    main()
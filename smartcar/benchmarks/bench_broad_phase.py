@@ -0,0 +1,55 @@
+"""
+碰撞检测粗筛基准：比较全量 IoU 矩阵与均匀网格粗筛在不同车辆数下的耗时。
+在 smartcar 目录下运行：python -m benchmarks.bench_broad_phase
+"""
+import argparse
+import time
+import numpy as np
+
+from show_relative.detection_batch import pairwise_iou
+from show_relative.spatial_grid import overlapping_pairs
+
+
+def synthetic_boxes(rng, count, width=1920, height=1080):
+    """模拟宽视角高速公路画面：车辆沿车道分布，尺寸随远近变化。"""
+    y_top = rng.uniform(0.3 * height, height - 40, count)
+    scale = 0.4 + 0.6 * (y_top / height)
+    w = rng.uniform(60, 160, count) * scale
+    h = rng.uniform(40, 110, count) * scale
+    x1 = rng.uniform(0, width - w)
+    return np.stack([x1, y_top, x1 + w, y_top + h], axis=1).astype(np.int32)
+
+
+def all_pairs(boxes):
+    iou = pairwise_iou(boxes)
+    i, j = np.nonzero(np.triu(iou > 0, k=1))
+    return i, j, iou[i, j]
+
+
+def time_call(func, boxes, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func(boxes)
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="碰撞检测粗筛基准")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 25, 50, 100, 200, 400, 800])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'车辆数':>6} {'全量对数':>10} {'相交对数':>8} {'全量 ms':>9} {'网格 ms':>9} {'加速比':>7}")
+    for count in args.counts:
+        boxes = synthetic_boxes(rng, count)
+        dense_ms, dense = time_call(all_pairs, boxes, args.repeats)
+        grid_ms, grid = time_call(overlapping_pairs, boxes, args.repeats)
+        assert np.array_equal(dense[0], grid[0]) and np.array_equal(dense[1], grid[1]), "粗筛结果与全量计算不一致"
+        print(f"{count:>6} {count * (count - 1) // 2:>10} {len(grid[0]):>8} {dense_ms:>9.3f} {grid_ms:>9.3f} "
+              f"{dense_ms / grid_ms if grid_ms > 0 else 0:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+启动导入耗时报告：在全新的解释器中以 -X importtime 导入 GUI 入口模块，按顶层包汇总导入耗时，
+并单独测量被推迟到首次使用时才导入的重型依赖（torch、ultralytics、matplotlib、pandas 等）的冷启动导入耗时。
+在 smartcar 目录下运行：python -m benchmarks.bench_import_time
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+SMARTCAR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ["torch", "ultralytics", "matplotlib.pyplot", "matplotlib.backends.backend_tkagg",
+                    "pandas", "urllib3", "pyarrow"]
+
+
+def import_profile(module):
+    """
+    在子进程中导入 module（为 None 时只启动解释器）并解析 -X importtime 输出。
+    :return: [(自身耗时 us, 累计耗时 us, 嵌套深度, 模块名), ...]，模块无法导入时返回 None
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+                            cwd=SMARTCAR_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def summarize(entries, top):
+    by_package = {}
+    for self_us, _, _, name in entries:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    total = sum(by_package.values())
+    print(f"{'顶层包':<28} {'耗时 ms':>9} {'占比':>6}")
+    for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{package:<28} {us / 1000:>9.1f} {us / total:>6.1%}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时报告")
+    parser.add_argument("--module", default="show", help="要测量的入口模块（默认: show）")
+    parser.add_argument("--top", type=int, default=15, help="列出耗时最多的前 N 个顶层包")
+    parser.add_argument("--deferred", nargs="*", default=DEFERRED_MODULES, help="单独测量的延迟导入模块")
+    args = parser.parse_args()
+
+    entries = import_profile(args.module)
+    if entries is None:
+        sys.exit(f"无法导入 {args.module}")
+    total = summarize(entries, args.top)
+    print(f"\n导入 {args.module} 共 {total / 1000:.1f} ms")
+
+    # 这些模块已改为首次使用时导入；若出现在上面的列表中，说明有模块又在顶层导入了它们
+    eager = sorted({name for _, _, _, name in entries if name in args.deferred})
+    if eager:
+        print(f"警告：以下模块仍在启动时被导入: {', '.join(eager)}")
+
+    # 解释器启动本身（site、encodings 等）的导入耗时作为基线扣除
+    baseline = sum(cumulative_us for _, cumulative_us, depth, _ in import_profile(None) if depth == 0)
+    print(f"\n{'延迟导入的模块':<36} {'冷启动导入 ms':>14}")
+    for module in args.deferred:
+        profile = import_profile(module)
+        if profile is None:
+            print(f"{module:<36} {'未安装':>14}")
+        else:
+            cumulative = sum(cumulative_us for _, cumulative_us, depth, _ in profile if depth == 0) - baseline
+            print(f"{module:<36} {cumulative / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+推理后端一致性检查：在同一组视频帧上分别用 PyTorch 权重和所选后端推理，按类别与 IoU 匹配检测框，
+报告召回率、精确率、匹配框的平均 IoU 与置信度差，以及两者的单帧推理耗时。召回率低于 --min-recall 时以非零状态退出。
+在 smartcar 目录下运行：python -m benchmarks.check_backend_parity path/to/video.mp4 --backend onnx [--int8]
+"""
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+from show_relative.detection_batch import pairwise_iou
+from show_relative.inference_backend import load_vehicle_model
+
+
+def sample_frames(video_path, count, stride):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    frame_num = 0
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_num % stride == 0:
+            frames.append(frame)
+        frame_num += 1
+    cap.release()
+    return frames
+
+
+def run_model(model, frames, conf, iou, imgsz):
+    outputs = []
+    start = time.perf_counter()
+    for frame in frames:
+        result = model.predict(frame, conf=conf, iou=iou, imgsz=imgsz, verbose=False)[0]
+        outputs.append((result.boxes.xyxy.cpu().numpy(), result.boxes.cls.cpu().numpy().astype(int),
+                        result.boxes.conf.cpu().numpy()))
+    return outputs, (time.perf_counter() - start) / max(1, len(frames)) * 1000
+
+
+def match_boxes(reference, candidate, match_iou):
+    """同类别框按 IoU 从高到低贪心一对一匹配，返回匹配对的 (IoU, 置信度差) 列表。"""
+    ref_boxes, ref_cls, ref_conf = reference
+    cand_boxes, cand_cls, cand_conf = candidate
+    if len(ref_boxes) == 0 or len(cand_boxes) == 0:
+        return []
+    iou = pairwise_iou(ref_boxes, cand_boxes)
+    iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+    matches = []
+    used_ref, used_cand = set(), set()
+    for flat in np.argsort(iou, axis=None)[::-1]:
+        i, j = np.unravel_index(flat, iou.shape)
+        if iou[i, j] < match_iou:
+            break
+        if i in used_ref or j in used_cand:
+            continue
+        used_ref.add(i)
+        used_cand.add(j)
+        matches.append((float(iou[i, j]), abs(float(ref_conf[i]) - float(cand_conf[j]))))
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理后端与 PyTorch 的检测结果一致性检查")
+    parser.add_argument("video", help="用于抽帧的视频文件")
+    parser.add_argument("--weights", default="model_data/best.pt")
+    parser.add_argument("--backend", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--frames", type=int, default=50, help="抽取的帧数")
+    parser.add_argument("--stride", type=int, default=10, help="每隔多少帧抽取一帧")
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--iou", type=float, default=0.5, help="NMS 的 IoU 阈值")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--match-iou", type=float, default=0.5, help="两个后端的框视为同一目标的最小 IoU")
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    args = parser.parse_args()
+
+    frames = sample_frames(args.video, args.frames, args.stride)
+    if not frames:
+        sys.exit(f"无法从 {args.video} 读取帧")
+
+    reference_model = load_vehicle_model(args.weights, 'pt', device='cpu')
+    candidate_model = load_vehicle_model(args.weights, args.backend, args.int8, imgsz=args.imgsz)
+    # 预热，避免首帧的初始化开销计入耗时
+    run_model(reference_model, frames[:1], args.conf, args.iou, args.imgsz)
+    run_model(candidate_model, frames[:1], args.conf, args.iou, args.imgsz)
+    reference, reference_ms = run_model(reference_model, frames, args.conf, args.iou, args.imgsz)
+    candidate, candidate_ms = run_model(candidate_model, frames, args.conf, args.iou, args.imgsz)
+
+    matches = []
+    reference_total = sum(len(boxes) for boxes, _, _ in reference)
+    candidate_total = sum(len(boxes) for boxes, _, _ in candidate)
+    for ref, cand in zip(reference, candidate):
+        matches.extend(match_boxes(ref, cand, args.match_iou))
+    recall = len(matches) / reference_total if reference_total else 1.0
+    precision = len(matches) / candidate_total if candidate_total else 1.0
+    mean_iou = float(np.mean([m[0] for m in matches])) if matches else 0.0
+    mean_conf_diff = float(np.mean([m[1] for m in matches])) if matches else 0.0
+
+    name = f"{args.backend}{' int8' if args.int8 else ''}"
+    print(f"抽取帧数: {len(frames)}，PyTorch 检测框: {reference_total}，{name} 检测框: {candidate_total}")
+    print(f"召回率: {recall:.3f}，精确率: {precision:.3f}，匹配框平均 IoU: {mean_iou:.3f}，"
+          f"平均置信度差: {mean_conf_diff:.3f}")
+    print(f"单帧推理耗时: PyTorch {reference_ms:.1f} ms，{name} {candidate_ms:.1f} ms "
+          f"（{reference_ms / candidate_ms if candidate_ms > 0 else 0:.2f}x）")
+    if recall < args.min_recall:
+        sys.exit(f"召回率 {recall:.3f} 低于要求的 {args.min_recall}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import warnings
+
+from show_relative.headless_operations import HeadlessApp, HeadlessOperations
+from show_relative.multiprocess_pipeline import MultiprocessOperations
+from show_relative.source_config import parse_polygon
+
+warnings.filterwarnings("ignore", category=UserWarning, module="torch")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="智慧道路车辆跟踪监测系统 - 无界面批处理")
+    parser.add_argument("source", help="待处理的视频文件路径")
+    parser.add_argument("--output", default="output", help="结果输出目录（默认: output）")
+    parser.add_argument("--weights", default="model_data/best.pt", help="YOLO 模型权重路径")
+    parser.add_argument("--device", default=None, help="推理设备，例如 cpu 或 cuda（默认自动选择，仅对 pt 后端生效）")
+    parser.add_argument("--backend", choices=["pt", "onnx", "openvino"], default="pt",
+                        help="推理后端：PyTorch、ONNX Runtime 或 OpenVINO（首次使用时导出并缓存在权重文件旁）")
+    parser.add_argument("--int8", action="store_true", help="使用 INT8 量化模型（仅 onnx / openvino 后端）")
+    parser.add_argument("--save-video", action="store_true", help="同时输出绘制了检测结果的视频")
+    parser.add_argument("--max-frames", type=int, default=None, help="最多处理的帧数")
+    parser.add_argument("--no-speed", action="store_true", help="关闭速度检测")
+    parser.add_argument("--no-exception", action="store_true", help="关闭异常检测")
+    parser.add_argument("--lanes", type=int, default=4, help="车道数 (1-10)")
+    parser.add_argument("--speed-threshold", type=float, default=60.0, help="速度阈值 (km/h)")
+    parser.add_argument("--angle-threshold", type=float, default=30.0, help="轨迹角度阈值 (度)")
+    parser.add_argument("--conf", type=float, default=0.3, help="置信度阈值 (0.0-1.0)")
+    parser.add_argument("--iou", type=float, default=0.1, help="IoU阈值 (0.0-1.0)")
+    parser.add_argument("--batch-size", type=int, default=1, help="一次送入模型推理的帧数（默认: 1）")
+    parser.add_argument("--track-ttl", type=int, default=150, help="跟踪目标连续多少帧未出现后淘汰其状态（默认: 150）")
+    parser.add_argument("--target-latency", type=float, default=0.0,
+                        help="目标单帧延迟 (ms)，大于 0 时启用自适应检测步长，跳过的帧由运动模型外推（默认: 0，关闭）")
+    parser.add_argument("--motion-gate", type=float, default=0.0,
+                        help="运动门阈值：缩小后的画面中变化像素比例低于该值时沿用上一次检测结果，重复帧直接跳过"
+                             "（例如 0.002；默认: 0，关闭）")
+    parser.add_argument("--roi", action="append", type=parse_polygon, default=None, metavar="\"X,Y X,Y ...\"",
+                        help="ROI 多边形顶点（可多次指定），只在多边形内检测车辆；未指定时读取 --source-config 中的配置")
+    parser.add_argument("--source-config", default="source_config.json", help="按视频源保存的配置文件（默认: source_config.json）")
+    parser.add_argument("--log-format", choices=["parquet", "arrow", "npz"], default="parquet",
+                        help="逐帧跟踪日志的文件格式（默认: parquet，未安装 pyarrow 时自动改用 npz）")
+    parser.add_argument("--multiprocess", action="store_true",
+                        help="解码、推理与分析分别在独立进程中运行，帧经共享内存传递（不支持 --target-latency 与 --motion-gate）")
+    parser.add_argument("--detection-cache", default="detection_cache", metavar="DIR",
+                        help="检测缓存目录：按视频、模型与阈值保存逐帧检测结果，再次分析同一视频时不加载模型、不解码，"
+                             "直接回放（默认: detection_cache）")
+    parser.add_argument("--no-detection-cache", action="store_true", help="不读取也不写入检测缓存")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = HeadlessApp(weights=args.weights, device=args.device, backend=args.backend, int8=args.int8)
+    app.is_speed_processing = not args.no_speed
+    app.is_exception_processing = not args.no_exception
+    app.number_of_lanes = args.lanes
+    app.speed_threshold = args.speed_threshold
+    app.angle_threshold = args.angle_threshold
+    app.conf_threshold = args.conf
+    app.iou_threshold = args.iou
+    app.inference_batch_size = max(1, args.batch_size)
+    app.track_ttl_frames = max(1, args.track_ttl)
+    app.track_log_format = args.log_format
+    app.target_latency_ms = max(0.0, args.target_latency)
+    app.roi_polygons = args.roi
+    app.motion_gate_ratio = max(0.0, args.motion_gate)
+    app.source_config_path = args.source_config
+    if args.multiprocess:
+        # 模型只在推理进程中加载；多进程模式不使用检测缓存
+        MultiprocessOperations(app).run(args.source, args.output, save_video=args.save_video,
+                                        max_frames=args.max_frames)
+        return
+    # 模型在确认没有可回放的检测缓存后才加载
+    app.detection_cache_root = None if args.no_detection_cache else args.detection_cache
+
+    HeadlessOperations(app).run(args.source, args.output, save_video=args.save_video, max_frames=args.max_frames)
+
+
+if __name__ == "__main__":
+    main()
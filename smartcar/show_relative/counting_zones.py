@@ -0,0 +1,167 @@
+import cv2
+import numpy as np
+
+# 过线方向：沿计数线从起点看向终点，从左侧穿到右侧为 forward，反之为 backward。
+# 图像坐标 y 轴向下，因此从左到右画的水平线上，自上而下驶过为 forward
+DIRECTIONS = ('forward', 'backward')
+DIRECTION_FILTERS = {'both': (True, True), 'forward': (True, False), 'backward': (False, True)}
+MAX_LINES = 63
+
+
+def scale_points(points, frame_shape):
+    """坐标均不大于 1 时按画面宽高的比例解释（与 ROI 配置相同）。"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if frame_shape is not None and (points <= 1.0).all():
+        points = points * [frame_shape[1], frame_shape[0]]
+    return points
+
+
+class CountingZones:
+    """
+    计数线与车道区域。每帧把所有车辆中心点上一帧到本帧的位移与所有计数线一次性做线段相交测试
+    （一次矩阵乘法得到全部点对全部线的方位，只对少数跨线的候选再做精确判断）；
+    车道多边形预先栅格化为与画面同尺寸的标签图，过线车辆所在车道只需一次数组索引，每帧开销与车道数无关。
+    计数按 (计数线, 车道, 方向) 累计，同一车辆对同一条线只计一次；不在任何车道内的车辆记入“未分车道”。
+    """
+    def __init__(self, lines, lanes=None, frame_shape=None):
+        """
+        :param lines: 计数线列表，每项为 {'name', 'points': [[x1, y1], [x2, y2]], 'direction': both|forward|backward}
+        :param lanes: 车道列表，每项为 {'name', 'polygon': [[x, y], ...]}，需要给出 frame_shape
+        :param frame_shape: 帧的 (高, 宽[, 通道])
+        """
+        if not lines:
+            raise ValueError("至少需要一条计数线")
+        if len(lines) > MAX_LINES:
+            raise ValueError(f"计数线最多 {MAX_LINES} 条")
+        self.line_names = []
+        starts, ends, filters = [], [], []
+        for index, line in enumerate(lines):
+            points = scale_points(line['points'], frame_shape)
+            if len(points) != 2 or np.allclose(points[0], points[1]):
+                raise ValueError(f"计数线 {line.get('name', index + 1)} 需要两个不同的端点")
+            direction = line.get('direction', 'both')
+            if direction not in DIRECTION_FILTERS:
+                raise ValueError(f"计数线方向只能是 {'/'.join(DIRECTION_FILTERS)}: {direction}")
+            self.line_names.append(str(line.get('name', f"计数线{index + 1}")))
+            starts.append(points[0])
+            ends.append(points[1])
+            filters.append(DIRECTION_FILTERS[direction])
+        self.starts = np.array(starts)
+        self.vectors = np.array(ends) - self.starts
+        # 点 p 在计数线哪一侧即 cross(v, p - a) = p · (-v_y, v_x) - a · (-v_y, v_x)，全部点对全部线是一次矩阵乘法
+        self.normals = np.stack([-self.vectors[:, 1], self.vectors[:, 0]])
+        self.offsets = (self.starts * self.normals.T).sum(axis=1)
+        self.filters = np.array(filters, dtype=bool)
+        self.bits = np.left_shift(1, np.arange(len(lines), dtype=np.int64))
+
+        self.lane_names = []
+        self.lane_points = []
+        self.label_map = None
+        if lanes:
+            if frame_shape is None:
+                raise ValueError("车道区域需要画面尺寸")
+            if len(lanes) > 255:
+                raise ValueError("车道最多 255 条")
+            height, width = frame_shape[:2]
+            self.label_map = np.zeros((height, width), dtype=np.uint8)
+            for index, lane in enumerate(lanes):
+                points = scale_points(lane['polygon'], frame_shape)
+                if len(points) < 3:
+                    raise ValueError(f"车道 {lane.get('name', index + 1)} 至少需要 3 个顶点")
+                points = np.clip(np.rint(points), 0, [width - 1, height - 1]).astype(np.int32)
+                cv2.fillPoly(self.label_map, [points], index + 1)
+                self.lane_names.append(str(lane.get('name', f"车道{index + 1}")))
+                self.lane_points.append(points)
+        self.counts = np.zeros((len(lines), len(self.lane_names) + 1, len(DIRECTIONS)), dtype=np.int64)
+        self.default = False
+
+    @classmethod
+    def horizontal(cls, line_y):
+        """未配置计数区域时的默认计数线：y = line_y 的整条水平线，只统计自上而下驶过的车辆。"""
+        zones = cls([{'name': "默认计数线", 'points': [[-1e6, line_y], [1e6, line_y]], 'direction': 'forward'}])
+        zones.default = True
+        zones.line_y = line_y
+        return zones
+
+    @classmethod
+    def from_config(cls, config, frame_shape):
+        """
+        由视频源配置中的 counting 项创建，例如
+        {"lines": [{"name": "北向", "points": [[0, 400], [1280, 400]], "direction": "both"}],
+         "lanes": [{"name": "车道1", "polygon": [[0, 300], [320, 300], [320, 720], [0, 720]]}]}
+        只配置车道时使用画面中线作为计数线。
+        """
+        lines = config.get('lines') or [{'name': "中线", 'points': [[0, 0.5], [1, 0.5]], 'direction': 'both'}]
+        return cls(lines, config.get('lanes'), frame_shape)
+
+    @property
+    def lane_count(self):
+        return len(self.lane_names)
+
+    def lanes_at(self, x, y):
+        """各点所在的车道序号（1 起），不在任何车道内为 0。"""
+        if self.label_map is None:
+            return np.zeros(len(x), dtype=np.intp)
+        height, width = self.label_map.shape
+        xs = np.clip(x.astype(np.intp), 0, width - 1)
+        ys = np.clip(y.astype(np.intp), 0, height - 1)
+        return self.label_map[ys, xs].astype(np.intp)
+
+    def update(self, previous, current, counted):
+        """
+        统计本帧的过线。
+        :param previous: (N, 2) 各车辆上一帧的中心点，首次出现的车辆为 NaN
+        :param current: (N, 2) 各车辆本帧的中心点
+        :param counted: (N,) 各车辆已计过数的计数线位掩码
+        :return: (本帧首次过线的车辆数, 更新后的位掩码)。一辆车不论越过几条计数线只计入一次，供车流量使用；
+                 各计数线的次数分别累计在 counts 中
+        """
+        if len(current) == 0:
+            return 0, counted
+        # 先用符号判断位移的两端是否分居计数线（所在直线）两侧，只对这些少数候选再检查交点是否落在计数线段内
+        with np.errstate(invalid='ignore'):
+            side_prev = previous @ self.normals - self.offsets
+            side_curr = current @ self.normals - self.offsets
+            vehicles, lines = np.nonzero((side_prev < 0) != (side_curr < 0))
+        if len(vehicles) == 0:
+            return 0, counted
+        backward = side_prev[vehicles, lines] >= 0
+        start = self.starts[lines] - previous[vehicles]
+        end = start + self.vectors[lines]
+        motion = current[vehicles] - previous[vehicles]
+        start_side = motion[:, 0] * start[:, 1] - motion[:, 1] * start[:, 0]
+        end_side = motion[:, 0] * end[:, 1] - motion[:, 1] * end[:, 0]
+        keep = ((start_side >= 0) != (end_side >= 0)) & ((counted[vehicles] & self.bits[lines]) == 0) & \
+            self.filters[lines, backward.astype(np.intp)]
+        if not keep.any():
+            return 0, counted
+        vehicles, lines, backward = vehicles[keep], lines[keep], backward[keep]
+        lanes = self.lanes_at(current[vehicles, 0], current[vehicles, 1])
+        np.add.at(self.counts, (lines, lanes, backward.astype(np.intp)), 1)
+        first = np.unique(vehicles[counted[vehicles] == 0])
+        counted = counted.copy()
+        np.bitwise_or.at(counted, vehicles, self.bits[lines])
+        return len(first), counted
+
+    def reset(self):
+        self.counts[:] = 0
+
+    def summary(self):
+        """{计数线: {车道: {方向: 次数}}}，省略没有车辆的“未分车道”。"""
+        lanes = ["未分车道"] + self.lane_names
+        result = {}
+        for i, line in enumerate(self.line_names):
+            result[line] = {lane: dict(zip(DIRECTIONS, self.counts[i, j].tolist())) for j, lane in enumerate(lanes)
+                            if j > 0 or self.counts[i, j].any() or not self.lane_names}
+        return result
+
+    def draw(self, frame):
+        for points in self.lane_points:
+            cv2.polylines(frame, [points], True, (255, 255, 0), 1, cv2.LINE_AA)
+        for i in range(len(self.line_names)):
+            start = tuple(int(v) for v in self.starts[i])
+            end = tuple(int(v) for v in self.starts[i] + self.vectors[i])
+            cv2.line(frame, start, end, (0, 165, 255), 2, cv2.LINE_AA)
+            forward, backward = self.counts[i].sum(axis=0).tolist()
+            cv2.putText(frame, f"L{i + 1}: {forward} / {backward}", start, cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                        (0, 165, 255), 2, cv2.LINE_AA)
@@ -0,0 +1,121 @@
+import numpy as np
+from .spatial_grid import overlapping_pairs
+
+# 框数少于该值时全量 IoU 矩阵比网格粗筛更快（见 benchmarks/bench_broad_phase.py）
+BROAD_PHASE_MIN_BOXES = 80
+
+
+def pairwise_iou(boxes_a, boxes_b=None):
+    """
+    一次性计算两组检测框两两之间的 IoU 矩阵，与 ProcessingOperations.compute_iou 的像素 +1 约定一致。
+    :param boxes_a: (n, 4) 的 x1, y1, x2, y2 数组
+    :param boxes_b: (m, 4) 的数组，为 None 时计算 boxes_a 自身两两之间的 IoU
+    :return: (n, m) 的 float64 矩阵
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = boxes_a if boxes_b is None else np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    xA = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    yA = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    xB = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    yB = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(xB - xA + 1, 0, None) * np.clip(yB - yA + 1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0] + 1) * (boxes_a[:, 3] - boxes_a[:, 1] + 1)
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0] + 1) * (boxes_b[:, 3] - boxes_b[:, 1] + 1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class DetectionBatch:
+    """
+    单帧检测结果的列式存储：车辆ID、类别索引、检测框、置信度各为一个 NumPy 数组。
+    重叠过滤与碰撞检测共用 overlap_pairs()：先用均匀网格粗筛候选框对，再只对候选对计算 IoU。
+    """
+    def __init__(self, ids, class_ids, boxes, confidences, names):
+        self.ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.names = names
+        self._iou = None
+        self._pairs = None
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls([], [], np.empty((0, 4)), [], names or {})
+
+    @classmethod
+    def from_dicts(cls, detections, names=None):
+        """由旧式的逐框字典列表构造（类别按名称依次编号，缺少置信度时记为 0）。"""
+        names = dict(names or {})
+        lookup = {name: idx for idx, name in names.items()}
+        class_ids = []
+        for det in detections:
+            if det['class_name'] not in lookup:
+                lookup[det['class_name']] = len(names)
+                names[len(names)] = det['class_name']
+            class_ids.append(lookup[det['class_name']])
+        return cls([det['id'] for det in detections], class_ids,
+                   [[det['x1'], det['y1'], det['x2'], det['y2']] for det in detections],
+                   [det.get('confidence', 0.0) for det in detections], names)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def iou_matrix(self):
+        if self._iou is None:
+            self._iou = pairwise_iou(self.boxes)
+        return self._iou
+
+    def overlap_pairs(self):
+        """返回所有相交框对 (i, j, iou)，i < j 且按 (i, j) 字典序排列。"""
+        if self._pairs is None:
+            if len(self) < BROAD_PHASE_MIN_BOXES:
+                iou = self.iou_matrix()
+                i, j = np.nonzero(np.triu(iou > 0, k=1))
+                self._pairs = (i.astype(np.int64), j.astype(np.int64), iou[i, j])
+            else:
+                self._pairs = overlapping_pairs(self.boxes)
+        return self._pairs
+
+    def select(self, indices):
+        """按索引或布尔掩码取子集；已计算的 IoU 矩阵和相交框对同步裁剪，不会重新计算。"""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        subset = DetectionBatch(self.ids[indices], self.class_ids[indices], self.boxes[indices],
+                                self.confidences[indices], self.names)
+        if self._iou is not None:
+            subset._iou = self._iou[np.ix_(indices, indices)]
+        if self._pairs is not None:
+            remap = np.full(len(self), -1, dtype=np.int64)
+            remap[indices] = np.arange(len(indices))
+            i, j, iou = self._pairs
+            new_i, new_j = remap[i], remap[j]
+            both = (new_i >= 0) & (new_j >= 0)
+            new_i, new_j, iou = new_i[both], new_j[both], iou[both]
+            swap = new_i > new_j
+            new_i[swap], new_j[swap] = new_j[swap], new_i[swap]
+            order = np.lexsort((new_j, new_i))
+            subset._pairs = (new_i[order], new_j[order], iou[order])
+        return subset
+
+    def class_name(self, class_id):
+        return self.names.get(class_id, "unknown")
+
+    def to_dicts(self):
+        detections = []
+        for obj_id, class_id, (x1, y1, x2, y2), confidence in zip(self.ids.tolist(), self.class_ids.tolist(),
+                                                                  self.boxes.tolist(), self.confidences.tolist()):
+            detections.append({
+                'id': obj_id,
+                'class_name': self.class_name(class_id),
+                'x1': x1,
+                'y1': y1,
+                'x2': x2,
+                'y2': y2,
+                'y_pixels': y2 - y1 if (y2 - y1) > 0 else 1,
+                'confidence': confidence
+            })
+        return detections
@@ -0,0 +1,207 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import time
+import numpy as np
+
+from .detection_batch import DetectionBatch
+
+# 每个检测框一条定长记录，逐帧顺序追加到 detections.bin；
+# 按帧的 (起始记录, 记录数, 时间戳微秒) 索引保存在 index.npy，时间戳未知时为 -1
+DETECTION_DTYPE = np.dtype([('id', '<i8'), ('class_id', '<i2'), ('box', '<i4', (4,)), ('conf', '<f4')])
+CACHE_VERSION = 2
+
+_file_hashes = {}
+
+
+def file_digest(path, sample=None):
+    """
+    文件内容的 SHA-1；sample 不为 None 时只读取文件头、中部、尾部各 sample 字节再加上文件大小，
+    用于数 GB 的视频文件，避免每次打开视频都完整读一遍。结果按 (路径, 大小, 修改时间) 缓存。
+    """
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime, sample)
+    if cache_key in _file_hashes:
+        return _file_hashes[cache_key]
+    digest = hashlib.sha1()
+    digest.update(str(stat.st_size).encode())
+    with open(path, "rb") as f:
+        if sample is None or stat.st_size <= 3 * sample:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        else:
+            for offset in (0, stat.st_size // 2, stat.st_size - sample):
+                f.seek(offset)
+                digest.update(f.read(sample))
+    _file_hashes[cache_key] = digest.hexdigest()
+    return _file_hashes[cache_key]
+
+
+def cache_key(video_path, weights, backend, int8, conf, iou, imgsz, roi_polygons, tracker="bytetrack.yaml"):
+    """
+    决定检测与跟踪结果的全部输入：视频内容、模型权重、推理后端、置信度与 IoU 阈值、推理尺寸、ROI 及跟踪器配置。
+    :return: (键的十六进制摘要, 参与计算的字段)
+    """
+    fields = {
+        'version': CACHE_VERSION,
+        'video': file_digest(video_path, sample=4 << 20),
+        'weights': file_digest(weights),
+        'backend': backend,
+        'int8': bool(int8),
+        'conf': round(float(conf), 6),
+        'iou': round(float(iou), 6),
+        'imgsz': int(imgsz),
+        'roi': [[[float(v) for v in point] for point in polygon] for polygon in roi_polygons or []],
+        'tracker': file_digest(tracker) if os.path.exists(tracker) else None,
+    }
+    digest = hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+    return digest, fields
+
+
+class DetectionCache:
+    """
+    一组输入（见 cache_key）对应的检测缓存目录：完整的缓存以内存映射方式读取，get() 直接由映射数组构造 DetectionBatch。
+    跟踪 ID 取决于跟踪器从第 0 帧起见过的全部帧，因此缓存只保存从第 0 帧开始（跟踪器已重置）、
+    不间断推理到视频结尾的一整遍结果：add() 只接受从第 0 帧起连续的帧，中途跳帧（队列丢帧、检测步长或运动门跳过的帧）
+    之后不再写入；close() 时覆盖整段视频才写入索引与元数据，否则丢弃已写的部分，不会把两遍推理的结果拼接在一起。
+    处理线程写入的同时可由界面线程关闭。
+    """
+    def __init__(self, directory, fields):
+        self.directory = directory
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.records_path = os.path.join(directory, "detections.bin")
+        self.meta = None
+        self.index = np.empty((0, 3), dtype=np.int64)
+        self.records = np.empty(0, dtype=DETECTION_DTYPE)
+        self.names = {}
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    self.meta = json.load(f)
+                self.index = np.load(os.path.join(directory, "index.npy"), mmap_mode='r')
+                self.names = {int(k): v for k, v in self.meta['names'].items()}
+                if self.meta['detections'] > 0:
+                    self.records = np.memmap(self.records_path, dtype=DETECTION_DTYPE, mode='r',
+                                             shape=(self.meta['detections'],))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"检测缓存 {directory} 无法读取，将重新生成: {e}")
+                self.meta = None
+                self.index = np.empty((0, 3), dtype=np.int64)
+                self.records = np.empty(0, dtype=DETECTION_DTYPE)
+        if self.meta is not None and not self.meta.get('finished'):
+            # 旧版本留下的不完整缓存不再续写，本次从头重新生成
+            self.discard_loaded()
+        # 以元数据记录的帧数为准：写盘中途退出时索引可能比元数据新
+        self.cached_frames = min(len(self.index), self.meta['frames']) if self.meta else 0
+        self.written = len(self.records)
+        self.new_index = []
+        self.file = None
+        self.end_frame = None
+        self.closed = False
+
+    @property
+    def frames(self):
+        """可直接回放的帧数（从第 0 帧起连续）。"""
+        return self.cached_frames
+
+    @property
+    def finished(self):
+        """缓存是否覆盖了整段视频（而不只是播放被中途停止前的一段）。"""
+        return bool(self.meta and self.meta.get('finished'))
+
+    def discard_loaded(self):
+        self.meta = None
+        self.index = np.empty((0, 3), dtype=np.int64)
+        self.records = np.empty(0, dtype=DETECTION_DTYPE)
+        self.names = {}
+
+    def covers(self, frame_nums):
+        """
+        这些帧能否直接回放。只回放完整的缓存：回放一段前缀后再接着推理时，跟踪器没有见过前面的帧，
+        新分配的跟踪 ID 会与缓存中的 ID 冲突。
+        """
+        return self.finished and all(0 <= frame_num < self.cached_frames for frame_num in frame_nums)
+
+    def get(self, frame_num):
+        start, count, _ = self.index[frame_num]
+        records = self.records[start:start + count]
+        return DetectionBatch(records['id'], records['class_id'], records['box'], records['conf'], self.names)
+
+    def timestamp(self, frame_num):
+        """帧的时间戳（秒），写入时未知则返回 None。"""
+        microseconds = int(self.index[frame_num][2])
+        return microseconds / 1e6 if microseconds >= 0 else None
+
+    def add(self, frame_nums, batches, timestamps=None):
+        with self.lock:
+            if self.closed or self.finished:
+                return
+            if timestamps is None:
+                timestamps = [None] * len(frame_nums)
+            for frame_num, batch, timestamp in zip(frame_nums, batches, timestamps):
+                if frame_num != len(self.new_index):
+                    continue
+                if self.file is None:
+                    # 截掉上次异常退出时写入但未被索引的记录
+                    self.file = open(self.records_path, "r+b" if os.path.exists(self.records_path) else "wb")
+                    self.file.truncate(self.written * DETECTION_DTYPE.itemsize)
+                    self.file.seek(0, os.SEEK_END)
+                records = np.empty(len(batch), dtype=DETECTION_DTYPE)
+                records['id'] = batch.ids
+                records['class_id'] = batch.class_ids
+                records['box'] = batch.boxes
+                records['conf'] = batch.confidences
+                self.file.write(records.tobytes())
+                self.new_index.append((self.written, len(batch),
+                                       -1 if timestamp is None else int(round(timestamp * 1e6))))
+                self.written += len(batch)
+                if batch.names:
+                    self.names.update(batch.names)
+
+    def mark_incomplete(self):
+        """放弃记为完整、实际帧数却不足的缓存，本次推理从第 0 帧起重新生成。"""
+        with self.lock:
+            self.discard_loaded()
+            self.cached_frames = 0
+            self.written = 0
+
+    def mark_end(self, total_frames):
+        """视频共 total_frames 帧；缓存覆盖到该帧数时记为完整。"""
+        with self.lock:
+            self.end_frame = total_frames
+
+    def close(self, finished=None):
+        """
+        新写入的帧覆盖整段视频时保存为完整的缓存，否则删除已写入的部分。
+        :param finished: 是否已处理完整段视频；为 None 时按 mark_end() 记录的总帧数判断
+        :return: 保存的帧数
+        """
+        with self.lock:
+            if self.closed:
+                return 0
+            self.closed = True
+            if self.file is None:
+                return 0
+            self.file.close()
+            index = np.asarray(self.new_index, dtype=np.int64).reshape(-1, 3)
+            if finished is None:
+                finished = self.end_frame is not None and len(index) >= self.end_frame
+            if not finished:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                return 0
+            # 先写索引再写元数据，两者都以改名方式替换；中途退出时残留的旧元数据不是完整缓存，下次打开时丢弃
+            with open(os.path.join(self.directory, "index.tmp.npy"), "wb") as f:
+                np.save(f, index)
+            os.replace(os.path.join(self.directory, "index.tmp.npy"), os.path.join(self.directory, "index.npy"))
+            meta = {'key': self.fields, 'frames': len(index), 'detections': self.written,
+                    'finished': True, 'names': {str(k): v for k, v in self.names.items()},
+                    'updated': time.strftime("%Y-%m-%d %H:%M:%S")}
+            with open(os.path.join(self.directory, "meta.tmp.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(os.path.join(self.directory, "meta.tmp.json"), os.path.join(self.directory, "meta.json"))
+            return len(self.new_index)
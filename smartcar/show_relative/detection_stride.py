@@ -0,0 +1,50 @@
+class AdaptiveStride:
+    """
+    自适应检测步长：每 stride 帧运行一次 YOLO，其余帧由运动模型外推检测框。
+    以单帧处理延迟的指数滑动平均对照目标延迟调节 stride：超出目标或待处理队列积压时增大步长，
+    按当前步长折算回 stride-1 时仍有余量才减小步长；每次调整后至少观察 cooldown 帧再做下一次调整。
+    """
+    def __init__(self, max_stride=6, alpha=0.1, cooldown=30):
+        self.max_stride = max_stride
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.reset()
+
+    def reset(self):
+        self.stride = 1
+        self.latency_ema = None
+        self.frames_since_change = 0
+        # 使下一帧必定运行检测
+        self.frames_since_detection = self.max_stride
+
+    def should_detect(self):
+        """按调用顺序逐帧判断本帧是否需要运行检测。"""
+        self.frames_since_detection += 1
+        if self.frames_since_detection >= self.stride:
+            self.frames_since_detection = 0
+            return True
+        return False
+
+    def update(self, latency, target_latency, backlog=0.0):
+        """
+        :param latency: 本帧处理延迟（秒）
+        :param target_latency: 目标延迟（秒）
+        :param backlog: 待处理队列的填充比例（0~1）
+        :return: 当前步长
+        """
+        if self.latency_ema is None:
+            self.latency_ema = latency
+        else:
+            self.latency_ema = self.alpha * latency + (1 - self.alpha) * self.latency_ema
+        self.frames_since_change += 1
+        if self.frames_since_change < self.cooldown:
+            return self.stride
+
+        if (self.latency_ema > target_latency or backlog > 0.5) and self.stride < self.max_stride:
+            self.stride += 1
+            self.frames_since_change = 0
+        elif self.stride > 1 and backlog < 0.1 and \
+                self.latency_ema * self.stride / (self.stride - 1) < 0.8 * target_latency:
+            self.stride -= 1
+            self.frames_since_change = 0
+        return self.stride
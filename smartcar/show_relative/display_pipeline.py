@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+import tkinter as tk
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class CanvasTarget:
+    """一块画布的显示状态：缓存的缩放几何、工作线程的输出缓冲区与主线程持有的 PhotoImage。"""
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.geometry_key = None
+        self.geometry = None
+        self.scaled = None
+        self.outputs = []
+        self.staging = []
+        self.pending = None
+        self.converting = None
+        self.ready = None
+        self.in_use = None
+        self.photo = None
+        self.photo_size = None
+        self.image_id = None
+        self.blit_times = deque(maxlen=120)
+
+
+class DisplayPipeline:
+    """
+    画面显示流水线：任意线程调用 submit() 提交 BGR 帧，工作线程完成缩放与颜色转换，
+    Tk 主线程只由 dispatch() 把已转换好的图像以 PhotoImage.paste 原地贴到画布上。
+    每块画布只保留最新的一帧，尚未处理或尚未显示的旧帧直接被新帧替换。
+    """
+    def __init__(self, app_instance, canvases, interval=15):
+        """
+        :param canvases: {名称: tk.Canvas}
+        :param interval: 主线程检查新图像的间隔（毫秒）
+        """
+        self.app = app_instance
+        self.interval = interval
+        self.targets = {key: CanvasTarget(canvas) for key, canvas in canvases.items()}
+        self.condition = threading.Condition()
+        self.running = True
+        self.worker = threading.Thread(target=self.convert_frames, daemon=True)
+        self.worker.start()
+        self.app.root.after(self.interval, self.dispatch)
+
+    def submit(self, key, frame, slot=None):
+        """
+        提交一帧待显示（线程安全）。
+        :param slot: 帧所在的 FramePool 槽位；调用方把一个引用交给流水线，转换完成或被新帧替换时释放。
+                     为 None 时帧会被复制到流水线自己的暂存区，调用方之后可以继续修改原帧
+        """
+        target = self.targets[key]
+        with self.condition:
+            if target.pending is not None:
+                self.app.perf_monitor.drop("显示跳帧")
+                if target.pending[1] is not None:
+                    target.pending[1].release()
+            if slot is None:
+                # 两块暂存区轮换，避开工作线程正在读取的那一块
+                if not target.staging or target.staging[0].shape != frame.shape:
+                    target.staging = [np.empty_like(frame), np.empty_like(frame)]
+                index = 1 if target.converting is target.staging[0] else 0
+                np.copyto(target.staging[index], frame)
+                frame = target.staging[index]
+            target.pending = (frame, slot)
+            self.condition.notify()
+
+    def geometry_for(self, target, shape):
+        """按画布尺寸与帧尺寸计算缩放后的大小、居中偏移与插值方式，二者不变时直接复用。"""
+        key = (shape[0], shape[1], self.app.canvas_width, self.app.canvas_height)
+        if key != target.geometry_key:
+            img_height, img_width = shape[:2]
+            ratio = min(self.app.canvas_width / img_width, self.app.canvas_height / img_height)
+            width, height = max(1, int(img_width * ratio)), max(1, int(img_height * ratio))
+            interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+            target.geometry = (width, height, (self.app.canvas_width - width) // 2,
+                               (self.app.canvas_height - height) // 2, interpolation)
+            target.geometry_key = key
+            target.scaled = np.empty((height, width, 3), dtype=np.uint8)
+            target.outputs = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(3)]
+        return target.geometry
+
+    def convert_frames(self):
+        while True:
+            with self.condition:
+                while self.running and not any(t.pending is not None for t in self.targets.values()):
+                    self.condition.wait()
+                if not self.running:
+                    return
+                target = next(t for t in self.targets.values() if t.pending is not None)
+                frame, slot = target.pending
+                target.pending = None
+                target.converting = frame
+                width, height, x, y, interpolation = self.geometry_for(target, frame.shape)
+                # 三块输出缓冲区：一块可能正被主线程贴图，一块可能是尚未显示的上一帧，剩下的一块供本次写入
+                busy = (target.in_use, target.ready[0] if target.ready is not None else None)
+                output = next(buf for buf in target.outputs if not any(buf is b for b in busy))
+            try:
+                start = time.perf_counter()
+                cv2.resize(frame, (width, height), dst=target.scaled, interpolation=interpolation)
+                cv2.cvtColor(target.scaled, cv2.COLOR_BGR2RGB, dst=output)
+                self.app.perf_monitor.record('display', time.perf_counter() - start)
+                with self.condition:
+                    target.ready = (output, x, y)
+            except Exception as e:
+                print(f"显示帧时发生错误: {e}")
+            finally:
+                if slot is not None:
+                    slot.release()
+                with self.condition:
+                    target.converting = None
+
+    def dispatch(self):
+        """Tk 主线程：把每块画布最新转换好的图像贴上去。"""
+        if not self.running:
+            return
+        for target in self.targets.values():
+            with self.condition:
+                if target.ready is None:
+                    continue
+                output, x, y = target.ready
+                target.ready = None
+                target.in_use = output
+            try:
+                self.blit(target, output, x, y)
+            finally:
+                with self.condition:
+                    target.in_use = None
+        self.app.root.after(self.interval, self.dispatch)
+
+    def blit(self, target, output, x, y):
+        start = time.perf_counter()
+        image = Image.fromarray(output)
+        size = (output.shape[1], output.shape[0])
+        if target.photo is None or target.photo_size != size:
+            target.photo = ImageTk.PhotoImage(image=image)
+            target.photo_size = size
+            if target.image_id is None:
+                target.image_id = target.canvas.create_image(x, y, anchor=tk.NW, image=target.photo)
+            else:
+                target.canvas.itemconfig(target.image_id, image=target.photo)
+        else:
+            target.photo.paste(image)
+        target.canvas.coords(target.image_id, x, y)
+        now = time.perf_counter()
+        target.blit_times.append(now)
+        self.app.perf_monitor.record('blit', now - start)
+
+    def display_fps(self, key):
+        """最近一秒内该画布实际刷新的帧率。"""
+        times = self.targets[key].blit_times
+        now = time.perf_counter()
+        recent = [t for t in times if now - t <= 1.0]
+        return float(len(recent))
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            for target in self.targets.values():
+                if target.pending is not None and target.pending[1] is not None:
+                    target.pending[1].release()
+                target.pending = None
+            self.condition.notify_all()
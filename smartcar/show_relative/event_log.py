@@ -0,0 +1,61 @@
+import threading
+import time
+
+# 逐帧可能大量重复出现的事件类型及其在汇总信息中的名称
+EVENT_KINDS = {
+    'speeding': "超速异常",
+    'trajectory': "轨迹异常",
+    'collision': "碰撞异常",
+}
+
+
+class EventLog:
+    """
+    按事件类型限流的日志输出：每种事件在每个时间窗口内最多直接输出 burst 条，
+    其余只计数，窗口结束后合并为一条汇总，例如“最近 1 秒内另有 42 条超速异常”。
+    可在任意线程调用。
+    """
+    def __init__(self, interval=1.0, burst=5):
+        """
+        :param interval: 限流窗口长度（秒）
+        :param burst: 每个窗口内每种事件直接输出的条数
+        """
+        self.interval = interval
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def event(self, kind, message):
+        now = time.monotonic()
+        with self.lock:
+            summary = self.close_window(kind, now)
+            window = self.windows.setdefault(kind, [now, 0, 0])
+            window[1] += 1
+            emit = window[1] <= self.burst
+            if not emit:
+                window[2] += 1
+        if summary:
+            print(summary)
+        if emit:
+            print(message)
+
+    def close_window(self, kind, now, force=False):
+        """窗口已结束（或 force）时移除该窗口，有被合并的事件则返回汇总信息。"""
+        window = self.windows.get(kind)
+        if window is None or (not force and now - window[0] < self.interval):
+            return None
+        del self.windows[kind]
+        if window[2] == 0:
+            return None
+        # 被合并的事件都发生在窗口开始后的 interval 秒内
+        span = min(now - window[0], self.interval)
+        return f"最近 {span:.1f} 秒内另有 {window[2]} 条{EVENT_KINDS.get(kind, kind)}（已合并）"
+
+    def flush(self, force=False):
+        """输出已结束窗口的汇总；force 为 True 时结束所有窗口，用于处理结束或重置统计时。"""
+        now = time.monotonic()
+        with self.lock:
+            summaries = [self.close_window(kind, now, force) for kind in list(self.windows)]
+        for summary in summaries:
+            if summary:
+                print(summary)
@@ -0,0 +1,114 @@
+import math
+import numpy as np
+
+# 逐级汇总的时间粒度：(名称, 每格秒数, 保留格数)。第一级为原始统计窗口，格长与名称取自 flow_window_size_seconds
+ROLLUP_LEVELS = (
+    (None, None, 720),
+    ("1分钟", 60, 1440),
+    ("15分钟", 15 * 60, 672),
+    ("1小时", 3600, 720),
+    ("1天", 86400, 366),
+)
+
+
+class FlowRing:
+    """
+    定长环形缓冲区：保存最近 capacity 格的 (起始时间, 车流量)，写满后覆盖最旧的一格。
+    同时维护环内数值之和，平均值为 O(1)。
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.starts = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.size = 0
+        self.total = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, start, value):
+        if self.size == self.capacity:
+            self.total -= float(self.values[self.head])
+        else:
+            self.size += 1
+        self.starts[self.head] = start
+        self.values[self.head] = value
+        self.total += value
+        self.head = (self.head + 1) % self.capacity
+
+    @property
+    def mean(self):
+        return self.total / self.size if self.size else 0.0
+
+    def items(self):
+        """按时间先后返回 (起始时间数组, 数值数组) 的副本。"""
+        order = (np.arange(self.size) + self.head - self.size) % self.capacity
+        return self.starts[order], self.values[order]
+
+
+class FlowSeries:
+    """
+    车流量时间序列：每个统计窗口结束时 add() 一次，窗口值进入第一级环形缓冲区，
+    同时累加到各级汇总（1 分钟 → 15 分钟 → 1 小时 → 1 天）当前的一格，跨格时把该格均值写入该级的环形缓冲区。
+    每级内存固定，每次 add() 的开销与已运行时长无关；最近 recent_windows 个窗口的平均值即为当前车流量。
+    """
+    def __init__(self, window_seconds=5, recent_windows=100, levels=ROLLUP_LEVELS):
+        self.window_seconds = window_seconds
+        self.levels = []
+        for name, seconds, capacity in levels:
+            self.levels.append({'name': name or f"{window_seconds}秒", 'seconds': seconds or window_seconds,
+                                'ring': FlowRing(capacity), 'bucket': None, 'sum': 0.0, 'count': 0})
+        self.recent = FlowRing(recent_windows)
+
+    def __len__(self):
+        return len(self.levels[0]['ring'])
+
+    @property
+    def names(self):
+        return [level['name'] for level in self.levels]
+
+    def add(self, start, value):
+        """
+        记录一个统计窗口的车流量。
+        :param start: 窗口起始时间戳（秒）
+        :param value: 窗口内的车流量 (veh/h)
+        """
+        self.levels[0]['ring'].append(start, value)
+        self.recent.append(start, value)
+        for level in self.levels[1:]:
+            bucket = math.floor(start / level['seconds'])
+            if bucket != level['bucket']:
+                if level['count']:
+                    level['ring'].append(level['bucket'] * level['seconds'], level['sum'] / level['count'])
+                level['bucket'], level['sum'], level['count'] = bucket, 0.0, 0
+            level['sum'] += value
+            level['count'] += 1
+
+    @property
+    def recent_mean(self):
+        return self.recent.mean
+
+    def history(self, level=0):
+        """
+        某一级的时间序列，含尚未结束的当前一格。
+        :param level: 级别序号或名称
+        :return: (起始时间数组, 车流量数组)
+        """
+        if isinstance(level, str):
+            level = self.names.index(level)
+        level = self.levels[level]
+        starts, values = level['ring'].items()
+        if level['count']:
+            starts = np.append(starts, level['bucket'] * level['seconds'])
+            values = np.append(values, level['sum'] / level['count'])
+        return starts, values
+
+    def summary(self):
+        """各级时间序列，供写入 summary.json。"""
+        result = {}
+        for index, level in enumerate(self.levels):
+            starts, values = self.history(index)
+            result[level['name']] = {'seconds': level['seconds'],
+                                     'series': [[float(s), float(v)] for s, v in zip(starts, values)]}
+        return result
@@ -0,0 +1,89 @@
+import queue
+import threading
+import cv2
+import numpy as np
+
+
+class FrameSlot:
+    """帧池中的一个槽位：frame 是指向预分配内存的视图，在各线程之间传递的是槽位本身而不是帧拷贝。"""
+    __slots__ = ('pool', 'index', 'frame', 'queued_at', 'timestamp')
+
+    def __init__(self, pool, index, frame):
+        self.pool = pool
+        self.index = index
+        self.frame = frame
+        # 最近一次放入待处理队列的时刻（time.perf_counter），用于统计排队等待时间
+        self.queued_at = 0.0
+        # 帧的时间戳（秒）：视频文件为媒体时间，摄像头为采集时刻；流量窗口与测速都以它计时
+        self.timestamp = 0.0
+
+    def retain(self):
+        self.pool.retain(self)
+        return self
+
+    def release(self):
+        self.pool.release(self)
+
+
+class FramePool:
+    """
+    预分配固定数量帧槽位的环形帧池。
+    采集方 acquire() 取得空闲槽位（引用计数为 1）并就地写入，之后把槽位依次交给处理、显示；
+    需要同时持有的一方先 retain()，每个持有者用完后 release()，计数归零时槽位回到空闲队列。
+    稳态下不再为帧分配任何内存。空闲槽位后进先出：总是复用刚归还的槽位，
+    下游跟得上时只有少数几个槽位被反复使用，其余槽位的内存从未写入、不会真正占用物理内存。
+    """
+    def __init__(self, num_slots, shape, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.buffer = np.empty((num_slots,) + self.shape, dtype=dtype)
+        self.slots = [FrameSlot(self, i, self.buffer[i]) for i in range(num_slots)]
+        self.refcounts = [0] * num_slots
+        self.lock = threading.Lock()
+        self.free = queue.LifoQueue()
+        for slot in self.slots:
+            self.free.put(slot)
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def available(self):
+        return self.free.qsize()
+
+    def acquire(self, timeout=None):
+        """取得一个空闲槽位；timeout 为 0 时不等待，池耗尽则抛出 queue.Empty。"""
+        if timeout == 0:
+            slot = self.free.get_nowait()
+        else:
+            slot = self.free.get(timeout=timeout)
+        with self.lock:
+            self.refcounts[slot.index] = 1
+        return slot
+
+    def retain(self, slot):
+        with self.lock:
+            self.refcounts[slot.index] += 1
+
+    def release(self, slot):
+        with self.lock:
+            self.refcounts[slot.index] -= 1
+            released = self.refcounts[slot.index] == 0
+        if released:
+            self.free.put(slot)
+
+    def store(self, slot, frame):
+        """把尺寸可能不一致的外部帧写入槽位（尺寸相同时直接拷贝，否则缩放到池的尺寸）。"""
+        if frame.shape == self.shape:
+            np.copyto(slot.frame, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=slot.frame)
+        return slot
+
+
+def release_queue(frame_queue):
+    """清空一个以 (槽位, 帧号) 为元素的队列，并归还其中所有槽位。"""
+    with frame_queue.mutex:
+        items = list(frame_queue.queue)
+        frame_queue.queue.clear()
+    for item in items:
+        item[0].release()
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+import cv2
+from .frame_pool import FramePool, release_queue
+
+
+class MediaClock:
+    """
+    视频文件逐帧的媒体时间（秒）：优先取解码器给出的显示时间 CAP_PROP_POS_MSEC（可变帧率视频也准确），
+    后端不提供或时间戳不递增时按名义帧率顺延。
+    """
+    def __init__(self, fps):
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        self.last = None
+
+    def stamp(self, cap):
+        """读取 cap 刚解码的一帧的时间戳，须在每次 read() 成功后调用一次。"""
+        seconds = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if self.last is None:
+            seconds = max(seconds, 0.0)
+        elif seconds <= self.last:
+            seconds = self.last + self.frame_interval
+        self.last = seconds
+        return seconds
+
+
+class FrameReader:
+    """
+    后台解码线程：持续从 VideoCapture 读取帧并预存到有界缓冲区，
+    使用方（Tk 主线程或批处理循环）只需取帧，不再承担解码耗时。
+    帧直接解码进 FramePool 的槽位，缓冲区中传递的是 (槽位, 帧号)，取走槽位的一方负责 release()；
+    帧的媒体时间记在槽位的 timestamp 上。
+    """
+    def __init__(self, source, buffer_size=32, pool=None, monitor=None):
+        self.cap = cv2.VideoCapture(source)
+        if pool is None and self.cap.isOpened():
+            shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+            pool = FramePool(buffer_size + 4, shape)
+        self.pool = pool
+        self.monitor = monitor
+        self.clock = MediaClock(self.cap.get(cv2.CAP_PROP_FPS))
+        self.buffer_size = buffer_size
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.stopped = threading.Event()
+        self.finished = False
+        self.decoded_frames = 0
+        self.decode_time = 0.0
+        self.thread = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        frame_num = 0
+        slot = None
+        try:
+            while not self.stopped.is_set():
+                if slot is None:
+                    try:
+                        slot = self.pool.acquire(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                start = time.perf_counter()
+                ret, frame = self.cap.read(slot.frame)
+                elapsed = time.perf_counter() - start
+                self.decode_time += elapsed
+                if not ret:
+                    break
+                if frame is not slot.frame:
+                    self.pool.store(slot, frame)
+                slot.timestamp = self.clock.stamp(self.cap)
+                self.decoded_frames += 1
+                if self.monitor is not None:
+                    self.monitor.record('decode', elapsed)
+                slot.queued_at = time.perf_counter()
+                item = (slot, frame_num)
+                while not self.stopped.is_set():
+                    try:
+                        self.buffer.put(item, timeout=0.1)
+                        slot = None
+                        break
+                    except queue.Full:
+                        continue
+                frame_num += 1
+        finally:
+            if slot is not None:
+                slot.release()
+            self.finished = True
+
+    def read(self, timeout=0.0):
+        """
+        取出下一帧。
+        :param timeout: 最长等待秒数，0 表示不等待，None 表示一直等到有帧或视频结束
+        :return: (slot, frame_num)；视频已读完且缓冲区为空时返回 None
+        :raises queue.Empty: 超时仍没有可用的帧
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                if timeout == 0:
+                    return self.buffer.get_nowait()
+                return self.buffer.get(timeout=0.05)
+            except queue.Empty:
+                if self.finished and self.buffer.empty():
+                    return None
+                if deadline is not None and time.perf_counter() >= deadline:
+                    raise
+
+    @property
+    def decode_fps(self):
+        return self.decoded_frames / self.decode_time if self.decode_time > 0 else 0.0
+
+    @property
+    def fill_level(self):
+        return self.buffer.qsize()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        release_queue(self.buffer)
+        if self.cap.isOpened():
+            self.cap.release()
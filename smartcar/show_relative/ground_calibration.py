@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+from .counting_zones import scale_points
+
+
+class GroundCalibration:
+    """
+    路面标定：由若干组“画面像素 ↔ 路面坐标（米）”参考点求单应矩阵，
+    在配置视频源时一次性算出整帧每个像素对应的路面坐标表，之后每个检测只需查表（双线性插值）即可得到以米为单位的位置。
+    地平线以上（单应变换分母不为正）以及接近地平线、距参考点过远的像素没有可靠的路面位置，记为 NaN。
+    """
+    def __init__(self, image_points, ground_points, frame_shape, max_range=200.0):
+        """
+        :param image_points: 画面中的参考点 [[x, y], ...]，至少 4 个且任意 3 个不共线；坐标均不大于 1 时按画面宽高的比例解释
+        :param ground_points: 对应的路面坐标 [[X, Y], ...]（米）
+        :param frame_shape: 帧的 (高, 宽[, 通道])
+        :param max_range: 距参考点中心超过该距离（米）的像素记为 NaN，接近地平线处一个像素对应的路面距离过大
+        """
+        image_points = scale_points(image_points, frame_shape).astype(np.float32)
+        ground_points = np.asarray(ground_points, dtype=np.float32).reshape(-1, 2)
+        if len(image_points) < 4 or len(image_points) != len(ground_points):
+            raise ValueError("路面标定需要至少 4 组一一对应的画面点与路面点")
+        if len(image_points) == 4:
+            homography = cv2.getPerspectiveTransform(image_points, ground_points)
+        else:
+            homography, _ = cv2.findHomography(image_points, ground_points, 0)
+        if homography is None or abs(np.linalg.det(homography)) < 1e-12:
+            raise ValueError("参考点退化（存在三点共线或重复点），无法求出单应矩阵")
+        self.homography = homography
+        projected = cv2.perspectiveTransform(image_points[None].astype(np.float64), homography)[0]
+        self.reprojection_error = float(np.sqrt(((projected - ground_points) ** 2).sum(axis=1)).max())
+
+        height, width = frame_shape[:2]
+        xs, ys = np.meshgrid(np.arange(width, dtype=np.float64), np.arange(height, dtype=np.float64))
+        denominator = homography[2, 0] * xs + homography[2, 1] * ys + homography[2, 2]
+        # 标定点所在一侧为地面，分母与其异号的像素位于地平线之上
+        sign = np.sign(homography[2, :2] @ image_points[0] + homography[2, 2])
+        denominator *= sign
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lut = np.empty((height, width, 2), dtype=np.float32)
+            lut[..., 0] = sign * (homography[0, 0] * xs + homography[0, 1] * ys + homography[0, 2]) / denominator
+            lut[..., 1] = sign * (homography[1, 0] * xs + homography[1, 1] * ys + homography[1, 2]) / denominator
+        center = ground_points.mean(axis=0)
+        lut[(denominator <= 0) | (np.hypot(lut[..., 0] - center[0], lut[..., 1] - center[1]) > max_range)] = np.nan
+        self.lut = lut
+
+    @classmethod
+    def from_config(cls, config, frame_shape):
+        """
+        由视频源配置中的 calibration 项创建，例如
+        {"image_points": [[560, 420], [720, 420], [1180, 700], [100, 700]],
+         "ground_points": [[0, 40], [7.5, 40], [7.5, 0], [0, 0]], "max_range": 200}
+        """
+        return cls(config['image_points'], config['ground_points'], frame_shape,
+                   float(config.get('max_range', 200.0)))
+
+    def to_ground(self, x, y):
+        """
+        像素坐标对应的路面坐标。
+        :param x: (N,) 像素 x 坐标
+        :param y: (N,) 像素 y 坐标
+        :return: (N, 2) 路面坐标（米），超出画面的点按画面边缘处理，地平线以上为 NaN
+        """
+        height, width = self.lut.shape[:2]
+        x = np.clip(np.asarray(x, dtype=np.float64), 0, width - 1)
+        y = np.clip(np.asarray(y, dtype=np.float64), 0, height - 1)
+        x0 = np.minimum(x.astype(np.intp), width - 2)
+        y0 = np.minimum(y.astype(np.intp), height - 2)
+        x1, y1 = x0 + 1, y0 + 1
+        fx = (x - x0)[:, None]
+        fy = (y - y0)[:, None]
+        lut = self.lut
+        top = lut[y0, x0] * (1 - fx) + lut[y0, x1] * fx
+        bottom = lut[y1, x0] * (1 - fx) + lut[y1, x1] * fx
+        return top * (1 - fy) + bottom * fy
@@ -0,0 +1,286 @@
+import os
+import json
+import queue
+import threading
+import time
+import cv2
+
+from .constants import VEHICLE_TYPE_DISTANCE
+from .processing_operations import ProcessingOperations
+from .frame_reader import FrameReader
+from .frame_pool import FramePool
+from .inference_backend import load_vehicle_model, warm_up
+from .event_log import EventLog
+from .perf_monitor import PerfMonitor
+
+
+class HeadlessApp:
+    """
+    与 VideoApp 拥有相同状态属性的无界面容器，ProcessingOperations 可直接挂载在其上运行，
+    用于服务器上的离线批处理（不创建任何 Tk 组件）。
+    """
+    def __init__(self, weights="model_data/best.pt", device=None, backend="pt", int8=False):
+        self.queue = queue
+        self.VEHICLE_TYPE_DISTANCE = VEHICLE_TYPE_DISTANCE
+        self.weights = weights
+        self.device = device
+        self.inference_backend = backend
+        self.inference_int8 = int8
+        self.vehicle_model = None
+
+        self.stats_lock = threading.Lock()
+        self.processing = False
+        self.is_vehicle_processing = True
+        self.is_speed_processing = True
+        self.is_exception_processing = True
+
+        self.video_path = None
+        self.fps = 30
+        self.total_frames = 0
+        self.current_frame = 0
+        self.current_frame_num = 0
+        self.current_timestamp = 0.0
+        self.current_vehicle_id = 0
+        self.last_detection_time = None
+        self.window_start_time = None
+
+        self.y_min = 0
+        self.y_max = None
+        self.line_y = None
+        self.depth_min = 5.0
+        self.depth_max = 80.0
+        self.flow_window_size_seconds = 5
+        self.alpha = 0.3
+        self.min_displacement = 10
+        self.conf_threshold = 0.3
+        self.iou_threshold = 0.1
+        self.speed_threshold = 60.0
+        self.number_of_lanes = 4
+        self.angle_threshold = 30.0
+        self.inference_batch_size = 1
+        self.target_latency_ms = 0.0
+        self.motion_gate_ratio = 0.0
+        self.source_config_path = "source_config.json"
+        self.source_settings = {}
+        self.roi = None
+        self.counting_zones = None
+        self.ground_calibration = None
+        self.roi_polygons = None
+        self.prefetch_size = 32
+        self.track_ttl_frames = 150
+        self.tracked_data = None
+        self.track_log_root = None
+        self.track_log_format = "parquet"
+        self.detection_cache_root = None
+        self.event_log = EventLog()
+        self.perf_monitor = PerfMonitor(window_seconds=60.0)
+
+        self.processing_ops = ProcessingOperations(self)
+        self.processing_ops.reset_statistics()
+
+    def init_models(self):
+        import torch
+
+        if self.device is None:
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        print(f"加载 YOLO 模型用于车辆检测（后端: {self.inference_backend}{' INT8' if self.inference_int8 else ''}，"
+              f"{self.device}）...")
+        start = time.perf_counter()
+        self.vehicle_model = load_vehicle_model(self.weights, self.inference_backend, self.inference_int8, self.device)
+        load_seconds = time.perf_counter() - start
+        print(f"YOLO 模型加载成功：加载 {load_seconds:.1f} 秒，预热推理 {warm_up(self.vehicle_model):.0f} ms。")
+
+
+class HeadlessOperations:
+    """逐帧读取视频文件并以硬件允许的最快速度运行完整分析流程，结果写入输出目录。"""
+    def __init__(self, app_instance):
+        self.app = app_instance
+
+    def run(self, video_path, output_dir, save_video=False, max_frames=None, progress_interval=100):
+        probe = cv2.VideoCapture(video_path)
+        if not probe.isOpened():
+            raise IOError(f"无法打开视频: {video_path}")
+        shape = (int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(probe.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        self.app.fps = probe.get(cv2.CAP_PROP_FPS) or 30
+        self.app.total_frames = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        probe.release()
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.app.video_path = video_path
+        self.app.y_max = shape[0]
+        self.app.line_y = int(self.app.y_max * 0.5)
+        self.app.current_vehicle_id = 0
+        track_log_dir = os.path.join(output_dir, "track_log")
+        with self.app.stats_lock:
+            self.app.processing_ops.reset_statistics(track_log_dir)
+            self.app.processing_ops.configure_source(video_path, shape, self.app.roi_polygons)
+
+        # 整段视频已有检测缓存且不输出视频时，既不加载模型也不解码，直接按帧号回放缓存结果
+        cache = self.app.processing_ops.detection_cache
+        if cache is not None and cache.finished and cache.frames < self.app.total_frames:
+            # 旧版本可能把中途跳帧后的一段前缀记为完整，这样的缓存不回放，本次重新推理并补齐
+            print(f"检测缓存只有 {cache.frames} / {self.app.total_frames} 帧，不完整，将重新推理")
+            cache.mark_incomplete()
+        if cache is not None and cache.finished:
+            if not save_video:
+                return self.replay(cache, output_dir, max_frames, progress_interval)
+        elif self.app.vehicle_model is None:
+            self.app.init_models()
+
+        # 批处理循环最多同时持有一整批槽位，帧池需在预读缓冲区之外再留出这部分
+        batch_size = max(1, self.app.inference_batch_size)
+        pool = FramePool(self.app.prefetch_size + batch_size + 2, shape)
+        reader = FrameReader(video_path, buffer_size=self.app.prefetch_size, pool=pool, monitor=self.app.perf_monitor)
+
+        writer = None
+        if save_video:
+            width = int(reader.get(cv2.CAP_PROP_FRAME_WIDTH))
+            writer = cv2.VideoWriter(os.path.join(output_dir, "processed.mp4"),
+                                     cv2.VideoWriter_fourcc(*"mp4v"), self.app.fps, (width, self.app.y_max))
+
+        reader.start()
+        exception_counts = {}
+        frame_num = 0
+        end_frame = None
+        start_time = time.perf_counter()
+        try:
+            finished = False
+            while not finished:
+                slots, frames, frame_nums, timestamps, available_times = [], [], [], [], []
+                while len(frames) < batch_size:
+                    if max_frames is not None and frame_num + len(frames) >= max_frames:
+                        finished = True
+                        break
+                    item = reader.read(timeout=None)
+                    if item is None:
+                        finished = True
+                        end_frame = frame_num + len(frames)
+                        break
+                    slots.append(item[0])
+                    frames.append(item[0].frame)
+                    frame_nums.append(item[1])
+                    timestamps.append(item[0].timestamp)
+                    available_times.append(time.perf_counter())
+                    self.app.perf_monitor.record('queue_wait', available_times[-1] - item[0].queued_at)
+                if not frames:
+                    break
+
+                self.app.current_frame = frame_nums[-1]
+                try:
+                    # 逐帧检测结果由 process_frame 追加到跟踪日志（self.app.tracked_data）
+                    outputs = self.app.processing_ops.process_batch(frames, frame_nums, render=writer is not None,
+                                                                    in_place=True, available_times=available_times,
+                                                                    timestamps=timestamps)
+                    for processed_frame, detections, exceptions in outputs:
+                        for exception in exceptions.values():
+                            exception_counts[exception] = exception_counts.get(exception, 0) + 1
+                        if writer is not None:
+                            writer.write(processed_frame)
+                finally:
+                    for slot in slots:
+                        slot.release()
+
+                previous = frame_num
+                frame_num += len(frames)
+                if progress_interval and frame_num // progress_interval > previous // progress_interval:
+                    elapsed = time.perf_counter() - start_time
+                    report = self.app.processing_ops.get_throughput_report()
+                    print(f"已处理 {frame_num} / {self.app.total_frames} 帧，{frame_num / elapsed:.1f} FPS，"
+                          f"单帧延迟 平均 {report['latency_mean_ms']:.1f} ms / p95 {report['latency_p95_ms']:.1f} ms，"
+                          f"解码 {reader.decode_fps:.0f} FPS，缓冲 {reader.fill_level}/{reader.buffer_size}，"
+                          f"运动门命中率 {report['gate_hit_rate']:.0%}")
+                self.app.event_log.flush()
+        finally:
+            self.app.event_log.flush(force=True)
+            reader.stop()
+            if writer is not None:
+                writer.release()
+            track_log = self.app.tracked_data
+            with self.app.stats_lock:
+                self.app.processing_ops.open_track_log(None)
+            saved = 0
+            if cache is not None:
+                # 缓存是否完整由实际写入的帧数判断：运动门或检测步长跳过的帧之后不再写入缓存
+                if end_frame is not None:
+                    cache.mark_end(end_frame)
+                saved = cache.close()
+
+        elapsed = time.perf_counter() - start_time
+        summary = self.build_summary(frame_num, elapsed, exception_counts)
+        summary['decode_fps'] = reader.decode_fps
+        if self.app.motion_gate_ratio > 0:
+            gate = self.app.processing_ops.motion_gate
+            summary['motion_gate'] = {'hit_rate': gate.hit_rate, 'counts': dict(gate.counts)}
+        if cache is not None:
+            summary['detection_cache'] = {'path': cache.directory, 'replayed': False, 'saved_frames': saved,
+                                          'frames': cache.frames + saved}
+        return self.finish(summary, output_dir, track_log)
+
+    def replay(self, cache, output_dir, max_frames=None, progress_interval=100):
+        """按帧号回放完整的检测缓存，分析流程与逐帧推理时完全相同，只是不读取画面。"""
+        total = cache.frames if max_frames is None else min(cache.frames, max_frames)
+        print(f"使用检测缓存回放 {total} 帧: {cache.directory}")
+        batch_size = max(256, self.app.inference_batch_size)
+        exception_counts = {}
+        frame_num = 0
+        start_time = time.perf_counter()
+        try:
+            while frame_num < total:
+                frame_nums = list(range(frame_num, min(frame_num + batch_size, total)))
+                self.app.current_frame = frame_nums[-1]
+                outputs = self.app.processing_ops.process_batch([None] * len(frame_nums), frame_nums, render=False)
+                for _, _, exceptions in outputs:
+                    for exception in exceptions.values():
+                        exception_counts[exception] = exception_counts.get(exception, 0) + 1
+                previous = frame_num
+                frame_num += len(frame_nums)
+                if progress_interval and frame_num // progress_interval > previous // progress_interval:
+                    self.app.event_log.flush()
+        finally:
+            self.app.event_log.flush(force=True)
+            track_log = self.app.tracked_data
+            with self.app.stats_lock:
+                self.app.processing_ops.open_track_log(None)
+            cache.close()
+
+        elapsed = time.perf_counter() - start_time
+        summary = self.build_summary(frame_num, elapsed, exception_counts)
+        summary['detection_cache'] = {'path': cache.directory, 'replayed': True, 'saved_frames': 0,
+                                      'frames': cache.frames}
+        return self.finish(summary, output_dir, track_log)
+
+    def finish(self, summary, output_dir, track_log):
+        summary['track_log'] = {'path': track_log.output_dir, 'format': track_log.file_format,
+                                'rows': track_log.rows_written, 'files': len(track_log.files)}
+        summary['stage_latency'] = self.app.perf_monitor.snapshot()
+        with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"处理完成：{summary['frames']} 帧，耗时 {summary['elapsed_seconds']:.1f} 秒，"
+              f"平均 {summary['processing_fps']:.1f} FPS（{summary['realtime_factor']:.1f} 倍实时）")
+        return summary
+
+    def build_summary(self, frames, elapsed, exception_counts):
+        report = self.app.processing_ops.get_throughput_report()
+        processing_fps = frames / elapsed if elapsed > 0 else 0.0
+        return {
+            'video_path': self.app.video_path,
+            'frames': frames,
+            'elapsed_seconds': elapsed,
+            'processing_fps': processing_fps,
+            'realtime_factor': processing_fps / self.app.fps if self.app.fps else 0.0,
+            'inference_backend': self.app.inference_backend + (' int8' if self.app.inference_int8 else ''),
+            'inference_batch_size': self.app.inference_batch_size,
+            'first_inference_ms': self.app.processing_ops.first_inference_ms,
+            'latency_mean_ms': report['latency_mean_ms'],
+            'latency_p95_ms': report['latency_p95_ms'],
+            'current_flow_rate': self.app.current_flow_rate,
+            'flow_history': self.app.flow_series.history()[1].tolist(),
+            'flow_rollups': self.app.flow_series.summary(),
+            'zone_counts': self.app.counting_zones.summary() if self.app.counting_zones is not None else {},
+            'vehicle_type_counts': dict(self.app.vehicle_type_counts),
+            'speed': self.app.speed_stats.summary(),
+            'speed_method': 'ground_calibration' if self.app.ground_calibration is not None else 'vehicle_length',
+            'exception_counts': exception_counts,
+            'live_tracks': self.app.track_store.live_count,
+            'evicted_tracks': self.app.track_store.evicted_count,
+        }
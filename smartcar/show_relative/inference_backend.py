@@ -0,0 +1,126 @@
+import os
+import shutil
+import importlib.util
+
+# 可选的推理后端及其所需的 Python 包（pt 即 ultralytics 自带的 PyTorch 推理）
+BACKEND_PACKAGES = {
+    'pt': None,
+    'onnx': 'onnxruntime',
+    'openvino': 'openvino',
+}
+
+
+def exported_path(weights, backend, int8=False):
+    """
+    导出模型在权重文件旁的缓存位置，命名与 ultralytics 的导出结果一致。
+    :param weights: PyTorch 权重路径，例如 model_data/best.pt
+    :param backend: 'pt' / 'onnx' / 'openvino'
+    :param int8: 是否为 INT8 量化版本
+    """
+    stem = os.path.splitext(weights)[0]
+    if backend == 'pt':
+        return weights
+    if backend == 'onnx':
+        return f"{stem}.int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == 'openvino':
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    raise ValueError(f"不支持的推理后端: {backend}")
+
+
+def is_fresh(path, weights):
+    """缓存存在且不早于权重文件时可直接使用。"""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights)
+
+
+def check_backend(backend):
+    if backend not in BACKEND_PACKAGES:
+        raise ValueError(f"不支持的推理后端: {backend}")
+    package = BACKEND_PACKAGES[backend]
+    if package is not None and importlib.util.find_spec(package) is None:
+        raise ImportError(f"推理后端 {backend} 需要安装 {package}")
+
+
+def export_model(weights, backend, int8=False, imgsz=640):
+    """
+    导出并缓存 ONNX / OpenVINO 模型，已有较新的缓存时直接返回其路径。
+    导出使用动态输入尺寸，批量推理与 ROI 缩小后的推理尺寸都能直接使用。
+    ONNX 的 INT8 版本由 onnxruntime 对 FP32 模型做动态量化得到，OpenVINO 的 INT8 版本由 ultralytics 导出时量化。
+    :return: 导出模型的路径
+    """
+    check_backend(backend)
+    target = exported_path(weights, backend, int8)
+    if backend == 'pt' or is_fresh(target, weights):
+        return target
+
+    from ultralytics import YOLO
+
+    if backend == 'onnx':
+        fp32 = exported_path(weights, 'onnx')
+        if not is_fresh(fp32, weights):
+            print(f"导出 ONNX 模型: {fp32}")
+            produced = YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+            if os.path.abspath(produced) != os.path.abspath(fp32):
+                shutil.move(produced, fp32)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            print(f"量化 ONNX 模型为 INT8: {target}")
+            quantize_dynamic(fp32, target, weight_type=QuantType.QUInt8)
+            # 量化后的文件不含 ultralytics 的元数据，补上类别名等信息，加载时才能识别为检测模型
+            copy_onnx_metadata(fp32, target)
+        return target
+
+    print(f"导出 OpenVINO 模型{'（INT8）' if int8 else ''}: {target}")
+    produced = YOLO(weights).export(format='openvino', imgsz=imgsz, dynamic=True, int8=int8)
+    if os.path.abspath(produced.rstrip(os.sep)) != os.path.abspath(target):
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.move(produced, target)
+    return target
+
+
+def copy_onnx_metadata(source, target):
+    import onnx
+
+    source_model = onnx.load(source, load_external_data=False)
+    target_model = onnx.load(target)
+    existing = {prop.key for prop in target_model.metadata_props}
+    for prop in source_model.metadata_props:
+        if prop.key not in existing:
+            entry = target_model.metadata_props.add()
+            entry.key, entry.value = prop.key, prop.value
+    onnx.save(target_model, target)
+
+
+def warm_up(model, imgsz=640, runs=1):
+    """
+    用全黑图像执行推理，提前完成权重搬运、算子选择与内存分配等延迟初始化，避免首个真实帧出现延迟尖峰。
+    :return: 最后一次预热推理的耗时（毫秒）
+    """
+    import time
+    import numpy as np
+
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    elapsed = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.predict(dummy, imgsz=imgsz, verbose=False)
+        elapsed = (time.perf_counter() - start) * 1000
+    return elapsed
+
+
+def load_vehicle_model(weights, backend='pt', int8=False, device=None, imgsz=640):
+    """
+    按所选后端加载车辆检测模型，返回的 YOLO 对象与 PyTorch 版本用法相同（predict / track + ByteTrack）。
+    :param device: 仅对 pt 后端生效；ONNX / OpenVINO 由各自运行时选择执行设备
+    """
+    from ultralytics import YOLO
+
+    if backend == 'pt':
+        if int8:
+            print("PyTorch 后端不支持 INT8，忽略该选项。")
+        model = YOLO(weights)
+        if device is not None:
+            model.to(device)
+        return model
+    return YOLO(export_model(weights, backend, int8, imgsz), task='detect')
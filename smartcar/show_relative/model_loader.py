@@ -0,0 +1,72 @@
+import threading
+import time
+from tkinter import messagebox
+from .inference_backend import load_vehicle_model, warm_up
+
+
+class ModelLoader:
+    """
+    在后台线程中加载并预热车辆检测模型，窗口可以立即显示，加载期间即可上传和播放视频。
+    主线程定时轮询加载状态并更新状态栏；模型预热完成前不允许开始车辆检测。
+    """
+    def __init__(self, app_instance, poll_interval=200):
+        self.app = app_instance
+        self.poll_interval = poll_interval
+        self.ready = threading.Event()
+        self.error = None
+        self.stage = "加载中"
+        self.start_time = None
+        self.load_seconds = None
+        self.warmup_ms = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        threading.Thread(target=self.load, daemon=True).start()
+        self.app.root.after(self.poll_interval, self.poll)
+
+    def load(self):
+        try:
+            import torch
+
+            self.app.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            print(f"加载 YOLO 模型用于车辆检测（后端: {self.app.inference_backend}"
+                  f"{' INT8' if self.app.inference_int8 else ''}）...")
+            model = load_vehicle_model(self.app.weights, self.app.inference_backend, self.app.inference_int8,
+                                       self.app.device)
+            self.load_seconds = time.perf_counter() - self.start_time
+            self.stage = "预热中"
+            self.warmup_ms = warm_up(model)
+            self.app.vehicle_model = model
+            self.ready.set()
+            print(f"YOLO 模型加载成功：加载 {self.load_seconds:.1f} 秒，预热推理 {self.warmup_ms:.0f} ms，"
+                  f"自启动起共 {time.perf_counter() - self.app.startup_time:.1f} 秒。")
+        except Exception as e:
+            self.error = e
+            print(f"加载 YOLO 模型时发生错误: {e}")
+
+    @property
+    def status_text(self):
+        if self.ready.is_set():
+            return "模型已就绪"
+        if self.error is not None:
+            return "模型加载失败"
+        return f"模型{self.stage}... {time.perf_counter() - self.start_time:.0f}s"
+
+    def poll(self):
+        self.app.model_status_label.config(text=self.status_text,
+                                           fg="green" if self.ready.is_set() else
+                                           "red" if self.error is not None else "orange")
+        if self.error is not None:
+            messagebox.showerror("错误", f"加载 YOLO 模型失败：{self.error}")
+        elif not self.ready.is_set():
+            self.app.root.after(self.poll_interval, self.poll)
+
+    def check_ready(self):
+        """开始车辆检测前调用：模型未就绪时提示用户并返回 False。"""
+        if self.ready.is_set():
+            return True
+        if self.error is not None:
+            messagebox.showerror("错误", f"YOLO 模型加载失败，无法进行车辆检测：{self.error}")
+        else:
+            messagebox.showinfo("提示", "YOLO 模型仍在加载，请稍后再开始车辆检测。")
+        return False
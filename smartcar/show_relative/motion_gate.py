@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+GATE_DUPLICATE = 'duplicate'
+GATE_STATIC = 'static'
+GATE_MOTION = 'motion'
+
+
+class MotionGate:
+    """
+    推理前的运动门：帧被缩小为宽 width 像素的灰度图后与参考帧做差分。
+    与上一帧完全相同（摄像头重复读出）判为 duplicate；与最近一次运行检测的帧相比，
+    差值超过 pixel_threshold 的像素比例低于 motion_ratio 判为 static，其余为 motion。
+    连续 max_reuse 帧判为 static 后强制判为 motion，避免缓慢变化长期得不到检测。
+    """
+    def __init__(self, motion_ratio=0.002, pixel_threshold=12, width=160, max_reuse=30):
+        self.motion_ratio = motion_ratio
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.max_reuse = max_reuse
+        self.mask = None
+        self.reset()
+
+    def reset(self):
+        self.previous = None
+        self.reference = None
+        self.reused = 0
+        self.counts = {GATE_DUPLICATE: 0, GATE_STATIC: 0, GATE_MOTION: 0}
+
+    def downsample(self, frame):
+        height = max(1, int(round(frame.shape[0] * self.width / frame.shape[1])))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def set_mask(self, frame_mask):
+        """只统计 ROI 内的像素变化；frame_mask 为整帧大小的 0/1 掩膜，None 表示整帧。"""
+        if frame_mask is None:
+            self.mask = None
+            return
+        height = max(1, int(round(frame_mask.shape[0] * self.width / frame_mask.shape[1])))
+        self.mask = cv2.resize(frame_mask, (self.width, height), interpolation=cv2.INTER_NEAREST)
+
+    def check(self, frame, wants_detection=True):
+        """
+        :param frame: BGR 图像
+        :param wants_detection: 本帧原计划运行检测；为 False 时只做重复帧判断，不更新参考帧
+        :return: GATE_DUPLICATE / GATE_STATIC / GATE_MOTION
+        """
+        small = self.downsample(frame)
+        if self.mask is not None and self.mask.shape != small.shape:
+            self.mask = None
+        previous, self.previous = self.previous, small
+        if previous is not None and previous.shape == small.shape and not cv2.absdiff(previous, small).any():
+            self.counts[GATE_DUPLICATE] += 1
+            return GATE_DUPLICATE
+        if not wants_detection:
+            return GATE_MOTION
+
+        state = GATE_MOTION
+        if self.reference is not None and self.reference.shape == small.shape and self.reused < self.max_reuse:
+            changed = cv2.absdiff(self.reference, small) > self.pixel_threshold
+            if self.mask is not None:
+                changed &= self.mask.astype(bool)
+                total = max(1, int(np.count_nonzero(self.mask)))
+            else:
+                total = changed.size
+            if np.count_nonzero(changed) < self.motion_ratio * total:
+                state = GATE_STATIC
+
+        if state == GATE_STATIC:
+            self.reused += 1
+        else:
+            self.reference = small
+            self.reused = 0
+        self.counts[state] += 1
+        return state
+
+    @property
+    def hit_rate(self):
+        """被门拦下（重复帧或静止帧）的比例，即省下的推理次数占比。"""
+        total = sum(self.counts.values())
+        return (self.counts[GATE_DUPLICATE] + self.counts[GATE_STATIC]) / total if total else 0.0
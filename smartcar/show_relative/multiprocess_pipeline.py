@@ -0,0 +1,293 @@
+import os
+import json
+import queue
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+
+from .detection_batch import DetectionBatch
+from .frame_reader import MediaClock
+from .headless_operations import HeadlessApp, HeadlessOperations
+
+# 各进程在共享统计数组中的行号；每行依次为 CPU 时间、忙碌时间（秒）与已处理帧数
+STAGES = ('decode', 'inference', 'analytics')
+STAGE_LABELS = {'decode': "解码", 'inference': "推理", 'analytics': "分析"}
+STAT_FIELDS = 3
+
+
+class SharedFramePool:
+    """
+    多进程共享的帧槽位：一块 SharedMemory 按帧大小切成 num_slots 个槽位，各进程以槽位号传递帧，不做任何序列化。
+    空闲槽位号保存在 multiprocessing 队列中，由分析进程用完后归还给解码进程。
+    """
+    def __init__(self, num_slots, shape, name=None):
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=num_slots * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buffer = np.ndarray((num_slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def frame(self, index):
+        return self.buffer[index]
+
+    def close(self):
+        del self.buffer
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def record_stage(stats, stage, cpu, busy, frames):
+    row = STAGES.index(stage) * STAT_FIELDS
+    stats[row:row + STAT_FIELDS] = [cpu, busy, frames]
+
+
+def decode_worker(video_path, shm_name, num_slots, shape, free_slots, decoded, max_frames, stats):
+    """
+    解码进程：把视频逐帧直接解码进空闲槽位，(槽位号, 帧号, 媒体时间, 解码完成时刻) 交给推理进程，结束时发送 None。
+    """
+    pool = SharedFramePool(num_slots, shape, shm_name)
+    cap = cv2.VideoCapture(video_path)
+    clock = MediaClock(cap.get(cv2.CAP_PROP_FPS))
+    busy, frame_num, cpu_start = 0.0, 0, time.process_time()
+    try:
+        while max_frames is None or frame_num < max_frames:
+            index = free_slots.get()
+            begin = time.perf_counter()
+            ret, frame = cap.read(pool.frame(index))
+            if not ret:
+                break
+            if frame is not pool.frame(index):
+                cv2.resize(frame, (shape[1], shape[0]), dst=pool.frame(index))
+            timestamp = clock.stamp(cap)
+            busy += time.perf_counter() - begin
+            decoded.put((index, frame_num, timestamp, time.perf_counter()))
+            frame_num += 1
+            if frame_num % 30 == 0:
+                record_stage(stats, 'decode', time.process_time() - cpu_start, busy, frame_num)
+    finally:
+        record_stage(stats, 'decode', time.process_time() - cpu_start, busy, frame_num)
+        cap.release()
+        decoded.put(None)
+        pool.close()
+
+
+def inference_worker(settings, shm_name, num_slots, shape, decoded, detected, stats):
+    """
+    推理进程：加载模型后以与单进程相同的 detect_vehicles_batch（含 ROI 裁剪与 ByteTrack 跟踪）批量推理，
+    每帧结果以 (槽位号, 帧号, 媒体时间, 解码时刻, ids, class_ids, boxes, confidences) 的紧凑数组发给分析进程。
+    """
+    pool = SharedFramePool(num_slots, shape, shm_name)
+    try:
+        app = HeadlessApp(settings['weights'], settings['device'], settings['backend'], settings['int8'])
+        for key, value in settings['attributes'].items():
+            setattr(app, key, value)
+        app.init_models()
+        app.processing_ops.configure_source(settings['video_path'], shape, app.roi_polygons)
+        detected.put(('ready', dict(app.vehicle_model.names)))
+    except Exception as e:
+        detected.put(('error', f"推理进程初始化失败: {e}"))
+        pool.close()
+        return
+
+    busy, frames_done, cpu_start = 0.0, 0, time.process_time()
+    finished = False
+    try:
+        while not finished:
+            items = [decoded.get()]
+            while items[-1] is not None and len(items) < app.inference_batch_size:
+                try:
+                    items.append(decoded.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                finished = True
+                items.pop()
+            if not items:
+                break
+            begin = time.perf_counter()
+            batches = app.processing_ops.detect_vehicles_batch([pool.frame(item[0]) for item in items])
+            busy += time.perf_counter() - begin
+            for (index, frame_num, timestamp, decoded_at), batch in zip(items, batches):
+                detected.put((index, frame_num, timestamp, decoded_at, batch.ids, batch.class_ids, batch.boxes.astype(np.int32),
+                              batch.confidences))
+            frames_done += len(items)
+            record_stage(stats, 'inference', time.process_time() - cpu_start, busy, frames_done)
+    except Exception as e:
+        detected.put(('error', f"推理进程发生错误: {e}"))
+    finally:
+        record_stage(stats, 'inference', time.process_time() - cpu_start, busy, frames_done)
+        detected.put(None)
+        pool.close()
+
+
+class MultiprocessOperations(HeadlessOperations):
+    """
+    多进程批处理：解码、推理、分析与绘制分别在三个进程中运行，互不争用 GIL。
+    帧放在共享内存槽位中只传递槽位号，推理结果以紧凑数组回传；本进程（分析进程）负责
+    测速、流量、异常分析、跟踪日志与视频输出，并统计各进程的 CPU 占用与忙碌比例。
+    自适应检测步长与运动门依赖同一进程内的逐帧调度，本模式下不启用。
+    """
+    def run(self, video_path, output_dir, save_video=False, max_frames=None, progress_interval=100):
+        probe = cv2.VideoCapture(video_path)
+        if not probe.isOpened():
+            raise IOError(f"无法打开视频: {video_path}")
+        shape = (int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(probe.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        self.app.fps = probe.get(cv2.CAP_PROP_FPS) or 30
+        self.app.total_frames = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        probe.release()
+        if self.app.target_latency_ms > 0 or self.app.motion_gate_ratio > 0:
+            print("多进程模式下不启用自适应检测步长与运动门。")
+            self.app.target_latency_ms = 0.0
+            self.app.motion_gate_ratio = 0.0
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.app.video_path = video_path
+        self.app.y_max = shape[0]
+        self.app.line_y = int(self.app.y_max * 0.5)
+        self.app.current_vehicle_id = 0
+
+        # 槽位数覆盖解码队列、推理中的一整批与分析中的帧
+        batch_size = max(1, self.app.inference_batch_size)
+        num_slots = self.app.prefetch_size + 2 * batch_size + 2
+        pool = SharedFramePool(num_slots, shape)
+        context = mp.get_context('spawn')
+        free_slots = context.Queue()
+        for index in range(num_slots):
+            free_slots.put(index)
+        decoded = context.Queue(maxsize=self.app.prefetch_size)
+        detected = context.Queue()
+        stats = context.Array('d', len(STAGES) * STAT_FIELDS, lock=False)
+        settings = {
+            'weights': self.app.weights, 'device': self.app.device,
+            'backend': self.app.inference_backend, 'int8': self.app.inference_int8,
+            'video_path': video_path,
+            'attributes': {key: getattr(self.app, key) for key in (
+                'conf_threshold', 'iou_threshold', 'inference_batch_size', 'roi_polygons', 'source_config_path')},
+        }
+        workers = [
+            context.Process(target=decode_worker, name="decode", daemon=True,
+                            args=(video_path, pool.name, num_slots, shape, free_slots, decoded, max_frames, stats)),
+            context.Process(target=inference_worker, name="inference", daemon=True,
+                            args=(settings, pool.name, num_slots, shape, decoded, detected, stats)),
+        ]
+        for worker in workers:
+            worker.start()
+
+        writer = None
+        exception_counts = {}
+        frame_num = 0
+        start_time = time.perf_counter()
+        busy = 0.0
+        try:
+            names = self.wait_ready(detected, workers)
+            print(f"推理进程就绪，用时 {time.perf_counter() - start_time:.1f} 秒。")
+            track_log_dir = os.path.join(output_dir, "track_log")
+            with self.app.stats_lock:
+                self.app.processing_ops.reset_statistics(track_log_dir)
+                self.app.processing_ops.configure_source(video_path, shape, self.app.roi_polygons)
+            if save_video:
+                writer = cv2.VideoWriter(os.path.join(output_dir, "processed.mp4"),
+                                         cv2.VideoWriter_fourcc(*"mp4v"), self.app.fps, (shape[1], shape[0]))
+            start_time = time.perf_counter()
+            cpu_start = time.process_time()
+            while True:
+                item = self.next_result(detected, workers)
+                if item is None:
+                    break
+                index, current, timestamp, decoded_at, ids, class_ids, boxes, confidences = item
+                begin = time.perf_counter()
+                try:
+                    batch = DetectionBatch(ids, class_ids, boxes, confidences, names)
+                    self.app.current_frame = current
+                    processed_frame, _, exceptions = self.app.processing_ops.process_frame(
+                        pool.frame(index), current, render=writer is not None, in_place=True, detections=batch,
+                        timestamp=timestamp)
+                    for exception in exceptions.values():
+                        exception_counts[exception] = exception_counts.get(exception, 0) + 1
+                    if writer is not None:
+                        writer.write(processed_frame)
+                finally:
+                    free_slots.put(index)
+                now = time.perf_counter()
+                busy += now - begin
+                self.app.processing_ops.record_latency(now - decoded_at)
+                frame_num += 1
+                record_stage(stats, 'analytics', time.process_time() - cpu_start, busy, frame_num)
+                if progress_interval and frame_num % progress_interval == 0:
+                    elapsed = now - start_time
+                    utilisation = self.utilisation(stats, elapsed)
+                    print(f"已处理 {frame_num} / {self.app.total_frames} 帧，{frame_num / elapsed:.1f} FPS；" +
+                          "，".join(f"{STAGE_LABELS[stage]} CPU {u['cpu']:.0%} 忙碌 {u['busy']:.0%}"
+                                    for stage, u in utilisation.items()))
+                    self.app.event_log.flush()
+        finally:
+            self.app.event_log.flush(force=True)
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            if writer is not None:
+                writer.release()
+            track_log = self.app.tracked_data
+            with self.app.stats_lock:
+                self.app.processing_ops.open_track_log(None)
+            pool.close()
+            pool.unlink()
+
+        elapsed = time.perf_counter() - start_time
+        summary = self.build_summary(frame_num, elapsed, exception_counts)
+        summary['pipeline'] = 'multiprocess'
+        summary['process_utilisation'] = self.utilisation(stats, elapsed)
+        # 解码与推理在子进程中，这里只有分析进程各阶段的延迟
+        summary['stage_latency'] = self.app.perf_monitor.snapshot()
+        if track_log is not None:
+            summary['track_log'] = {'path': track_log.output_dir, 'format': track_log.file_format,
+                                    'rows': track_log.rows_written, 'files': len(track_log.files)}
+        with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"处理完成：{frame_num} 帧，耗时 {elapsed:.1f} 秒，"
+              f"平均 {summary['processing_fps']:.1f} FPS（{summary['realtime_factor']:.1f} 倍实时）")
+        return summary
+
+    def next_result(self, detected, workers):
+        """取下一帧推理结果；推理进程报错或异常退出时抛出 RuntimeError，处理完毕返回 None。"""
+        while True:
+            try:
+                item = detected.get(timeout=1)
+            except queue.Empty:
+                if not workers[1].is_alive():
+                    raise RuntimeError(f"推理进程意外退出（退出码 {workers[1].exitcode}）")
+                continue
+            if item is not None and item[0] == 'error':
+                raise RuntimeError(item[1])
+            return item
+
+    def wait_ready(self, detected, workers):
+        item = self.next_result(detected, workers)
+        if item is None or item[0] != 'ready':
+            raise RuntimeError("推理进程未能就绪")
+        return item[1]
+
+    @staticmethod
+    def utilisation(stats, elapsed):
+        """各进程的 CPU 占用（可超过 100%，表示使用了多个核）与忙碌比例（扣除等待队列的时间）。"""
+        report = {}
+        for i, stage in enumerate(STAGES):
+            cpu, busy, frames = stats[i * STAT_FIELDS:(i + 1) * STAT_FIELDS]
+            report[stage] = {
+                'cpu': cpu / elapsed if elapsed > 0 else 0.0,
+                'busy': busy / elapsed if elapsed > 0 else 0.0,
+                'frames': int(frames),
+            }
+        return report
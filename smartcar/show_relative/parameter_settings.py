@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import Toplevel, Frame, Button, Label, Entry, messagebox
+from tkinter import Toplevel, Frame, Button, Label, Entry, Canvas, Scrollbar, messagebox
 
 class ParameterSettings:
     def __init__(self, app_instance):
@@ -9,9 +9,41 @@ class ParameterSettings:
         # ... (Copy from original file's open_parameter_settings method)
         params_window = Toplevel(self.app.root)
         params_window.title("参数设置")
-        params_window.geometry("600x750")
-        params_window.resizable(False, False)
-        
+        # 参数较多时窗口高度以屏幕为限，表单放在可滚动区域中，确定按钮固定在底部始终可见
+        height = min(1050, params_window.winfo_screenheight() - 120)
+        params_window.geometry(f"600x{height}")
+        params_window.minsize(400, 300)
+
+        Button(params_window,
+              text="确 定",
+              command=lambda: self.set_parameters(params_window),
+              font=("", 12),
+              width=10).pack(side="bottom", pady=(10, 15))
+        canvas = Canvas(params_window, highlightthickness=0)
+        scrollbar = Scrollbar(params_window, orient="vertical", command=canvas.yview)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        canvas.pack(side="left", fill="both", expand=True)
+        form = Frame(canvas)
+        form_id = canvas.create_window((0, 0), window=form, anchor="nw")
+        form.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.bind("<Configure>", lambda e: canvas.itemconfigure(form_id, width=e.width))
+
+        def on_mousewheel(event):
+            if event.num == 4 or event.delta > 0:
+                canvas.yview_scroll(-1, "units")
+            else:
+                canvas.yview_scroll(1, "units")
+
+        def on_destroy(event):
+            if event.widget is params_window:
+                for sequence in wheel_sequences:
+                    params_window.unbind_all(sequence)
+        wheel_sequences = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+        for sequence in wheel_sequences:
+            params_window.bind_all(sequence, on_mousewheel)
+        params_window.bind("<Destroy>", on_destroy)
+
         title_font = ("", 12, "bold")
         desc_font = ("", 12)
         entry_width = 25
@@ -28,45 +60,60 @@ class ParameterSettings:
             return entry
         
         self.app.entry_lanes = create_param_section(
-            params_window,
+            form,
             "车道数 (1-10)",
             "（设置视频中的车道数量，用于计算车流量）",
             self.app.number_of_lanes
         )
         
         self.app.entry_speed = create_param_section(
-            params_window,
+            form,
             "速度阈值 (1-200 km/h)",
             "（设置检测车辆的速度阈值，超过这个值会被判定为超速异常）",
             self.app.speed_threshold
         )
         
         self.app.entry_angle = create_param_section(
-            params_window,
+            form,
             "轨迹角度阈值 (1-180 度)",
             "（设置车辆轨迹角度，变化超过此值时触发异常检测）",
             self.app.angle_threshold
         )
         
         self.app.entry_conf = create_param_section(
-            params_window,
+            form,
             "置信度阈值 (0.0-1.0)",
             "（设置检测框的最低置信度，预测概率高于此值的框才会显示）",
             self.app.conf_threshold
         )
         
         self.app.entry_iou = create_param_section(
-            params_window,
+            form,
             "IoU阈值 (0.0-1.0)",
             "（设置检测框的最小交并比（IoU），用于碰撞检测，框的重合度大于这个值才会被视为有碰撞异常）",
             self.app.iou_threshold
         )
         
-        Button(params_window,
-              text="确 定",
-              command=lambda: self.set_parameters(params_window),
-              font=("", 12),
-              width=10).pack(pady=(15, 20))
+        self.app.entry_batch = create_param_section(
+            form,
+            "推理批大小 (1-32)",
+            "（处理视频文件时一次送入模型推理的帧数，增大可提高离线吞吐，但会增加单帧延迟）",
+            self.app.inference_batch_size
+        )
+        
+        self.app.entry_target_latency = create_param_section(
+            form,
+            "目标延迟 (0-1000 ms)",
+            "（处理跟不上时自动增大检测步长，跳过的帧按恒速运动模型外推检测框；0 表示每帧都检测）",
+            self.app.target_latency_ms
+        )
+        
+        self.app.entry_motion_gate = create_param_section(
+            form,
+            "运动门阈值 (0.0-0.1)",
+            "（画面中变化像素的比例低于此值时沿用上一次检测结果，与上一帧完全相同的重复帧直接跳过；0 表示关闭）",
+            self.app.motion_gate_ratio
+        )
 
     def set_parameters(self, window):
         # ... (Copy from original file's set_parameters method)
@@ -75,6 +122,9 @@ class ParameterSettings:
         angle = self.app.entry_angle.get()
         conf = self.app.entry_conf.get()
         iou = self.app.entry_iou.get()
+        batch = self.app.entry_batch.get()
+        target_latency = self.app.entry_target_latency.get()
+        motion_gate = self.app.entry_motion_gate.get()
 
         try:
             lanes = int(lanes)
@@ -116,18 +166,49 @@ class ParameterSettings:
             messagebox.showerror("输入错误", "IoU阈值必须是0.0到1.0之间的数字。")
             return
 
+        try:
+            batch = int(batch)
+            if not (1 <= batch <= 32):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("输入错误", "推理批大小必须是1到32之间的整数。")
+            return
+
+        try:
+            target_latency = float(target_latency)
+            if not (0.0 <= target_latency <= 1000.0):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("输入错误", "目标延迟必须是0到1000之间的数字。")
+            return
+
+        try:
+            motion_gate = float(motion_gate)
+            if not (0.0 <= motion_gate <= 0.1):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("输入错误", "运动门阈值必须是0.0到0.1之间的数字。")
+            return
+
         with self.app.stats_lock:
             self.app.number_of_lanes = lanes
             self.app.speed_threshold = speed
             self.app.angle_threshold = angle
             self.app.conf_threshold = conf
             self.app.iou_threshold = iou
+            self.app.inference_batch_size = batch
+            if target_latency != self.app.target_latency_ms or motion_gate != self.app.motion_gate_ratio:
+                self.app.processing_ops.reset_motion()
+            self.app.target_latency_ms = target_latency
+            self.app.motion_gate_ratio = motion_gate
 
         print(f"参数已设置：车道数={self.app.number_of_lanes}, 速度阈值={self.app.speed_threshold} km/h, "
               f"轨迹角度阈值={self.app.angle_threshold} 度, 置信度阈值={self.app.conf_threshold}, "
-              f"IoU阈值={self.app.iou_threshold}")
+              f"IoU阈值={self.app.iou_threshold}, 推理批大小={self.app.inference_batch_size}, "
+              f"目标延迟={self.app.target_latency_ms} ms, 运动门阈值={self.app.motion_gate_ratio}")
         messagebox.showinfo("成功",
                             f"参数已设置：\n车道数={self.app.number_of_lanes}\n速度阈值={self.app.speed_threshold} km/h\n"
                             f"轨迹角度阈值={self.app.angle_threshold} 度\n置信度阈值={self.app.conf_threshold}\n"
-                            f"IoU阈值={self.app.iou_threshold}")
+                            f"IoU阈值={self.app.iou_threshold}\n推理批大小={self.app.inference_batch_size}\n"
+                            f"目标延迟={self.app.target_latency_ms} ms\n运动门阈值={self.app.motion_gate_ratio}")
         window.destroy() 
\ No newline at end of file
@@ -0,0 +1,180 @@
+import json
+import math
+import threading
+import time
+import numpy as np
+
+# 处理流程各阶段，按帧经过的先后顺序排列，报告与性能面板按此顺序显示。
+# 推理包括 ROI 裁剪、模型跟踪与结果解析；后处理为重叠框过滤；分析包括测速、流量、异常与跟踪日志
+PIPELINE_STAGES = {
+    'decode': "解码",
+    'queue_wait': "排队等待",
+    'inference': "推理",
+    'postprocess': "后处理",
+    'analytics': "分析",
+    'overlay': "绘制",
+    'display': "显示转换",
+    'blit': "界面贴图",
+    'frame_total': "单帧总延迟",
+}
+
+
+class LatencyHistogram:
+    """
+    固定对数分桶的滚动延迟直方图：0.01 ms ~ 100 s 按约 5% 的相对精度分桶，
+    按 slice_seconds 切片计数，只保留最近 slices 个切片，分位数由累计计数直接查表。
+    计数用 Python 列表保存，记录一次只是一次列表元素自增，只在生成报告时才转为数组。
+    """
+    MIN_MS = 0.01
+    GROWTH = 1.05
+
+    def __init__(self, window_seconds=10.0, slices=10):
+        self.bins = int(math.ceil(math.log(1e7) / math.log(self.GROWTH))) + 1
+        self.log_growth = math.log(self.GROWTH)
+        self.slice_seconds = window_seconds / slices
+        self.counts = [[0] * self.bins for _ in range(slices)]
+        self.totals = [0.0] * slices
+        self.maxima = [0.0] * slices
+        self.current = int(time.monotonic() / self.slice_seconds)
+        # 分桶上沿（毫秒），查分位数时返回所在分桶的上沿，偏大不超过 5%
+        self.edges = self.MIN_MS * self.GROWTH ** np.arange(1, self.bins + 1)
+
+    def advance(self, now):
+        index = int(now / self.slice_seconds)
+        if index != self.current:
+            slices = len(self.counts)
+            for step in range(1, min(index - self.current, slices) + 1):
+                row = (self.current + step) % slices
+                self.counts[row] = [0] * self.bins
+                self.totals[row] = 0.0
+                self.maxima[row] = 0.0
+            self.current = index
+        return index % len(self.counts)
+
+    def record(self, milliseconds, count=1):
+        row = self.advance(time.monotonic())
+        if milliseconds <= self.MIN_MS:
+            column = 0
+        else:
+            column = min(int(math.log(milliseconds / self.MIN_MS) / self.log_growth), self.bins - 1)
+        self.counts[row][column] += count
+        self.totals[row] += milliseconds * count
+        if milliseconds > self.maxima[row]:
+            self.maxima[row] = milliseconds
+
+    def summary(self, percentiles=(50, 95, 99)):
+        self.advance(time.monotonic())
+        counts = np.asarray(self.counts, dtype=np.int64).sum(axis=0)
+        total = int(counts.sum())
+        maximum = max(self.maxima)
+        result = {'count': total, 'mean_ms': sum(self.totals) / total if total else 0.0, 'max_ms': maximum}
+        cumulative = np.cumsum(counts)
+        for p in percentiles:
+            edge = float(self.edges[np.searchsorted(cumulative, total * p / 100)]) if total else 0.0
+            result[f'p{p}_ms'] = min(edge, maximum)
+        return result
+
+
+class PerfMonitor:
+    """
+    处理流程的性能监控：各阶段的滚动延迟直方图（p50 / p95 / p99）、各队列的当前与峰值深度以及丢帧计数。
+    各线程只需调用 record() / drop()，开销为一次加锁与几次整数运算，可在生产环境中常开。
+    """
+    def __init__(self, window_seconds=10.0):
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.queues = {}
+        self.queue_peaks = {}
+        self.drops = {}
+        self.started = time.time()
+
+    def record(self, stage, seconds, count=1):
+        """记录 count 帧在 stage 阶段各耗时 seconds 秒。"""
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram(self.window_seconds)
+            histogram.record(seconds * 1000, count)
+
+    def drop(self, reason, count=1):
+        with self.lock:
+            self.drops[reason] = self.drops.get(reason, 0) + count
+
+    def register_queue(self, name, depth, capacity):
+        """
+        登记一个队列，depth / capacity 为返回当前深度与容量的函数，深度在 sample_queues() 时读取。
+        """
+        with self.lock:
+            self.queues[name] = (depth, capacity)
+            self.queue_peaks[name] = 0
+
+    def unregister_queue(self, name):
+        with self.lock:
+            self.queues.pop(name, None)
+            self.queue_peaks.pop(name, None)
+
+    def sample_queues(self):
+        """读取各队列的当前深度并更新峰值，返回 {名称: (深度, 容量)}。"""
+        with self.lock:
+            queues = dict(self.queues)
+        depths = {}
+        for name, (depth, capacity) in queues.items():
+            try:
+                depths[name] = (depth(), capacity())
+            except Exception:
+                continue
+        with self.lock:
+            for name, (depth, _) in depths.items():
+                if name in self.queue_peaks:
+                    self.queue_peaks[name] = max(self.queue_peaks[name], depth)
+        return depths
+
+    def snapshot(self):
+        depths = self.sample_queues()
+        with self.lock:
+            stages = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            peaks = dict(self.queue_peaks)
+            drops = dict(self.drops)
+        order = list(PIPELINE_STAGES)
+        return {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'uptime_seconds': time.time() - self.started,
+            'window_seconds': self.window_seconds,
+            'stages': {name: stages[name] for name in sorted(stages, key=lambda s: (
+                order.index(s) if s in order else len(order), s))},
+            'queues': {name: {'depth': depth, 'capacity': capacity, 'peak': peaks.get(name, depth)}
+                       for name, (depth, capacity) in depths.items()},
+            'drops': drops,
+        }
+
+    def format_report(self, snapshot=None):
+        """把快照格式化为文本表格，用于性能面板与控制台。"""
+        snapshot = snapshot or self.snapshot()
+        lines = [f"最近 {snapshot['window_seconds']:.0f} 秒  （{snapshot['time']}）",
+                 f"{'阶段':<10}{'帧数':>8}{'平均':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'最大':>9}  (ms)"]
+        for name, s in snapshot['stages'].items():
+            lines.append(f"{PIPELINE_STAGES.get(name, name):<10}{s['count']:>8}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}"
+                         f"{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.1f}")
+        if snapshot['queues']:
+            lines.append("")
+            lines.append(f"{'队列':<16}{'当前':>6}{'峰值':>6}{'容量':>6}")
+            for name, q in snapshot['queues'].items():
+                lines.append(f"{name:<16}{q['depth']:>6}{q['peak']:>6}{q['capacity']:>6}")
+        lines.append("")
+        lines.append("丢帧: " + ("，".join(f"{reason} {count}" for reason, count in snapshot['drops'].items())
+                                  if snapshot['drops'] else "无"))
+        return "\n".join(lines)
+
+    def dump(self, path):
+        snapshot = self.snapshot()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.drops = {}
+            self.queue_peaks = {name: 0 for name in self.queues}
+            self.started = time.time()
@@ -0,0 +1,50 @@
+import time
+import tkinter as tk
+from tkinter import Toplevel, Frame, Button, filedialog, messagebox
+
+
+class PerfPanel:
+    """性能面板：每秒刷新一次各阶段延迟分位数、队列深度与丢帧计数，可导出为 JSON 文件。"""
+    def __init__(self, app_instance, refresh_ms=1000):
+        self.app = app_instance
+        self.refresh_ms = refresh_ms
+        self.window = None
+        self.text = None
+
+    def show(self):
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            return
+        self.window = Toplevel(self.app.root)
+        self.window.title("性能监控")
+        self.window.geometry("640x480")
+        button_frame = Frame(self.window)
+        button_frame.pack(side=tk.TOP, fill=tk.X)
+        Button(button_frame, text="导出", command=self.export).pack(side=tk.LEFT, padx=5, pady=5)
+        Button(button_frame, text="重置", command=self.app.perf_monitor.reset).pack(side=tk.LEFT, padx=5, pady=5)
+        self.text = tk.Text(self.window, font=("Courier", 11), state='disabled', wrap='none')
+        self.text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.refresh()
+
+    def refresh(self):
+        if self.window is None or not self.window.winfo_exists():
+            self.window = None
+            return
+        report = self.app.perf_monitor.format_report()
+        self.text.configure(state='normal')
+        self.text.delete('1.0', tk.END)
+        self.text.insert(tk.END, report)
+        self.text.configure(state='disabled')
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(title="导出性能数据", defaultextension=".json",
+                                            initialfile=f"perf_{time.strftime('%Y%m%d_%H%M%S')}.json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            self.app.perf_monitor.dump(path)
+            print(f"性能数据已导出: {path}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出性能数据失败：{e}")
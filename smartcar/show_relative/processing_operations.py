@@ -1,17 +1,46 @@
-import tkinter as tk
 from tkinter import messagebox
 import cv2
 import numpy as np
 import time
 import math
+import os
 from .constants import VEHICLE_TYPE_DISTANCE, DEFAULT_DISTANCE
-from ultralytics.utils.plotting import Annotator, colors
+from .detection_batch import DetectionBatch
+from .track_state import TrackStateStore
+from .speed_statistics import SpeedStatistics
+from .track_log import TrackLogBuffer, EXCEPTION_CODES
+from .detection_stride import AdaptiveStride
+from .roi import RegionOfInterest
+from .motion_gate import MotionGate, GATE_DUPLICATE, GATE_STATIC, GATE_MOTION
+from .source_config import load_source_settings, source_key
+from .detection_cache import DetectionCache, cache_key
+from .flow_series import FlowSeries
+from .counting_zones import CountingZones
+from .ground_calibration import GroundCalibration
 from collections import deque
-import pandas as pd
+
+EXCEPTION_PRIORITY = {
+    'Speeding Exception': 1,
+    'Trajectory Exception': 2,
+    'Collision Exception': 3
+}
 
 class ProcessingOperations:
     def __init__(self, app_instance):
         self.app = app_instance
+        self.report_interval = 300
+        self.frame_latencies = deque(maxlen=self.report_interval)
+        self.throughput_frames = 0
+        self.throughput_start = None
+        self.detection_stride = AdaptiveStride()
+        # 最近一次真实检测的结果与各框的逐帧速度，供跳过检测的帧外推使用
+        self.motion_batch = None
+        self.motion_gate = MotionGate()
+        self.last_output = None
+        self.first_inference_ms = None
+        self.detection_cache = None
+        # 新的视频源或从第 0 帧重新推理前需要清空 ByteTrack 的跟踪状态
+        self.tracker_reset_pending = True
 
     def toggle_vehicle_detection(self):
         # ... (Copy from original file's toggle_vehicle_detection method)
@@ -26,6 +55,10 @@ class ProcessingOperations:
             if not self.app.video_path and not self.app.virtual_cam_playing:
                 messagebox.showerror("错误", "请先上传视频或连接摄像头。")
                 return
+            # 整段视频已有检测缓存时直接回放，不需要等待模型加载
+            cache = self.detection_cache
+            if not (cache is not None and cache.finished) and not self.app.model_loader.check_ready():
+                return
             self.app.is_vehicle_processing = True
             self.app.button_vehicle_detection.config(text="停止车辆检测")
             print("开始车辆检测。")
@@ -74,24 +107,29 @@ class ProcessingOperations:
             print("开始异常检测。")
 
     def calculate_speed(self, obj_id, current_x_center, current_y_center, previous_x_center, previous_y_center,
-                        y_pixels, class_name):
+                        y_pixels, class_name, ground_point=None):
         # ... (Copy from original file's calculate_speed method)
-        if obj_id not in self.app.prev_info:
-            self.app.prev_info[obj_id] = {
+        # ground_point 为车辆底边中点查标定表得到的路面坐标（米），未标定或不在标定范围内时为 None，按车型长度估算
+        state = self.app.track_store.touch(obj_id)
+        if state.prev_info is None:
+            state.prev_info = {
                 'x_center': current_x_center,
                 'y_center': current_y_center,
-                'frame_num': self.app.current_frame,
+                'frame_num': self.app.current_frame_num,
+                'timestamp': self.app.current_timestamp,
+                'ground_point': ground_point,
                 'real_distance_per_pixel': VEHICLE_TYPE_DISTANCE.get(class_name,
                                                                      DEFAULT_DISTANCE) / y_pixels if y_pixels > 0 else DEFAULT_DISTANCE
             }
             return 0.0
 
-        prev_frame = self.app.prev_info[obj_id]['frame_num']
-        prev_x_center = self.app.prev_info[obj_id]['x_center']
-        prev_y_center = self.app.prev_info[obj_id]['y_center']
-        prev_real_distance_per_pixel = self.app.prev_info[obj_id]['real_distance_per_pixel']
+        prev_info = state.prev_info
+        prev_frame = prev_info['frame_num']
+        prev_x_center = prev_info['x_center']
+        prev_y_center = prev_info['y_center']
+        prev_real_distance_per_pixel = prev_info['real_distance_per_pixel']
 
-        frame_gap = self.app.current_frame - prev_frame
+        frame_gap = self.app.current_frame_num - prev_frame
 
         if frame_gap <= 0:
             return 0.0
@@ -102,303 +140,739 @@ class ProcessingOperations:
         current_real_distance_per_pixel = VEHICLE_TYPE_DISTANCE.get(class_name,
                                                                     DEFAULT_DISTANCE) / y_pixels if y_pixels > 0 else prev_real_distance_per_pixel
 
-        average_real_distance_per_pixel = (prev_real_distance_per_pixel + current_real_distance_per_pixel) / 2
-        real_distance = average_real_distance_per_pixel * pixel_displacement
-        time_interval = frame_gap / self.app.fps
+        prev_ground_point = prev_info['ground_point']
+        if ground_point is not None and prev_ground_point is not None:
+            real_distance = math.hypot(ground_point[0] - prev_ground_point[0], ground_point[1] - prev_ground_point[1])
+        else:
+            average_real_distance_per_pixel = (prev_real_distance_per_pixel + current_real_distance_per_pixel) / 2
+            real_distance = average_real_distance_per_pixel * pixel_displacement
+        # 以两次观测的帧时间戳计时，处理快于或慢于实时、中途丢帧时速度仍然正确
+        time_interval = self.app.current_timestamp - prev_info['timestamp']
         speed_m_s = real_distance / time_interval if time_interval > 0 else 0
         speed_km_h = speed_m_s * 3.6
         speed_km_h = max(0, min(speed_km_h, 200))
 
-        self.app.prev_info[obj_id]['x_center'] = current_x_center
-        self.app.prev_info[obj_id]['y_center'] = current_y_center
-        self.app.prev_info[obj_id]['frame_num'] = self.app.current_frame
-        self.app.prev_info[obj_id]['real_distance_per_pixel'] = current_real_distance_per_pixel
+        prev_info['x_center'] = current_x_center
+        prev_info['y_center'] = current_y_center
+        prev_info['frame_num'] = self.app.current_frame_num
+        prev_info['timestamp'] = self.app.current_timestamp
+        prev_info['real_distance_per_pixel'] = current_real_distance_per_pixel
+        prev_info['ground_point'] = ground_point
 
         return speed_km_h
 
     def process_frames(self):
-        # ... (Copy from original file's process_frames method, ensure all self.app references are correct)
-        exception_priority = {
-            'Speeding Exception': 1,
-            'Trajectory Exception': 2,
-            'Collision Exception': 3
-        }
-
         while True:
             try:
-                frame, frame_num = self.app.raw_frame_queue.get(timeout=1)
-                if self.app.y_max is None or self.app.line_y is None:
-                    self.app.y_max = frame.shape[0]
-                    self.app.line_y = int(self.app.y_max * 0.5)
-
+                items = [self.app.raw_frame_queue.get(timeout=1)]
             except self.app.queue.Empty:
                 continue
 
-            processed_frame = frame.copy()
+            # 视频文件输入时，把队列中已解码的帧凑成一批统一推理
+            batch_size = 1 if self.app.virtual_cam_playing else max(1, self.app.inference_batch_size)
+            while len(items) < batch_size:
+                try:
+                    items.append(self.app.raw_frame_queue.get_nowait())
+                except self.app.queue.Empty:
+                    break
+            now = time.perf_counter()
+            available_times = [now] * len(items)
+            for slot, _ in items:
+                if slot.queued_at:
+                    self.app.perf_monitor.record('queue_wait', now - slot.queued_at)
+            backlog = self.app.raw_frame_queue.qsize() / max(1, self.app.raw_frame_queue.maxsize)
 
             with self.app.stats_lock:
                 self.app.processing = True
 
-            exceptions = {} 
-            detections = [] 
-
+            # 槽位的所有权随队列传递：处理线程直接在原槽位上绘制，再把同一槽位交给显示端
+            pending = list(items)
             try:
-                if self.app.is_vehicle_processing:
-                    self.app.vehicle_model.conf = self.app.conf_threshold
-                    self.app.vehicle_model.iou = self.app.iou_threshold
-                    self.app.vehicle_model.imgsz = 640
-
-                    results = self.app.vehicle_model.track(source=frame, conf=self.app.vehicle_model.conf,
-                                                       iou=self.app.vehicle_model.iou,
-                                                       show=False, verbose=False, stream=True,
-                                                       tracker="bytetrack.yaml",
-                                                       persist=True, imgsz=self.app.vehicle_model.imgsz, augment=False)
-                    for result in results:
-                        if result.boxes.id is None:
-                            continue
-                        boxes_xyxy = result.boxes.xyxy.cpu().numpy()
-                        ids = result.boxes.id.cpu().numpy()
-                        classes = result.boxes.cls.cpu().numpy().astype(int)
-
-                        for box, obj_id, cls_idx in zip(boxes_xyxy, ids, classes):
-                            if obj_id == -1:
-                                self.app.current_vehicle_id += 1
-                                obj_id = self.app.current_vehicle_id
-                                
-                            class_name = self.app.vehicle_model.names.get(cls_idx, "unknown")
-                            if class_name not in VEHICLE_TYPE_DISTANCE:
-                                continue
-
-                            x1, y1, x2, y2 = map(int, box)
-                            y_pixels = y2 - y1 if (y2 - y1) > 0 else 1
-                            detections.append({
-                                'id': int(obj_id),
-                                'class_name': class_name,
-                                'x1': x1,
-                                'y1': y1,
-                                'x2': x2,
-                                'y2': y2,
-                                'y_pixels': y_pixels
-                            })
-
-                self.app.current_frame_num = frame_num
-                detections = self.filter_overlapping_boxes(detections)
-
-                if self.app.is_vehicle_processing:
-                    for det in detections:
-                        obj_id = det['id']
-                        y_center = (det['y1'] + det['y2']) / 2
-                
-                        if obj_id in self.app.vehicle_positions:
-                            prev_position = self.app.vehicle_positions[obj_id]['y_center']
-                            counted = self.app.vehicle_positions[obj_id]['counted']
-                            if prev_position < self.app.line_y <= y_center and not counted:
-                                self.app.flow_counter += 1
-                                self.app.vehicle_positions[obj_id]['counted'] = True
-                        else:
-                            self.app.vehicle_positions[obj_id] = {'y_center': y_center, 'counted': False}
-                
-                        if y_center < self.app.line_y:
-                            self.app.vehicle_positions[obj_id]['counted'] = False
-                
-                    if detections:
-                        self.app.last_detection_time = time.time()
-                
-                    current_time = time.time()
-                    if current_time - self.app.window_start_time >= self.app.flow_window_size_seconds:
-                        if current_time - self.app.last_detection_time >= 2:
-                            self.app.current_flow_rate = 0
-                            self.app.flow_history.append(0)
-                            if len(self.app.flow_history) > 100:
-                                self.app.flow_history.pop(0)
-                            self.app.flow_counter = 0
-                            self.app.window_start_time = current_time
-                        else:
-                            flow_per_window = self.app.flow_counter * (3600 / self.app.flow_window_size_seconds) / self.app.number_of_lanes
-                            flow_per_window = max(flow_per_window, 0)
-                            self.app.flow_history.append(flow_per_window)
-                            if len(self.app.flow_history) > 100:
-                                self.app.flow_history.pop(0)
-                            self.app.current_flow_rate = sum(self.app.flow_history) / len(self.app.flow_history) if self.app.flow_history else 0
-                            self.app.flow_counter = 0
-                            self.app.window_start_time = current_time
-
-                for det in detections:
-                    obj_id = det['id']
-                    class_name = det['class_name']
-                    x1, y1, x2, y2 = det['x1'], det['y1'], det['x2'], det['y2']
-                    y_center = (y1 + y2) / 2
-                    y_pixels = det['y_pixels']
-                    x_center = (x1 + x2) / 2
-
-                    if obj_id not in self.app.trajectory_history:
-                        self.app.trajectory_history[obj_id] = []
-                    self.app.trajectory_history[obj_id].append(np.array([x_center, y_center]))
-                    if len(self.app.trajectory_history[obj_id]) > 3:
-                        self.app.trajectory_history[obj_id].pop(0)
-
-                    if self.app.is_speed_processing:
-                        speed = self.calculate_speed(obj_id, x_center, y_center,
-                                                     self.app.prev_info[obj_id][
-                                                         'x_center'] if obj_id in self.app.prev_info else x_center,
-                                                     self.app.prev_info[obj_id][
-                                                         'y_center'] if obj_id in self.app.prev_info else y_center,
-                                                     y_pixels, class_name)
-
-                        if obj_id not in self.app.speed_history:
-                            self.app.speed_history[obj_id] = speed
-                        else:
-                            self.app.speed_history[obj_id] = self.app.alpha * speed + (1 - self.app.alpha) * self.app.speed_history[
-                                obj_id]
-                        avg_speed = self.app.speed_history[obj_id]
-                        det['speed'] = avg_speed
-                        self.app.speed_stats.append(avg_speed)
-
-                        if avg_speed > self.app.speed_threshold:
-                            current_exception = 'Speeding Exception'
-                            if (obj_id not in exceptions) or (
-                                    exception_priority[current_exception] > exception_priority.get(exceptions[obj_id],
-                                                                                                   0)):
-                                exceptions[obj_id] = current_exception
-                            if self.app.is_exception_processing:
-                                print(f"车辆ID {obj_id} 超速异常，速度: {avg_speed:.2f} km/h")
-
-                    if self.app.is_exception_processing:
-                        if obj_id in self.app.trajectory_history:
-                            past_trace = self.app.trajectory_history[obj_id]
-                            if len(past_trace) == 3:
-                                p1 = past_trace[-3]
-                                p2 = past_trace[-2]
-                                p3 = past_trace[-1]
-                                vec1 = p2 - p1
-                                vec2 = p3 - p2
-                                angle = self.calculate_angle_between_vectors(vec1, vec2)
-                                displacement1 = np.linalg.norm(vec1)
-                                displacement2 = np.linalg.norm(vec2)
-                                if displacement1 >= self.app.min_displacement and displacement2 >= self.app.min_displacement:
-                                    if angle > self.app.angle_threshold and angle <= 90:
-                                        if (obj_id, self.app.current_frame_num) not in self.app.trajectory_exception_records:
-                                            current_exception = 'Trajectory Exception'
-                                            if (obj_id not in exceptions) or (
-                                                    exception_priority[current_exception] > exception_priority.get(
-                                                exceptions[obj_id], 0)):
-                                                exceptions[obj_id] = current_exception
-                                            print(f"车辆ID {obj_id} 检测到轨迹异常：角度变化 {angle:.2f} 度")
-                                            self.app.trajectory_exception_records.add((obj_id, self.app.current_frame_num))
-
-                if self.app.is_vehicle_processing:
-                    for det in detections:
-                        obj_id = det['id']
-                        class_name = det['class_name']
-                        if obj_id not in self.app.counted_vehicle_ids:
-                            if class_name in self.app.vehicle_type_counts:
-                                self.app.vehicle_type_counts[class_name] += 1
-                                self.app.counted_vehicle_ids.add(obj_id)
-
-                if self.app.is_vehicle_processing:
-                    for i, det1 in enumerate(detections):
-                        for det2 in detections[i + 1:]:
-                            obj_id1 = det1['id']
-                            obj_id2 = det2['id']
-                            iou = self.compute_iou(det1, det2)
-                            if self.app.iou_threshold < iou < 0.6:
-                                collision_key = (obj_id1, obj_id2)
-                                if (collision_key not in self.app.collision_records) or \
-                                   (self.app.collision_records[collision_key] != frame_num - 1):
-                                    self.app.collision_records[collision_key] = frame_num
-                                    current_exception = 'Collision Exception'
-                                    for obj_id in [obj_id1, obj_id2]:
-                                        if (obj_id not in exceptions) or (
-                                                exception_priority[current_exception] > exception_priority.get(exceptions[obj_id], 0)):
-                                            exceptions[obj_id] = current_exception
-                                        det = next((d for d in detections if d['id'] == obj_id), None)
-                                        if det:
-                                            det['speed'] = self.app.speed_history.get(obj_id, 0.0)
-                                    if self.app.is_exception_processing:
-                                        print(f"车辆ID {obj_id1} 与车辆ID {obj_id2} 发生碰撞异常。")
-
-                for det in detections:
-                    obj_id = det['id']
-                    class_name = det['class_name']
-                    x1, y1, x2, y2 = det['x1'], det['y1'], det['x2'], det['y2']
-                    speed = det.get('speed', 0.0)
-                    box_color = (255, 0, 0)
-                    status_label = ""
-
-                    if self.app.is_exception_processing:
-                        exception = exceptions.get(obj_id, 'Normal')
-                        if exception == 'Speeding Exception':
-                            box_color = (0, 0, 255)
-                            status_label = "Speeding Exception"
-                        elif exception == 'Collision Exception':
-                            box_color = (0, 255, 255)
-                            status_label = "Collision Exception"
-                        elif exception == 'Trajectory Exception':
-                            box_color = (255, 0, 255)
-                            status_label = "Trajectory Exception"
-
-                    cv2.rectangle(processed_frame, (x1, y1), (x2, y2), box_color, 2)
-
-                    if self.app.is_speed_processing:
-                        label = f"ID:{obj_id} {class_name} Speed:{speed:.2f} km/h"
-                    else:
-                        label = f"ID:{obj_id} {class_name}"
-
-                    (label_width, label_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-                    label_y = max(y1 - label_height - baseline, 0)
-                    cv2.rectangle(processed_frame, (x1, label_y), (x1 + label_width, y1), box_color, -1)
-                    cv2.putText(processed_frame, label, (x1, y1 - baseline), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
-                                (255, 255, 255), 2)
-
-                    if status_label:
-                        (status_width, status_height), status_baseline = cv2.getTextSize(status_label,
-                                                                                         cv2.FONT_HERSHEY_SIMPLEX, 0.5,
-                                                                                         2)
-                        status_x = x1
-                        status_y = y2 + status_height + 10 if y2 + status_height + 10 < self.app.y_max else y2 - 10
-                        cv2.putText(processed_frame, status_label, (status_x, status_y),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-                if self.app.is_vehicle_processing:
-                    traffic_flow_display = self.app.current_flow_rate
-                    cv2.putText(processed_frame, f"Traffic Flow: {traffic_flow_display:.2f} veh/h",
-                                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
-
-                try:
-                    self.app.processed_frame_queue.put_nowait(processed_frame.copy())
-                except self.app.queue.Full:
-                    try:
-                        self.app.processed_frame_queue.get_nowait()
-                        self.app.processed_frame_queue.put_nowait(processed_frame.copy())
-                    except self.app.queue.Empty:
-                        pass
+                frames = [slot.frame for slot, _ in items]
+                frame_nums = [frame_num for _, frame_num in items]
+                timestamps = [slot.timestamp for slot, _ in items]
+                self.process_batch(frames, frame_nums, in_place=True, available_times=available_times,
+                                   backlog=backlog, timestamps=timestamps)
+                while pending:
+                    self.put_processed(pending.pop(0))
+
+                if self.throughput_frames >= self.report_interval:
+                    report = self.get_throughput_report(reset=True)
+                    print(f"处理吞吐: {report['fps']:.1f} FPS，单帧延迟: 平均 {report['latency_mean_ms']:.1f} ms / "
+                          f"p95 {report['latency_p95_ms']:.1f} ms（批大小 {batch_size}），"
+                          f"跟踪目标: 活跃 {self.app.track_store.live_count} / 已淘汰 {self.app.track_store.evicted_count}，"
+                          f"检测步长 {report['detection_stride']}，运动门命中率 {report['gate_hit_rate']:.0%}")
             except Exception as e:
                 print(f"处理帧时发生错误: {e}")
             finally:
+                for slot, _ in pending:
+                    slot.release()
                 with self.app.stats_lock:
                     self.app.processing = False
 
-    def filter_overlapping_boxes(self, detections):
-        # ... (Copy from original file's filter_overlapping_boxes method)
-        if not detections:
-            return []
+    def put_processed(self, item):
+        try:
+            self.app.processed_frame_queue.put_nowait(item)
+        except self.app.queue.Full:
+            self.app.perf_monitor.drop("显示队列已满")
+            try:
+                self.app.processed_frame_queue.get_nowait()[0].release()
+            except self.app.queue.Empty:
+                pass
+            try:
+                self.app.processed_frame_queue.put_nowait(item)
+            except self.app.queue.Full:
+                item[0].release()
+
+    def process_batch(self, frames, frame_nums, render=True, in_place=False, available_times=None, backlog=0.0,
+                      timestamps=None):
+        """
+        对一批按时间顺序排列的帧做一次批量推理，再逐帧依次送入跟踪结果解析与分析流程。
+        开启自适应检测步长（target_latency_ms > 0）时，只有步长选中的帧送入模型，其余帧由 predict_detections 外推；
+        开启运动门（motion_gate_ratio > 0）时，重复帧不再分析，画面静止的帧沿用上一次检测结果。
+        :param available_times: 每帧可供处理的时刻（time.perf_counter），用于统计单帧延迟
+        :param backlog: 待处理队列的填充比例（0~1），供检测步长调节参考
+        :param timestamps: 各帧的时间戳（秒）；为 None 时回放的帧取缓存中记录的时间戳，否则按帧号与帧率推算
+        :return: 与 process_frame 返回值相同的元组列表
+        """
+        if available_times is None:
+            available_times = [time.perf_counter()] * len(frames)
+        # 检测缓存已覆盖这批帧时逐帧回放缓存结果，回放比外推更快也更准确，不再跳过检测
+        cache = self.current_detection_cache() if self.app.is_vehicle_processing else None
+        cached = cache is not None and cache.covers(frame_nums)
+        if timestamps is None:
+            timestamps = [cache.timestamp(frame_num) for frame_num in frame_nums] if cached else [None] * len(frames)
+        adaptive = self.app.target_latency_ms > 0 and not cached
+        gate = None
+        if self.app.is_vehicle_processing and self.app.motion_gate_ratio > 0 and not cached:
+            gate = self.motion_gate
+            gate.motion_ratio = self.app.motion_gate_ratio
+
+        actions = []
+        for frame in frames:
+            if not self.app.is_vehicle_processing:
+                actions.append(None)
+                continue
+            wants_detection = self.detection_stride.should_detect() if adaptive else True
+            if self.motion_batch is None and 'detect' not in actions:
+                wants_detection = True
+            state = gate.check(frame, wants_detection) if gate is not None else GATE_MOTION
+            if state == GATE_DUPLICATE and self.last_output is not None:
+                actions.append('duplicate')
+            elif not wants_detection:
+                actions.append('predict')
+            elif state == GATE_STATIC and self.motion_batch is not None:
+                actions.append('reuse')
+            else:
+                actions.append('detect')
+        detect_frames = [frame for frame, action in zip(frames, actions) if action == 'detect']
+        detect_nums = [frame_num for frame_num, action in zip(frame_nums, actions) if action == 'detect']
+        detect_times = [timestamp for timestamp, action in zip(timestamps, actions) if action == 'detect']
+        detected = iter(self.detect_vehicles_batch(detect_frames, detect_nums, detect_times) if detect_frames else [])
+
+        outputs = []
+        for frame, frame_num, timestamp, action, available_time in zip(frames, frame_nums, timestamps, actions,
+                                                                       available_times):
+            if action == 'duplicate':
+                outputs.append(self.repeat_output(frame, render, in_place))
+            else:
+                detections = None
+                if action == 'detect':
+                    detections = next(detected)
+                elif action == 'predict':
+                    detections = self.predict_detections(frame_num, frame.shape)
+                elif action == 'reuse':
+                    detections = self.reuse_detections(frame_num)
+                outputs.append(self.process_frame(frame, frame_num, render=render, in_place=in_place,
+                                                  detections=detections, predicted=action in ('predict', 'reuse'),
+                                                  timestamp=timestamp))
+            latency = time.perf_counter() - available_time
+            self.record_latency(latency)
+            if adaptive:
+                self.detection_stride.update(latency, self.app.target_latency_ms / 1000, backlog)
+        return outputs
+
+    def process_frame(self, frame, frame_num, render=True, in_place=False, detections=None, predicted=False,
+                      timestamp=None):
+        """
+        对单帧执行检测、跟踪、流量统计、测速与异常分析，不依赖任何 GUI 组件。
+        :param frame: BGR 图像
+        :param frame_num: 帧序号
+        :param render: 是否绘制检测结果
+        :param in_place: 直接在传入的帧上绘制（帧来自 FramePool 槽位、调用方已不再需要原图时使用），否则绘制在副本上
+        :param detections: 已由批量推理得到的 DetectionBatch，为 None 时对本帧单独推理
+        :param predicted: detections 是运动模型外推的结果而非模型输出（不再做重叠过滤，也不更新运动模型）
+        :param timestamp: 帧的时间戳（秒），流量窗口与测速以此计时；为 None 时按帧号与帧率推算
+        :return: (绘制后的帧或 None, 检测结果列表, {车辆ID: 异常类型})
+        """
+        if self.app.y_max is None or self.app.line_y is None:
+            self.app.y_max = frame.shape[0]
+            self.app.line_y = int(self.app.y_max * 0.5)
 
-        detections = sorted(detections, key=lambda x: x.get('confidence', 0), reverse=True)
-        filtered = []
-        occupied_areas = []
+        if not self.app.is_vehicle_processing:
+            batch = DetectionBatch.empty()
+        elif detections is None:
+            batch = self.detect_vehicles(frame)
+        else:
+            batch = detections
+
+        self.app.current_frame_num = frame_num
+        self.app.current_timestamp = timestamp if timestamp is not None else frame_num / (self.app.fps or 30)
+        monitor = self.app.perf_monitor
+        start = time.perf_counter()
+        if not predicted:
+            batch = self.filter_overlapping_boxes(batch)
+        detections = batch.to_dicts()
+        analyzed = time.perf_counter()
+        monitor.record('postprocess', analyzed - start)
+        exceptions = self.analyze_detections(detections, frame_num, overlap_pairs=batch.overlap_pairs(),
+                                             boxes=batch.boxes)
+        if self.app.is_vehicle_processing and not predicted:
+            self.update_motion(batch, frame_num)
+        self.last_output = (detections, exceptions)
+        if self.app.tracked_data is not None and detections:
+            self.log_frame(frame_num, batch, detections, exceptions)
+        drawn = time.perf_counter()
+        monitor.record('analytics', drawn - analyzed)
+
+        processed_frame = None
+        if render:
+            processed_frame = frame if in_place else frame.copy()
+            self.draw_detections(processed_frame, detections, exceptions)
+            monitor.record('overlay', time.perf_counter() - drawn)
+        return processed_frame, detections, exceptions
+
+    def log_frame(self, frame_num, batch, detections, exceptions):
+        """把本帧的跟踪结果按列追加到跟踪日志，ID、类别与检测框直接取自 DetectionBatch 的数组。"""
+        count = len(detections)
+        speeds = np.fromiter((det.get('speed', np.nan) for det in detections), dtype=np.float32, count=count)
+        codes = np.fromiter((EXCEPTION_CODES.get(exceptions.get(obj_id), 0) for obj_id in batch.ids.tolist()),
+                            dtype=np.int8, count=count)
+        self.app.tracked_data.append(frame_num, batch.ids, batch.class_ids, batch.boxes, speeds, codes, batch.names)
+
+    def update_motion(self, batch, frame_num):
+        """以每个目标前后两次真实检测的框计算恒速运动模型（逐帧位移），间隔过久的目标速度记为 0。"""
+        velocities = np.zeros((len(batch), 4), dtype=np.float64)
+        max_gap = 2 * self.detection_stride.max_stride
+        for k, obj_id in enumerate(batch.ids.tolist()):
+            state = self.app.track_store.touch(obj_id)
+            box = batch.boxes[k]
+            if state.box is not None and 0 < frame_num - state.box_frame <= max_gap:
+                velocities[k] = (box - state.box) / (frame_num - state.box_frame)
+            state.box = box
+            state.box_frame = frame_num
+        self.motion_batch = (batch, velocities, frame_num)
+
+    def predict_detections(self, frame_num, frame_shape):
+        """在跳过检测的帧上按恒速模型外推最近一次检测到的全部目标，框裁剪到画面范围内。"""
+        if self.motion_batch is None:
+            return DetectionBatch.empty()
+        batch, velocities, base_frame = self.motion_batch
+        boxes = np.rint(batch.boxes + velocities * (frame_num - base_frame))
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, frame_shape[1] - 1)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, frame_shape[0] - 1)
+        visible = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        return DetectionBatch(batch.ids[visible], batch.class_ids[visible], boxes[visible],
+                              batch.confidences[visible], batch.names)
+
+    def reuse_detections(self, frame_num):
+        """画面静止时沿用最近一次检测的结果，运动模型的速度同时清零。"""
+        batch = self.motion_batch[0]
+        self.motion_batch = (batch, np.zeros((len(batch), 4), dtype=np.float64), frame_num)
+        return batch
+
+    def repeat_output(self, frame, render, in_place):
+        """重复帧不做任何分析，只把上一帧的检测结果画到本帧上。"""
+        processed_frame = None
+        if render:
+            start = time.perf_counter()
+            processed_frame = frame if in_place else frame.copy()
+            self.draw_detections(processed_frame, *self.last_output)
+            self.app.perf_monitor.record('overlay', time.perf_counter() - start)
+        return processed_frame, [], {}
+
+    def reset_motion(self):
+        self.motion_batch = None
+        self.last_output = None
+        self.detection_stride.reset()
+        self.motion_gate.reset()
+
+    def detect_vehicles(self, frame):
+        return self.detect_vehicles_batch([frame])[0]
+
+    def detect_vehicles_batch(self, frames, frame_nums=None, timestamps=None):
+        """
+        :param frame_nums: 各帧的帧号；给出时先查检测缓存，缓存覆盖的整批直接回放，否则推理后写入缓存
+        :param timestamps: 各帧的时间戳（秒），随检测结果一并写入缓存
+        """
+        cache = self.current_detection_cache() if frame_nums is not None else None
+        if cache is not None and cache.covers(frame_nums):
+            return [cache.get(frame_num) for frame_num in frame_nums]
+        if self.app.vehicle_model is None:
+            raise RuntimeError("车辆检测模型尚未加载")
+        # track(persist=True) 在多次调用之间保留跟踪器：每一遍从第 0 帧开始的推理都从空的跟踪状态与 ID 计数起步，
+        # 跟踪 ID 不受之前播放过的视频或上一遍推理影响，写入缓存的结果与整遍重新推理一致
+        if self.tracker_reset_pending or (frame_nums is not None and frame_nums[0] == 0):
+            self.reset_tracker()
+
+        self.app.vehicle_model.conf = self.app.conf_threshold
+        self.app.vehicle_model.iou = self.app.iou_threshold
+        self.app.vehicle_model.imgsz = 640
+        first_call = self.first_inference_ms is None
+        start = time.perf_counter()
+
+        # 配置了 ROI 时只把裁剪、掩膜后的区域送入模型，推理尺寸随区域缩小
+        roi = self.app.roi
+        if roi is not None:
+            if roi.frame_shape != frames[0].shape[:2]:
+                roi = self.app.roi = RegionOfInterest(roi.polygons, frames[0].shape)
+            frames = roi.crop_batch(frames)
+            imgsz = roi.inference_size(self.app.vehicle_model.imgsz)
+        else:
+            imgsz = self.app.vehicle_model.imgsz
+
+        # 以列表作为 source 时 ultralytics 会把整批图像拼成一个张量推理，
+        # 跟踪器仍按列表顺序逐帧更新，因此 ID 连续性与逐帧推理一致
+        results = self.app.vehicle_model.track(source=list(frames), conf=self.app.vehicle_model.conf,
+                                               iou=self.app.vehicle_model.iou,
+                                               show=False, verbose=False, stream=True,
+                                               tracker="bytetrack.yaml",
+                                               persist=True, imgsz=imgsz, augment=False)
+        batches = [self.parse_result(result) for result in results]
+        if first_call:
+            self.first_inference_ms = (time.perf_counter() - start) * 1000
+            print(f"首次跟踪推理耗时 {self.first_inference_ms:.0f} ms（{len(frames)} 帧）")
+        if roi is not None:
+            batches = [roi.to_frame(batch) for batch in batches]
+        # 一批的耗时平均记到每一帧上
+        self.app.perf_monitor.record('inference', (time.perf_counter() - start) / max(1, len(batches)),
+                                     count=len(batches))
+        if cache is not None:
+            cache.add(frame_nums, batches, timestamps)
+        return batches
+
+    def open_detection_cache(self, source):
+        """
+        关闭当前的检测缓存（保存新增的帧），再按视频文件、模型与阈值打开对应的缓存。
+        摄像头输入（source 为 None）或未配置 detection_cache_root 时不使用缓存。
+        """
+        previous, self.detection_cache = self.detection_cache, None
+        if previous is not None:
+            saved = previous.close()
+            if saved:
+                print(f"检测缓存已保存 {saved} 帧")
+        if source is None or not self.app.detection_cache_root:
+            return None
+        try:
+            digest, fields = cache_key(source, self.app.weights, self.app.inference_backend, self.app.inference_int8,
+                                       self.app.conf_threshold, self.app.iou_threshold, 640,
+                                       self.app.roi.polygons if self.app.roi is not None else None)
+            self.detection_cache = DetectionCache(os.path.join(self.app.detection_cache_root, digest), fields)
+        except OSError as e:
+            print(f"无法打开检测缓存: {e}")
+            return None
+        if self.detection_cache.finished:
+            print(f"找到检测缓存：{self.detection_cache.frames} 帧，将直接回放")
+        return self.detection_cache
+
+    def reset_tracker(self):
+        """清空模型上已注册的 ByteTrack 跟踪器（已跟踪的目标与 ID 计数），下一次 track() 从空状态开始。"""
+        self.tracker_reset_pending = False
+        predictor = getattr(self.app.vehicle_model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
+
+    def current_detection_cache(self):
+        """
+        当前阈值对应的检测缓存。参数设置中修改了置信度或 IoU 阈值后，已加载模型时切换到新阈值的缓存；
+        尚未加载模型（正在回放缓存）时只停用旧缓存，等下次打开视频源再按新阈值查找，不在每批帧上反复尝试。
+        由处理线程调用，与界面线程的切换同样在 stats_lock 下进行（调用方不得持有该锁）。
+        """
+        cache = self.detection_cache
+        if cache is None or not self.detection_cache_stale(cache):
+            return cache
+        with self.app.stats_lock:
+            cache = self.detection_cache
+            if cache is not None and self.detection_cache_stale(cache):
+                if self.app.vehicle_model is not None:
+                    cache = self.open_detection_cache(self.app.video_path)
+                else:
+                    print("检测阈值已修改，停用当前检测缓存")
+                    cache = self.open_detection_cache(None)
+        return cache
+
+    def detection_cache_stale(self, cache):
+        return cache.fields['conf'] != round(float(self.app.conf_threshold), 6) or \
+            cache.fields['iou'] != round(float(self.app.iou_threshold), 6)
+
+    def record_latency(self, latency):
+        if self.throughput_start is None:
+            self.throughput_start = time.perf_counter() - latency
+        self.frame_latencies.append(latency)
+        self.throughput_frames += 1
+        self.app.perf_monitor.record('frame_total', latency)
+
+    def get_throughput_report(self, reset=False):
+        elapsed = time.perf_counter() - self.throughput_start if self.throughput_start is not None else 0.0
+        latencies = np.asarray(self.frame_latencies) * 1000
+        report = {
+            'frames': self.throughput_frames,
+            'fps': self.throughput_frames / elapsed if elapsed > 0 else 0.0,
+            'latency_mean_ms': float(latencies.mean()) if latencies.size else 0.0,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+            'detection_stride': self.detection_stride.stride if self.app.target_latency_ms > 0 else 1,
+            'gate_hit_rate': self.motion_gate.hit_rate if self.app.motion_gate_ratio > 0 else 0.0,
+        }
+        if reset:
+            self.throughput_start = None
+            self.throughput_frames = 0
+        return report
+
+    def parse_result(self, result):
+        names = self.app.vehicle_model.names
+        if result.boxes.id is None:
+            return DetectionBatch.empty(names)
+        ids = result.boxes.id.cpu().numpy().astype(np.int64)
+        classes = result.boxes.cls.cpu().numpy().astype(int)
+
+        untracked = np.flatnonzero(ids == -1)
+        if untracked.size:
+            ids[untracked] = np.arange(self.app.current_vehicle_id + 1, self.app.current_vehicle_id + 1 + untracked.size)
+            self.app.current_vehicle_id += int(untracked.size)
+
+        keep = np.array([names.get(cls_idx, "unknown") in VEHICLE_TYPE_DISTANCE for cls_idx in classes.tolist()],
+                        dtype=bool)
+        return DetectionBatch(ids[keep], classes[keep], result.boxes.xyxy.cpu().numpy()[keep],
+                              result.boxes.conf.cpu().numpy()[keep], names)
+
+    def analyze_detections(self, detections, frame_num, overlap_pairs=None, boxes=None):
+        """
+        :param boxes: 与 detections 一一对应的 (N, 4) 检测框数组，为 None 时由 detections 构造
+        """
+        exceptions = {}
+        track_store = self.app.track_store
+        track_store.advance()
+        states = [track_store.touch(det['id']) for det in detections]
+
+        if self.app.is_vehicle_processing:
+            if boxes is None:
+                boxes = np.array([[det['x1'], det['y1'], det['x2'], det['y2']] for det in detections],
+                                 dtype=np.float64).reshape(-1, 4)
+            centers = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2])
+            previous = np.array([state.flow_anchor or (np.nan, np.nan) for state in states],
+                                dtype=np.float64).reshape(-1, 2)
+            counted = np.fromiter((state.flow_counted for state in states), dtype=np.int64, count=len(states))
+            # 所有车辆与所有计数线的过线测试一次完成，各线次数按计数线、车道与方向累计在 counting_zones 中；
+            # 车流量只按车辆计，一辆车越过几条计数线都只算一次
+            vehicles, counted = self.counting_zones().update(previous, centers, counted)
+            self.app.flow_counter += vehicles
+            for state, center, mask in zip(states, centers.tolist(), counted.tolist()):
+                state.flow_anchor = center
+                state.flow_counted = mask
+
+            # 流量窗口按帧时间戳划分，离线加速处理与过载丢帧时每个窗口仍对应同样长的一段画面
+            current_time = self.app.current_timestamp
+            if detections:
+                self.app.last_detection_time = current_time
+            # 停止后从头重新播放时时间戳会回到起点，窗口随之重新起算
+            if self.app.window_start_time is None or current_time < self.app.window_start_time:
+                self.app.window_start_time = current_time
+
+            if current_time - self.app.window_start_time >= self.app.flow_window_size_seconds:
+                if self.app.last_detection_time is None or current_time - self.app.last_detection_time >= 2:
+                    self.app.current_flow_rate = 0
+                    self.app.flow_series.add(self.app.window_start_time, 0)
+                    self.app.flow_counter = 0
+                    self.app.window_start_time = current_time
+                else:
+                    # 配置了车道区域时按实际车道数折算为单车道流量
+                    lanes = self.app.counting_zones.lane_count or self.app.number_of_lanes
+                    flow_per_window = self.app.flow_counter * (3600 / self.app.flow_window_size_seconds) / lanes
+                    flow_per_window = max(flow_per_window, 0)
+                    self.app.flow_series.add(self.app.window_start_time, flow_per_window)
+                    self.app.current_flow_rate = self.app.flow_series.recent_mean
+                    self.app.flow_counter = 0
+                    self.app.window_start_time = current_time
+
+        # 已标定路面时，所有车辆底边中点（与路面接触处）的路面坐标一次查表得到
+        ground_points = None
+        calibration = self.app.ground_calibration
+        if self.app.is_speed_processing and calibration is not None and detections:
+            if boxes is None:
+                boxes = np.array([[det['x1'], det['y1'], det['x2'], det['y2']] for det in detections],
+                                 dtype=np.float64).reshape(-1, 4)
+            ground_points = calibration.to_ground((boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]).tolist()
+
+        for index, (det, state) in enumerate(zip(detections, states)):
+            obj_id = det['id']
+            class_name = det['class_name']
+            x1, y1, x2, y2 = det['x1'], det['y1'], det['x2'], det['y2']
+            y_center = (y1 + y2) / 2
+            y_pixels = det['y_pixels']
+            x_center = (x1 + x2) / 2
+
+            state.trajectory.append(np.array([x_center, y_center]))
+
+            if self.app.is_speed_processing:
+                prev_info = state.prev_info
+                ground_point = ground_points[index] if ground_points is not None else None
+                if ground_point is not None and (math.isnan(ground_point[0]) or math.isnan(ground_point[1])):
+                    ground_point = None
+                speed = self.calculate_speed(obj_id, x_center, y_center,
+                                             prev_info['x_center'] if prev_info else x_center,
+                                             prev_info['y_center'] if prev_info else y_center,
+                                             y_pixels, class_name, ground_point)
+
+                if state.speed is None:
+                    state.speed = speed
+                else:
+                    state.speed = self.app.alpha * speed + (1 - self.app.alpha) * state.speed
+                avg_speed = state.speed
+                det['speed'] = avg_speed
+                self.app.speed_stats.add(avg_speed, class_name)
+
+                if avg_speed > self.app.speed_threshold:
+                    current_exception = 'Speeding Exception'
+                    if (obj_id not in exceptions) or (
+                            EXCEPTION_PRIORITY[current_exception] > EXCEPTION_PRIORITY.get(exceptions[obj_id],
+                                                                                           0)):
+                        exceptions[obj_id] = current_exception
+                    if self.app.is_exception_processing:
+                        self.app.event_log.event('speeding', f"车辆ID {obj_id} 超速异常，速度: {avg_speed:.2f} km/h")
+
+            if self.app.is_exception_processing:
+                past_trace = state.trajectory
+                if len(past_trace) == 3:
+                    p1 = past_trace[-3]
+                    p2 = past_trace[-2]
+                    p3 = past_trace[-1]
+                    vec1 = p2 - p1
+                    vec2 = p3 - p2
+                    angle = self.calculate_angle_between_vectors(vec1, vec2)
+                    displacement1 = np.linalg.norm(vec1)
+                    displacement2 = np.linalg.norm(vec2)
+                    if displacement1 >= self.app.min_displacement and displacement2 >= self.app.min_displacement:
+                        if angle > self.app.angle_threshold and angle <= 90:
+                            if state.trajectory_exception_frame != self.app.current_frame_num:
+                                current_exception = 'Trajectory Exception'
+                                if (obj_id not in exceptions) or (
+                                        EXCEPTION_PRIORITY[current_exception] > EXCEPTION_PRIORITY.get(
+                                    exceptions[obj_id], 0)):
+                                    exceptions[obj_id] = current_exception
+                                self.app.event_log.event('trajectory',
+                                                         f"车辆ID {obj_id} 检测到轨迹异常：角度变化 {angle:.2f} 度")
+                                state.trajectory_exception_frame = self.app.current_frame_num
 
+        if self.app.is_vehicle_processing:
+            for det, state in zip(detections, states):
+                class_name = det['class_name']
+                if not state.type_counted:
+                    if class_name in self.app.vehicle_type_counts:
+                        self.app.vehicle_type_counts[class_name] += 1
+                        state.type_counted = True
+
+        if self.app.is_vehicle_processing and len(detections) > 1:
+            if overlap_pairs is None:
+                overlap_pairs = DetectionBatch.from_dicts(detections).overlap_pairs()
+            # 网格粗筛后的相交框对已按 (i, j) 排序，与逐对比较的遍历顺序一致
+            pair_i, pair_j, pair_iou = overlap_pairs
+            colliding = (pair_iou > self.app.iou_threshold) & (pair_iou < 0.6)
+            for i, j in zip(pair_i[colliding].tolist(), pair_j[colliding].tolist()):
+                det1 = detections[i]
+                det2 = detections[j]
+                obj_id1 = det1['id']
+                obj_id2 = det2['id']
+                # 碰撞记录挂在框对中第一个目标的状态上，随该目标一起被淘汰
+                collision_records = states[i].collisions
+                if (obj_id2 not in collision_records) or \
+                   (collision_records[obj_id2] != frame_num - 1):
+                    collision_records[obj_id2] = frame_num
+                    current_exception = 'Collision Exception'
+                    for obj_id, det, state in ((obj_id1, det1, states[i]), (obj_id2, det2, states[j])):
+                        if (obj_id not in exceptions) or (
+                                EXCEPTION_PRIORITY[current_exception] > EXCEPTION_PRIORITY.get(exceptions[obj_id], 0)):
+                            exceptions[obj_id] = current_exception
+                        det['speed'] = state.speed or 0.0
+                    if self.app.is_exception_processing:
+                        self.app.event_log.event('collision', f"车辆ID {obj_id1} 与车辆ID {obj_id2} 发生碰撞异常。")
+        return exceptions
+
+    def draw_detections(self, processed_frame, detections, exceptions):
+        if self.app.roi is not None and self.app.is_vehicle_processing:
+            self.app.roi.draw(processed_frame)
+        zones = self.app.counting_zones
+        if zones is not None and not zones.default and self.app.is_vehicle_processing:
+            zones.draw(processed_frame)
         for det in detections:
+            obj_id = det['id']
+            class_name = det['class_name']
             x1, y1, x2, y2 = det['x1'], det['y1'], det['x2'], det['y2']
-            overlap = False
-            for area in occupied_areas:
-                iou = self.compute_iou({'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}, area)
-                if iou > 0.5:
-                    overlap = True
-                    break
-            if not overlap:
-                filtered.append(det)
-                occupied_areas.append({'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
-        return filtered
+            speed = det.get('speed', 0.0)
+            box_color = (255, 0, 0)
+            status_label = ""
+
+            if self.app.is_exception_processing:
+                exception = exceptions.get(obj_id, 'Normal')
+                if exception == 'Speeding Exception':
+                    box_color = (0, 0, 255)
+                    status_label = "Speeding Exception"
+                elif exception == 'Collision Exception':
+                    box_color = (0, 255, 255)
+                    status_label = "Collision Exception"
+                elif exception == 'Trajectory Exception':
+                    box_color = (255, 0, 255)
+                    status_label = "Trajectory Exception"
+
+            cv2.rectangle(processed_frame, (x1, y1), (x2, y2), box_color, 2)
+
+            if self.app.is_speed_processing:
+                label = f"ID:{obj_id} {class_name} Speed:{speed:.2f} km/h"
+            else:
+                label = f"ID:{obj_id} {class_name}"
+
+            (label_width, label_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+            label_y = max(y1 - label_height - baseline, 0)
+            cv2.rectangle(processed_frame, (x1, label_y), (x1 + label_width, y1), box_color, -1)
+            cv2.putText(processed_frame, label, (x1, y1 - baseline), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                        (255, 255, 255), 2)
+
+            if status_label:
+                (status_width, status_height), status_baseline = cv2.getTextSize(status_label,
+                                                                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                                                                                 2)
+                status_x = x1
+                status_y = y2 + status_height + 10 if y2 + status_height + 10 < self.app.y_max else y2 - 10
+                cv2.putText(processed_frame, status_label, (status_x, status_y),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+        if self.app.is_vehicle_processing:
+            traffic_flow_display = self.app.current_flow_rate
+            cv2.putText(processed_frame, f"Traffic Flow: {traffic_flow_display:.2f} veh/h",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+            if self.app.target_latency_ms > 0 and self.detection_stride.stride > 1:
+                cv2.putText(processed_frame, f"Detection Stride: {self.detection_stride.stride}",
+                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+
+    def reset_statistics(self, track_log_dir=None):
+        """
+        清空与当前视频源相关的所有统计与跟踪状态（调用方负责加锁）。
+        :param track_log_dir: 新跟踪日志的输出目录，为 None 时不记录跟踪日志
+        """
+        self.open_track_log(track_log_dir)
+        self.reset_motion()
+        self.app.event_log.flush(force=True)
+        self.app.speed_stats = SpeedStatistics()
+        self.app.flow_series = FlowSeries(self.app.flow_window_size_seconds)
+        self.app.flow_counter = 0
+        if self.app.counting_zones is not None:
+            self.app.counting_zones.reset()
+        self.app.current_flow_rate = 0
+        self.app.track_store = TrackStateStore(self.app.track_ttl_frames)
+        self.app.vehicle_type_counts = {key: 0 for key in VEHICLE_TYPE_DISTANCE.keys()}
+        self.reset_clock()
+
+    def open_track_log(self, directory):
+        """结束当前的跟踪日志（剩余数据写盘）并在 directory 下开始新的日志，directory 为 None 时只结束。"""
+        if self.app.tracked_data is not None:
+            self.app.tracked_data.close()
+            print(f"跟踪日志已保存: {self.app.tracked_data.output_dir}（{self.app.tracked_data.rows_written} 行）")
+        self.app.tracked_data = None
+        if directory is not None:
+            self.app.tracked_data = TrackLogBuffer(directory, file_format=self.app.track_log_format,
+                                                   names=getattr(self.app.vehicle_model, 'names', None))
+
+    def counting_zones(self):
+        """当前视频源的计数区域；未配置时使用 y = line_y 的默认水平计数线，随 line_y 变化重建。"""
+        zones = self.app.counting_zones
+        if zones is None or (zones.default and zones.line_y != self.app.line_y):
+            zones = self.app.counting_zones = CountingZones.horizontal(self.app.line_y)
+        return zones
+
+    def reset_clock(self):
+        """新视频源的时间戳从头开始，流量窗口随第一帧重新起算。"""
+        self.app.window_start_time = None
+        self.app.last_detection_time = None
+        self.app.current_timestamp = 0.0
+
+    def configure_source(self, source, frame_shape, roi_polygons=None):
+        """
+        读取视频源对应的现场配置并据此设置 ROI，时间戳从头开始（调用方负责加锁）。
+        :param source: 视频文件路径，摄像头传入 None
+        :param frame_shape: 帧的 (高, 宽, 通道)
+        :param roi_polygons: 显式指定的 ROI 多边形，优先于配置文件
+        """
+        self.reset_clock()
+        self.tracker_reset_pending = True
+        self.app.source_settings = load_source_settings(source, self.app.source_config_path)
+        self.app.counting_zones = None
+        counting = self.app.source_settings.get('counting')
+        if counting:
+            try:
+                self.app.counting_zones = CountingZones.from_config(counting, frame_shape)
+                print(f"视频源 {source_key(source)} 启用 {len(self.app.counting_zones.line_names)} 条计数线、"
+                      f"{self.app.counting_zones.lane_count} 个车道区域")
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"视频源 {source_key(source)} 的计数区域配置无效: {e}")
+        self.app.ground_calibration = None
+        calibration = self.app.source_settings.get('calibration')
+        if calibration:
+            try:
+                self.app.ground_calibration = GroundCalibration.from_config(calibration, frame_shape)
+                print(f"视频源 {source_key(source)} 启用路面标定：{len(calibration['image_points'])} 个参考点，"
+                      f"最大重投影误差 {self.app.ground_calibration.reprojection_error:.2f} 米")
+            except (ValueError, KeyError, TypeError, cv2.error) as e:
+                print(f"视频源 {source_key(source)} 的路面标定配置无效: {e}")
+        polygons = roi_polygons or self.app.source_settings.get('roi')
+        self.app.roi = None
+        self.motion_gate.set_mask(None)
+        if polygons:
+            try:
+                self.app.roi = RegionOfInterest(polygons, frame_shape)
+                self.motion_gate.set_mask(self.app.roi.frame_mask)
+                print(f"视频源 {source_key(source)} 启用 ROI：{len(polygons)} 个多边形，"
+                      f"推理区域为整帧的 {self.app.roi.area_ratio:.0%}")
+            except ValueError as e:
+                print(f"视频源 {source_key(source)} 的 ROI 配置无效: {e}")
+        self.open_detection_cache(source)
+
+    def session_log_dir(self, source_name):
+        """GUI 会话的跟踪日志目录：track_log_root/<视频源名>_<开始时间>，未配置 track_log_root 时返回 None。"""
+        if not self.app.track_log_root:
+            return None
+        name = os.path.splitext(os.path.basename(source_name))[0] or "source"
+        return os.path.join(self.app.track_log_root, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+
+    def filter_overlapping_boxes(self, detections):
+        """
+        按置信度从高到低贪心保留检测框，与已保留框 IoU 大于 0.5 的框被剔除。
+        :param detections: DetectionBatch（也接受旧式的字典列表，此时返回字典列表）
+        :return: 保持原始顺序的过滤结果
+        """
+        if not isinstance(detections, DetectionBatch):
+            if not detections:
+                return []
+            batch = DetectionBatch.from_dicts(detections)
+            return [detections[i] for i in self.overlap_keep_indices(batch)]
+        if len(detections) == 0:
+            return detections
+        return detections.select(self.overlap_keep_indices(detections))
+
+    def overlap_keep_indices(self, batch):
+        pair_i, pair_j, pair_iou = batch.overlap_pairs()
+        heavy = pair_iou > 0.5
+        neighbours = {}
+        for i, j in zip(pair_i[heavy].tolist(), pair_j[heavy].tolist()):
+            neighbours.setdefault(i, []).append(j)
+            neighbours.setdefault(j, []).append(i)
+
+        suppressed = set()
+        keep = []
+        for i in np.argsort(-batch.confidences, kind='stable').tolist():
+            if i in suppressed:
+                continue
+            keep.append(i)
+            suppressed.update(neighbours.get(i, ()))
+        return np.sort(np.asarray(keep, dtype=np.int64))
 
     def is_enclosed(self, det1, det2):
         # ... (Copy from original file's is_enclosed method)
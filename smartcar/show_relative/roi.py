@@ -0,0 +1,72 @@
+import math
+import cv2
+import numpy as np
+from .detection_batch import DetectionBatch
+
+
+class RegionOfInterest:
+    """
+    推理前的感兴趣区域：把帧裁剪到所有 ROI 多边形的外接矩形，并把矩形内多边形以外的像素置零，
+    模型只在这块较小的图像上推理；检测框再平移回整帧坐标，底边中点不在多边形内的框被丢弃。
+    """
+    def __init__(self, polygons, frame_shape):
+        """
+        :param polygons: 多边形列表，每个多边形为 [[x, y], ...]；坐标均不大于 1 时按画面宽高的比例解释
+        :param frame_shape: 帧的 (高, 宽[, 通道])
+        """
+        self.polygons = polygons
+        self.frame_shape = tuple(frame_shape[:2])
+        height, width = self.frame_shape
+
+        points = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons]
+        if all((p <= 1.0).all() for p in points):
+            points = [p * [width, height] for p in points]
+        self.points = [np.clip(np.rint(p), 0, [width - 1, height - 1]).astype(np.int32) for p in points]
+
+        self.frame_mask = np.zeros(self.frame_shape, dtype=np.uint8)
+        cv2.fillPoly(self.frame_mask, self.points, 1)
+        ys, xs = np.nonzero(self.frame_mask)
+        if len(xs) == 0:
+            raise ValueError("ROI 多边形面积为 0")
+        self.x0, self.y0, self.x1, self.y1 = int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max())
+        self.mask = self.frame_mask[self.y0:self.y1 + 1, self.x0:self.x1 + 1, None]
+        # 多边形恰好填满外接矩形时只需裁剪，不必逐像素掩膜
+        self.rectangular = bool(self.mask.all())
+        self.buffers = []
+
+    @property
+    def area_ratio(self):
+        """外接矩形占整帧面积的比例。"""
+        return (self.x1 - self.x0 + 1) * (self.y1 - self.y0 + 1) / float(self.frame_shape[0] * self.frame_shape[1])
+
+    def crop(self, frame, index=0):
+        """返回裁剪并掩膜后的图像；同一批中的第 index 帧复用同一块预分配缓冲区。"""
+        region = frame[self.y0:self.y1 + 1, self.x0:self.x1 + 1]
+        if self.rectangular:
+            return region
+        while len(self.buffers) <= index:
+            self.buffers.append(np.empty(region.shape, dtype=frame.dtype))
+        return np.multiply(region, self.mask, out=self.buffers[index])
+
+    def crop_batch(self, frames):
+        return [self.crop(frame, index) for index, frame in enumerate(frames)]
+
+    def inference_size(self, imgsz):
+        """按裁剪后长边与整帧长边之比缩小推理尺寸（取 32 的倍数），保持与整帧推理相同的像素比例。"""
+        scale = max(self.x1 - self.x0 + 1, self.y1 - self.y0 + 1) / float(max(self.frame_shape))
+        return max(32, int(math.ceil(imgsz * scale / 32)) * 32)
+
+    def to_frame(self, batch):
+        """把裁剪图坐标系下的 DetectionBatch 平移回整帧坐标，并丢弃底边中点落在 ROI 以外的框。"""
+        if len(batch) == 0:
+            return batch
+        boxes = batch.boxes + np.array([self.x0, self.y0, self.x0, self.y0], dtype=np.int32)
+        height, width = self.frame_shape
+        anchor_x = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, width - 1)
+        anchor_y = np.clip(boxes[:, 3], 0, height - 1)
+        keep = self.frame_mask[anchor_y, anchor_x] > 0
+        return DetectionBatch(batch.ids[keep], batch.class_ids[keep], boxes[keep], batch.confidences[keep],
+                              batch.names)
+
+    def draw(self, frame):
+        cv2.polylines(frame, self.points, True, (0, 255, 0), 1, cv2.LINE_AA)
@@ -2,42 +2,40 @@ import threading
 import tkinter as tk
 from tkinter import scrolledtext, Menu, Frame, Button, Label, Canvas, messagebox
 import cv2
-from PIL import Image, ImageTk
 import numpy as np
 import sys
 import warnings
 import queue
-from ultralytics import YOLO
-import torch
-import matplotlib.pyplot as plt
-import pandas as pd
 import time
-from urllib3.exceptions import SystemTimeWarning
 
 from constants import VEHICLE_TYPE_DISTANCE, DEFAULT_DISTANCE, y_to_depth
 from video_operations import VideoOperations
 from processing_operations import ProcessingOperations
 from statistics_operations import StatisticsOperations
 from parameter_settings import ParameterSettings
+from track_state import TrackStateStore
+from speed_statistics import SpeedStatistics
+from flow_series import FlowSeries
+from model_loader import ModelLoader
+from display_pipeline import DisplayPipeline
+from event_log import EventLog
+from perf_monitor import PerfMonitor
+from perf_panel import PerfPanel
 
 # 忽略 libpng 的 iCCP 警告
 warnings.filterwarnings("ignore", message=".*iCCP: known incorrect sRGB profile.*", category=UserWarning)
 warnings.filterwarnings("ignore", category=UserWarning, module="torch")
-warnings.filterwarnings("ignore", category=SystemTimeWarning)
-
-plt.rcParams['font.sans-serif']=['WenQuanYi Zen Hei']
-plt.rcParams['axes.unicode_minus'] = False
+# urllib3 的 SystemTimeWarning，按消息过滤以免为此在启动时导入 urllib3
+warnings.filterwarnings("ignore", message="System time is way off")
 
 class TextRedirector:
-    def __init__(self, text_widget, original_stream):
-        self.text_widget = text_widget
+    """print 的输出只放入队列，由界面线程批量写入控制台控件，任何线程调用 print 都不会等待 Tk。"""
+    def __init__(self, log_queue, original_stream):
+        self.log_queue = log_queue
         self.original_stream = original_stream
 
     def write(self, str_val):
-        self.text_widget.configure(state='normal')
-        self.text_widget.insert(tk.END, str_val)
-        self.text_widget.configure(state='disabled')
-        self.text_widget.see(tk.END)
+        self.log_queue.put(str_val)
         self.original_stream.write(str_val)
 
     def flush(self):
@@ -45,10 +43,10 @@ class TextRedirector:
 
 class VideoApp:
     def __init__(self, root):
+        self.startup_time = time.perf_counter()
         self.root = root
         self.root.title("智慧道路车辆跟踪监测系统")
-        self.last_detection_time = 0
-        self.pd = pd # Make pandas accessible
+        self.last_detection_time = None
         self.queue = queue # Make queue accessible
         self.VEHICLE_TYPE_DISTANCE = VEHICLE_TYPE_DISTANCE # Make constant accessible
 
@@ -63,6 +61,8 @@ class VideoApp:
         self.main_frame = tk.Frame(root, bg='white')
         self.main_frame.pack(fill=tk.BOTH, expand=True)
 
+        self.perf_monitor = PerfMonitor()
+        self.perf_panel = PerfPanel(self)
         self.video_ops = VideoOperations(self)
         self.processing_ops = ProcessingOperations(self)
         self.stats_ops = StatisticsOperations(self)
@@ -89,6 +89,10 @@ class VideoApp:
         menu_bar.add_cascade(label="视频源", menu=self.video_menu)
         menu_bar.add_cascade(label="视频处理", menu=self.process_menu)
         menu_bar.add_cascade(label="统计数据", menu=self.stats_menu)
+        self.perf_menu = tk.Menu(menu_bar, tearoff=0)
+        self.perf_menu.add_command(label="性能面板", command=self.perf_panel.show)
+        self.perf_menu.add_command(label="导出性能数据", command=self.perf_panel.export)
+        menu_bar.add_cascade(label="性能", menu=self.perf_menu)
 
         self.title_frame = tk.Frame(self.main_frame, bg='white')
         self.title_frame.pack(side=tk.TOP, fill=tk.X, pady=10)
@@ -98,15 +102,21 @@ class VideoApp:
         self.control_frame = tk.Frame(self.main_frame, bg='white')
         self.control_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
 
-        self.status_label = tk.Label(self.control_frame, text="未加载视频", width=20, height=2)
+        self.status_label = tk.Label(self.control_frame, text="未加载视频", width=24, height=2)
         self.status_label.grid(row=0, column=1, padx=5, pady=5)
         self.back_button = tk.Button(self.control_frame, text="返回", command=self.go_back, width=15, height=2)
         self.back_button.grid(row=0, column=0, padx=5, pady=5)
+        self.model_status_label = tk.Label(self.control_frame, text="模型加载中...", fg="orange")
+        self.model_status_label.grid(row=1, column=0, columnspan=2, padx=5)
 
         self.console_text = scrolledtext.ScrolledText(self.control_frame, width=60, height=30, state='disabled', bg='black', fg='white', wrap='word')
         self.console_text.grid(row=3, column=0, columnspan=2, padx=5, pady=10, sticky='nsew')
-        sys.stdout = TextRedirector(self.console_text, sys.stdout)
-        sys.stderr = TextRedirector(self.console_text, sys.stderr)
+        self.console_max_lines = 1000
+        self.console_queue = queue.SimpleQueue()
+        self.event_log = EventLog()
+        sys.stdout = TextRedirector(self.console_queue, sys.stdout)
+        sys.stderr = TextRedirector(self.console_queue, sys.stderr)
+        self.root.after(100, self.drain_console)
 
         self.frame0 = tk.Frame(self.control_frame)
         self.frame1 = tk.Frame(self.control_frame)
@@ -117,6 +127,10 @@ class VideoApp:
         self.is_speed_processing = False
         self.is_exception_processing = False
         self.fps = 30
+        self.weights = "model_data/best.pt"
+        # 推理后端：'pt'（PyTorch）、'onnx'（ONNX Runtime）或 'openvino'，导出的模型缓存在权重文件旁
+        self.inference_backend = "pt"
+        self.inference_int8 = False
 
         self.init_models()
         self.create_frame0()
@@ -131,23 +145,23 @@ class VideoApp:
         self.canvas_processed = tk.Canvas(self.video_frame, bg='white', width=self.canvas_width, height=self.canvas_height)
         self.canvas_processed.pack(side=tk.BOTTOM, padx=10, pady=10, expand=True)
 
-        self.image_id_original = None
-        self.image_tk_original = None
-        self.image_id_processed = None
-        self.image_tk_processed = None
+        self.display_pipeline = DisplayPipeline(self, {'original': self.canvas_original,
+                                                       'processed': self.canvas_processed})
         self.video_path = None
         self.traffic_flow = 0
-        self.speed_stats = []
-        self.flow_history = []
+        self.speed_stats = SpeedStatistics()
+        self.flow_series = FlowSeries(5)
         self.flow_counter = 0
         self.current_flow_rate = 0
-        self.vehicle_positions = {}
         self.line_y = None
         self.y_min = 0
         self.y_max = None
         self.vehicle_type_counts = {}
         self.playing = False
-        self.cap_1 = None
+        self.frame_reader = None
+        self.prefetch_size = 16
+        self.frame_pool = None
+        self.video_shape = None
         self.delay = 1
         self.virtual_cam_cap = None
         self.virtual_cam_playing = False
@@ -161,20 +175,31 @@ class VideoApp:
         self.frame_lock = threading.Lock()
         self.raw_frame_queue = queue.Queue(maxsize=20)
         self.processed_frame_queue = queue.Queue(maxsize=20)
-        self.tracked_data = pd.DataFrame(columns=['frame_num', 'id', 'class_name', 'x1', 'y1', 'x2', 'y2', 'speed'])
-        self.prev_info = {}
-        self.window_start_time = time.time()
-        self.speed_history = {}
+        # 队列在切换视频源时会被替换，登记的函数每次都读取当前对象
+        self.perf_monitor.register_queue("解码缓冲", lambda: self.frame_reader.fill_level,
+                                         lambda: self.frame_reader.buffer_size)
+        self.perf_monitor.register_queue("处理队列", lambda: self.raw_frame_queue.qsize(),
+                                         lambda: self.raw_frame_queue.maxsize)
+        self.perf_monitor.register_queue("显示队列", lambda: self.processed_frame_queue.qsize(),
+                                         lambda: self.processed_frame_queue.maxsize)
+        self.perf_monitor.register_queue("帧池占用", lambda: len(self.frame_pool) - self.frame_pool.available,
+                                         lambda: len(self.frame_pool))
+        self.tracked_data = None
+        self.track_log_root = "track_logs"
+        self.track_log_format = "parquet"
+        # 按视频、模型与阈值保存的检测结果，再次分析同一视频时直接回放；设为 None 关闭
+        self.detection_cache_root = "detection_cache"
+        # 流量窗口与测速使用帧时间戳（秒），而不是处理时的墙上时间
+        self.window_start_time = None
+        self.current_timestamp = 0.0
         self.alpha = 0.3
-        self.trajectory_history = {}
-        self.trajectory_exception_records = set()
-        self.collision_records = {}
         self.current_vehicle_id = 0 # Added for process_frames logic
 
         self.processing_thread = threading.Thread(target=self.processing_ops.process_frames, daemon=True)
         self.processing_thread.start()
-        self.root.after(30, self.update_processed_canvas)
+        self.root.after(15, self.update_processed_canvas)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        print(f"界面启动耗时 {time.perf_counter() - self.startup_time:.2f} 秒，模型在后台加载。")
 
     def create_frame0(self):
         for widget in self.frame0.winfo_children():
@@ -254,100 +279,104 @@ class VideoApp:
     def on_closing(self):
         self.playing = False
         self.virtual_cam_playing = False
-        if self.cap_1 is not None and self.cap_1.isOpened():
-            self.cap_1.release()
+        if self.frame_reader is not None:
+            self.frame_reader.stop()
+        with self.stats_lock:
+            self.processing_ops.open_track_log(None)
+            self.processing_ops.open_detection_cache(None)
         if self.virtual_cam_cap is not None and self.virtual_cam_cap.isOpened():
             self.virtual_cam_cap.release()
+        self.display_pipeline.stop()
         self.root.destroy()
 
     def init_models(self):
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        try:
-            print("加载 YOLO 模型用于车辆检测...")
-            self.vehicle_model = YOLO("model_data/best.pt")
-            self.vehicle_model.to(self.device)
-            print("YOLO 模型加载成功。")
-        except Exception as e:
-            print(f"加载 YOLO 模型时发生错误: {e}")
-            messagebox.showerror("错误", f"加载 YOLO 模型失败：{e}")
+        self.device = None
+        self.vehicle_model = None
+        self.model_loader = ModelLoader(self)
+        self.model_loader.start()
 
         self.traffic_flow = 0
         self.flow_counter = 0
         self.current_flow_rate = 0
         self.flow_window_size_seconds = 5
-        self.flow_history = []
-        self.vehicle_positions = {}
+        self.flow_series = FlowSeries(self.flow_window_size_seconds)
         self.line_y = None
         self.y_min = 0
         self.y_max = None
         self.depth_min = 5.0
         self.depth_max = 80.0
-        self.speed_stats = []
+        self.speed_stats = SpeedStatistics()
         self.vehicle_type_counts = {key: 0 for key in VEHICLE_TYPE_DISTANCE.keys()}
-        self.counted_vehicle_ids = set()
-        self.collision_records = {}
-        self.trajectory_records = set()
-        self.speed_history = {}
+        self.track_ttl_frames = 150
+        self.track_store = TrackStateStore(self.track_ttl_frames)
         self.alpha = 0.3
-        self.trajectory_history = {}
-        self.trajectory_exception_records = set()
         self.min_displacement = 10
         self.conf_threshold = 0.3
         self.iou_threshold = 0.1
         self.speed_threshold = 60.0
         self.number_of_lanes = 4
         self.angle_threshold = 30.0
+        self.inference_batch_size = 1
+        self.target_latency_ms = 0.0
+        self.motion_gate_ratio = 0.0
+        self.source_config_path = "source_config.json"
+        self.source_settings = {}
+        self.roi = None
+        # 计数线与车道区域，来自 source_config.json 的 counting 项；未配置时为 y = line_y 的默认计数线
+        self.counting_zones = None
+        self.ground_calibration = None
 
     def update_processed_canvas(self):
-        frame = None
+        slot = None
         try:
             while not self.processed_frame_queue.empty():
-                frame = self.processed_frame_queue.get_nowait()
+                newer, _ = self.processed_frame_queue.get_nowait()
+                if slot is not None:
+                    slot.release()
+                slot = newer
         except queue.Empty:
             pass
-        if frame is not None:
-            self.display_frame(frame, self.canvas_processed)
-        self.root.after(30, self.update_processed_canvas)
+        if slot is not None:
+            # 槽位的引用直接交给显示流水线，转换完成后由其释放
+            self.display_pipeline.submit('processed', slot.frame, slot)
+        self.root.after(15, self.update_processed_canvas)
+
+    def drain_console(self):
+        """每 100 ms 把队列中的输出一次性写入控制台，并只保留最后 console_max_lines 行。"""
+        self.event_log.flush()
+        chunks = []
+        try:
+            while len(chunks) < 5000:
+                chunks.append(self.console_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if chunks:
+            self.console_text.configure(state='normal')
+            self.console_text.insert(tk.END, "".join(chunks))
+            excess = int(self.console_text.index('end-1c').split('.')[0]) - self.console_max_lines
+            if excess > 0:
+                self.console_text.delete('1.0', f'{excess + 1}.0')
+            self.console_text.configure(state='disabled')
+            self.console_text.see(tk.END)
+        self.root.after(100, self.drain_console)
 
     def display_frame(self, frame, canvas):
-        try:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            canvas_width = self.canvas_width
-            canvas_height = self.canvas_height
-            img_width, img_height = img.size
-            ratio = min(canvas_width / img_width, canvas_height / img_height)
-            new_size = (int(img_width * ratio), int(img_height * ratio))
-            img = img.resize(new_size, Image.LANCZOS)
-            x = (canvas_width - new_size[0]) // 2
-            y = (canvas_height - new_size[1]) // 2
-            img_tk = ImageTk.PhotoImage(image=img)
-
-            if canvas == self.canvas_original:
-                if self.image_id_original is None:
-                    self.image_id_original = canvas.create_image(x, y, anchor=tk.NW, image=img_tk)
-                else:
-                    canvas.coords(self.image_id_original, x, y)
-                    canvas.itemconfig(self.image_id_original, image=img_tk)
-                self.image_tk_original = img_tk
-            elif canvas == self.canvas_processed:
-                if self.image_id_processed is None:
-                    self.image_id_processed = canvas.create_image(x, y, anchor=tk.NW, image=img_tk)
-                else:
-                    canvas.coords(self.image_id_processed, x, y)
-                    canvas.itemconfig(self.image_id_processed, image=img_tk)
-                self.image_tk_processed = img_tk
-        except Exception as e:
-            print(f"显示帧时发生错误: {e}")
+        """提交一帧到显示流水线（可在任意线程调用），帧会被复制，调用方之后可以继续使用或修改它。"""
+        self.display_pipeline.submit('original' if canvas == self.canvas_original else 'processed', frame)
 
     def update_status_label(self):
         if self.virtual_cam_playing:
             self.status_label.config(text="正在使用摄像头")
         elif self.video_path:
             if self.total_frames > 0:
-                self.status_label.config(text=f"当前帧: {self.current_frame} / {self.total_frames}")
+                text = f"当前帧: {self.current_frame} / {self.total_frames}"
             else:
-                self.status_label.config(text=f"当前帧: {self.current_frame}")
+                text = f"当前帧: {self.current_frame}"
+            if self.frame_reader is not None:
+                text += (f"\n解码 {self.frame_reader.decode_fps:.0f} FPS | "
+                         f"缓冲 {self.frame_reader.fill_level}/{self.frame_reader.buffer_size}")
+            text += f"\n显示 {self.display_pipeline.display_fps('original'):.0f} FPS"
+            self.status_label.config(text=text)
         else:
             self.status_label.config(text="未加载视频")
 
@@ -0,0 +1,48 @@
+import os
+import json
+
+# 按视频源保存的现场配置（ROI 等），键为视频文件名或 "camera"，找不到时使用 "default" 项
+DEFAULT_SOURCE_CONFIG = "source_config.json"
+
+
+def source_key(source):
+    """
+    视频源在配置文件中的键。
+    :param source: 视频文件路径，摄像头传入 None 或设备号
+    :return: 视频文件名，摄像头为 "camera"
+    """
+    if source is None or isinstance(source, int):
+        return "camera"
+    return os.path.basename(str(source))
+
+
+def load_source_settings(source, path=DEFAULT_SOURCE_CONFIG):
+    """
+    读取配置文件中与视频源对应的配置项。
+    :param source: 视频文件路径，摄像头传入 None 或设备号
+    :param path: 配置文件路径
+    :return: 配置字典，配置文件不存在或没有对应项时返回空字典
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取视频源配置 {path} 时发生错误: {e}")
+        return {}
+    return dict(config.get(source_key(source), config.get("default", {})))
+
+
+def parse_polygon(text):
+    """
+    解析命令行中的多边形，格式为以空格分隔的 "x,y" 顶点，例如 "0,400 1280,400 1280,720 0,720"。
+    坐标均不大于 1 时按画面宽高的比例解释。
+    """
+    points = []
+    for vertex in text.split():
+        x, y = vertex.split(",")
+        points.append([float(x), float(y)])
+    if len(points) < 3:
+        raise ValueError(f"多边形至少需要 3 个顶点: {text}")
+    return points
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def default_cell_size(boxes, min_size=16):
+    """网格边长取检测框宽高中位数的较大者，使大多数框只覆盖 1~4 个单元。"""
+    if len(boxes) == 0:
+        return min_size
+    widths = boxes[:, 2] - boxes[:, 0] + 1
+    heights = boxes[:, 3] - boxes[:, 1] + 1
+    return max(min_size, int(max(np.median(widths), np.median(heights))))
+
+
+def candidate_pairs(boxes, cell_size=None):
+    """
+    均匀网格粗筛：把每个框登记到它覆盖的所有网格单元，只有共享至少一个单元的框才构成候选对。
+    两个框只要相交（含边界）就必然共享单元，因此任何 IoU > 0 的框对都不会被漏掉。
+    全程向量化，不含逐框的 Python 循环。
+    :param boxes: (n, 4) 的 x1, y1, x2, y2 数组
+    :param cell_size: 网格边长（像素），默认由 default_cell_size 估计
+    :return: (i, j) 两个 int64 数组，i < j，按 (i, j) 字典序排列且无重复
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    n = len(boxes)
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if cell_size is None:
+        cell_size = default_cell_size(boxes)
+
+    cells = np.floor_divide(boxes.astype(np.int64), int(cell_size))
+    cx0, cy0, cx1, cy1 = cells[:, 0], cells[:, 1], cells[:, 2], cells[:, 3]
+    span_x = cx1 - cx0 + 1
+    span_y = cy1 - cy0 + 1
+    per_box = span_x * span_y
+
+    # 展开 (框, 单元) 登记表
+    box_idx = np.repeat(np.arange(n, dtype=np.int64), per_box)
+    offsets = np.arange(per_box.sum(), dtype=np.int64) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+    gx = cx0[box_idx] + offsets % span_x[box_idx]
+    gy = cy0[box_idx] + offsets // span_x[box_idx]
+    gx -= gx.min()
+    gy -= gy.min()
+    keys = gy * (gx.max() + 1) + gx
+
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    box_idx = box_idx[order]
+
+    # 同一单元内，每条登记与其后的所有登记配对
+    positions = np.arange(len(keys), dtype=np.int64)
+    group_end = np.searchsorted(keys, keys, side='right')
+    partners = group_end - positions - 1
+    first = np.repeat(positions, partners)
+    second = first + 1 + (np.arange(partners.sum(), dtype=np.int64) - np.repeat(np.cumsum(partners) - partners, partners))
+
+    a = box_idx[first]
+    b = box_idx[second]
+    codes = np.unique(np.minimum(a, b) * n + np.maximum(a, b))
+    return codes // n, codes % n
+
+
+def pair_iou(boxes, i, j):
+    """只对给定的框对计算 IoU（与 compute_iou 的像素 +1 约定一致），返回一维数组。"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    a = boxes[i]
+    b = boxes[j]
+    inter = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]) + 1, 0, None) * \
+        np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]) + 1, 0, None)
+    area_a = (a[:, 2] - a[:, 0] + 1) * (a[:, 3] - a[:, 1] + 1)
+    area_b = (b[:, 2] - b[:, 0] + 1) * (b[:, 3] - b[:, 1] + 1)
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def overlapping_pairs(boxes, cell_size=None):
+    """粗筛 + 精确 IoU：返回 IoU 大于 0 的框对 (i, j, iou)。"""
+    i, j = candidate_pairs(boxes, cell_size)
+    iou = pair_iou(boxes, i, j)
+    hit = iou > 0
+    return i[hit], j[hit], iou[hit]
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class SpeedHistogram:
+    """
+    固定内存的速度直方图：0~max_speed km/h 按 bin_width 等宽分箱，每次更新 O(1)。
+    速度在 calculate_speed 中已被限制在 0~200 km/h，因此细分箱同时充当分位数草图，
+    分位数误差不超过一个分箱宽度（默认 0.5 km/h）。速度为 0 的样本单独计数，不进入分箱。
+    """
+    def __init__(self, max_speed=200.0, bin_width=0.5):
+        self.max_speed = max_speed
+        self.bin_width = bin_width
+        self.num_bins = int(np.ceil(max_speed / bin_width))
+        self.counts = [0] * self.num_bins
+        self.zero_count = 0
+        self.total = 0
+        self.speed_sum = 0.0
+        self.speed_max = 0.0
+
+    def __len__(self):
+        return self.total + self.zero_count
+
+    def add(self, speed):
+        if speed <= 0:
+            self.zero_count += 1
+            return
+        index = int(speed / self.bin_width)
+        self.counts[index if index < self.num_bins else self.num_bins - 1] += 1
+        self.total += 1
+        self.speed_sum += speed
+        if speed > self.speed_max:
+            self.speed_max = speed
+
+    @property
+    def mean(self):
+        return self.speed_sum / self.total if self.total else 0.0
+
+    def quantile(self, q):
+        """正速度样本的 q 分位数（0~1），在命中的分箱内线性插值。"""
+        if self.total == 0:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        target = q * self.total
+        index = int(np.searchsorted(cumulative, target, side='left'))
+        index = min(index, self.num_bins - 1)
+        before = cumulative[index - 1] if index > 0 else 0
+        in_bin = self.counts[index]
+        fraction = (target - before) / in_bin if in_bin else 0.0
+        return float(min((index + fraction) * self.bin_width, self.speed_max))
+
+    def histogram(self, bins=20):
+        """
+        把细分箱合并成 bins 个覆盖实际速度范围的等宽区间，效果等同于对原始样本调用 np.histogram。
+        :return: (counts, edges)
+        """
+        counts = np.asarray(self.counts, dtype=np.int64)
+        occupied = np.flatnonzero(counts)
+        if occupied.size == 0:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+        low = occupied[0] * self.bin_width
+        high = min((occupied[-1] + 1) * self.bin_width, self.max_speed)
+        edges = np.linspace(low, high, bins + 1)
+        centers = (occupied + 0.5) * self.bin_width
+        coarse = np.clip(np.searchsorted(edges, centers, side='right') - 1, 0, bins - 1)
+        return np.bincount(coarse, weights=counts[occupied], minlength=bins).astype(np.int64), edges
+
+
+class SpeedStatistics:
+    """整体与按车型拆分的速度直方图集合，取代原先无限增长的 speed_stats 列表。"""
+    def __init__(self, max_speed=200.0, bin_width=0.5):
+        self.max_speed = max_speed
+        self.bin_width = bin_width
+        self.overall = SpeedHistogram(max_speed, bin_width)
+        self.by_class = {}
+
+    def __len__(self):
+        return len(self.overall)
+
+    def add(self, speed, class_name=None):
+        self.overall.add(speed)
+        if class_name is not None:
+            histogram = self.by_class.get(class_name)
+            if histogram is None:
+                histogram = self.by_class[class_name] = SpeedHistogram(self.max_speed, self.bin_width)
+            histogram.add(speed)
+
+    def get(self, class_name=None):
+        if class_name is None:
+            return self.overall
+        return self.by_class.get(class_name)
+
+    def percentiles(self, quantiles=(0.5, 0.85, 0.95), class_name=None):
+        histogram = self.get(class_name)
+        if histogram is None:
+            return {q: 0.0 for q in quantiles}
+        return {q: histogram.quantile(q) for q in quantiles}
+
+    def summary(self, quantiles=(0.5, 0.85, 0.95)):
+        def describe(histogram):
+            result = {'samples': histogram.total, 'mean': histogram.mean, 'max': histogram.speed_max}
+            for q in quantiles:
+                result[f'p{int(round(q * 100))}'] = histogram.quantile(q)
+            return result
+        return {
+            'overall': describe(self.overall),
+            'by_class': {name: describe(histogram) for name, histogram in self.by_class.items()},
+        }
@@ -1,9 +1,26 @@
 import tkinter as tk
 from tkinter import messagebox, Toplevel, Frame, Button
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
+
+def load_matplotlib():
+    """首次打开统计窗口时才导入 matplotlib 及其 Tk 后端，并设置中文字体，避免拖慢程序启动。"""
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+    plt.rcParams['font.sans-serif'] = ['WenQuanYi Zen Hei']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt, FigureCanvasTkAgg
+
+
+def format_timestamp(seconds):
+    """把秒数格式化为 [天+]时:分:秒。"""
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    text = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{days}天+{text}" if days else text
+
+
 class StatisticsOperations:
     def __init__(self, app_instance):
         self.app = app_instance
@@ -15,10 +32,10 @@ class StatisticsOperations:
                 messagebox.showinfo("处理中", "视频正在处理，请稍后再操作。")
                 return
 
-            if not self.app.flow_history:
+            if not len(self.app.flow_series):
                 messagebox.showerror("错误", "暂无车流量统计数据。请先处理视频。")
                 return
-            flow_per_window = self.app.flow_history.copy()
+            horizons = self.app.flow_series.names
 
         stats_window = Toplevel(self.app.root)
         stats_window.title("车流量统计")
@@ -28,10 +45,15 @@ class StatisticsOperations:
         chart_frame = Frame(stats_window)
         chart_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.app.traffic_current_chart_type = tk.StringVar(value="柱状图")
+        self.app.traffic_current_horizon = tk.StringVar(value=horizons[0])
 
-        def plot_chart(chart_type):
-            self.app.traffic_current_chart_type.set(chart_type)
-            self.update_traffic_flow_chart(fig, ax, chart_type)
+        def plot_chart(chart_type=None, horizon=None):
+            if chart_type is not None:
+                self.app.traffic_current_chart_type.set(chart_type)
+            if horizon is not None:
+                self.app.traffic_current_horizon.set(horizon)
+            self.update_traffic_flow_chart(fig, ax, self.app.traffic_current_chart_type.get(),
+                                           self.app.traffic_current_horizon.get())
             canvas.draw()
 
         button_bar = Button(button_frame, text="柱状图", command=lambda: plot_chart("柱状图"))
@@ -40,43 +62,64 @@ class StatisticsOperations:
         button_horizontal_bar.pack(side=tk.LEFT, padx=5, pady=5)
         button_line = Button(button_frame, text="折线图", command=lambda: plot_chart("折线图"))
         button_line.pack(side=tk.LEFT, padx=5, pady=5)
+        # 时间粒度：直接读取对应级别的汇总序列
+        for horizon in reversed(horizons):
+            Button(button_frame, text=horizon,
+                   command=lambda h=horizon: plot_chart(horizon=h)).pack(side=tk.RIGHT, padx=5, pady=5)
 
+        plt, FigureCanvasTkAgg = load_matplotlib()
         fig, ax = plt.subplots(figsize=(8, 6))
-        self.update_traffic_flow_chart(fig, ax, self.app.traffic_current_chart_type.get())
+        self.update_traffic_flow_chart(fig, ax, self.app.traffic_current_chart_type.get(),
+                                       self.app.traffic_current_horizon.get())
         plt.tight_layout()
 
         canvas = FigureCanvasTkAgg(fig, master=chart_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-    def update_traffic_flow_chart(self, fig, ax, chart_type):
+    def update_traffic_flow_chart(self, fig, ax, chart_type, horizon=None):
         # ... (Copy from original file's update_traffic_flow_chart method)
         ax.clear()
-        flow_per_window = self.app.flow_history.copy()
+        with self.app.stats_lock:
+            starts, values = self.app.flow_series.history(horizon or 0)
+        flow_per_window = values.tolist()
         num_windows = len(flow_per_window)
         windows = range(1, num_windows + 1)
+        horizon = horizon or self.app.flow_series.names[0]
+        # 数据点较多时不再逐个标注数值，只标注时间刻度
+        annotate = num_windows <= 40
     
         if chart_type == "柱状图":
             ax.bar(windows, flow_per_window, color='skyblue', align='center')
             ax.set_title('车流量统计 (veh/h) - 柱状图')
-            ax.set_xlabel(f'时间窗口 (每{self.app.flow_window_size_seconds}秒)')
+            ax.set_xlabel(f'时间窗口 (每{horizon})')
             ax.set_ylabel('车流量 (veh/h)')
-            for i, v in enumerate(flow_per_window):
+            for i, v in enumerate(flow_per_window if annotate else []):
                 ax.text(windows[i], v + 0.1, f'{v:.2f}', ha='center', va='bottom')
         elif chart_type == "条形图":
             ax.barh(windows, flow_per_window, color='skyblue', align='center')
             ax.set_title('车流量统计 (veh/h) - 条形图')
             ax.set_xlabel('车流量 (veh/h)')
-            ax.set_ylabel(f'时间窗口 (每{self.app.flow_window_size_seconds}秒)')
-            for i, v in enumerate(flow_per_window):
+            ax.set_ylabel(f'时间窗口 (每{horizon})')
+            for i, v in enumerate(flow_per_window if annotate else []):
                 ax.text(v + 0.1, windows[i], f'{v:.2f}', ha='left', va='center')
         elif chart_type == "折线图":
-            ax.plot(windows, flow_per_window, marker='o', linestyle='-', color='green')
+            ax.plot(windows, flow_per_window, marker='o' if annotate else None, linestyle='-', color='green')
             ax.set_title('车流量统计 (veh/h) - 折线图')
-            ax.set_xlabel(f'时间窗口 (每{self.app.flow_window_size_seconds}秒)')
+            ax.set_xlabel(f'时间窗口 (每{horizon})')
             ax.set_ylabel('车流量 (veh/h)')
-            for i, v in enumerate(flow_per_window):
+            for i, v in enumerate(flow_per_window if annotate else []):
                 ax.text(windows[i], v + 0.1, f'{v:.2f}', ha='center', va='bottom')
+
+        # 时间刻度标注各窗口的起始时间（视频为媒体时间）
+        ticks = list(windows)[::max(1, num_windows // 8)]
+        labels = [format_timestamp(starts[tick - 1]) for tick in ticks]
+        if chart_type == "条形图":
+            ax.set_yticks(ticks)
+            ax.set_yticklabels(labels)
+        else:
+            ax.set_xticks(ticks)
+            ax.set_xticklabels(labels)
     
         if chart_type == "条形图":
             ax.set_xlim(0, max(flow_per_window) * 1.1 if flow_per_window else 1)
@@ -99,36 +142,60 @@ class StatisticsOperations:
                 messagebox.showerror("错误", "暂无速度统计数据。请先处理视频。")
                 return
     
-            filtered_speeds = [speed for speed in self.app.speed_stats if speed > 0]
-            total = len(filtered_speeds)
-    
-            if total == 0:
+            if self.app.speed_stats.overall.total == 0:
                 messagebox.showerror("错误", "所有速度记录均为0。")
                 return
+            class_names = sorted(name for name, histogram in self.app.speed_stats.by_class.items() if histogram.total > 0)
     
         stats_window = Toplevel(self.app.root)
         stats_window.title("速度统计")
         stats_window.geometry("800x600")
+        button_frame = Frame(stats_window)
+        button_frame.pack(side=tk.TOP, fill=tk.X)
+        chart_frame = Frame(stats_window)
+        chart_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
     
+        plt, FigureCanvasTkAgg = load_matplotlib()
         fig, ax = plt.subplots(figsize=(8, 6))
+
+        def plot_chart(class_name):
+            self.update_speed_chart(fig, ax, class_name)
+            canvas.draw()
+
+        Button(button_frame, text="全部", command=lambda: plot_chart(None)).pack(side=tk.LEFT, padx=5, pady=5)
+        for class_name in class_names:
+            Button(button_frame, text=class_name,
+                   command=lambda name=class_name: plot_chart(name)).pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.update_speed_chart(fig, ax, None)
     
-        counts, bins = np.histogram(filtered_speeds, bins=20)
-        percentages = (counts / total) * 100
+        canvas = FigureCanvasTkAgg(fig, master=chart_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def update_speed_chart(self, fig, ax, class_name):
+        from matplotlib.ticker import FuncFormatter
+
+        ax.clear()
+        with self.app.stats_lock:
+            histogram = self.app.speed_stats.get(class_name)
+            counts, bins = histogram.histogram(bins=20)
+            percentiles = self.app.speed_stats.percentiles((0.5, 0.85, 0.95), class_name)
+        total = counts.sum()
+        percentages = (counts / total) * 100 if total else counts.astype(float)
     
         ax.bar(bins[:-1], percentages, width=np.diff(bins), align='edge', color='green', edgecolor='black')
-        ax.set_title('车辆速度分布（百分比）')
+        title = '车辆速度分布（百分比）' if class_name is None else f'{class_name} 速度分布（百分比）'
+        ax.set_title(f"{title}\np50 {percentiles[0.5]:.1f} / p85 {percentiles[0.85]:.1f} / "
+                     f"p95 {percentiles[0.95]:.1f} km/h")
         ax.set_xlabel('速度 (km/h)')
         ax.set_ylabel('百分比 (%)')
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f'{x:.1f}%'))
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, _: f'{x:.1f}%'))
     
         for i, v in enumerate(percentages):
             ax.text(bins[i] + (bins[i + 1] - bins[i]) / 2, v + 0.5, f'{v:.2f}%', ha='center', va='bottom')
     
-        plt.tight_layout()
-    
-        canvas = FigureCanvasTkAgg(fig, master=stats_window)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        fig.tight_layout()
 
     def show_vehicle_type_statistics(self):
         # ... (Copy from original file's show_vehicle_type_statistics method)
@@ -148,6 +215,7 @@ class StatisticsOperations:
         chart_frame = Frame(stats_window)
         chart_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
     
+        plt, FigureCanvasTkAgg = load_matplotlib()
         fig, ax = plt.subplots(figsize=(8, 6))
         types = list(self.app.vehicle_type_counts.keys())
         counts = list(self.app.vehicle_type_counts.values())
@@ -0,0 +1,208 @@
+import os
+import glob
+import queue
+import threading
+import importlib.util
+import numpy as np
+
+# 列名与 VideoApp.tracked_data 原先的 DataFrame 列保持一致，另加异常类型编码（0 表示正常）
+TRACK_LOG_COLUMNS = ['frame_num', 'id', 'class_name', 'x1', 'y1', 'x2', 'y2', 'speed', 'exception']
+EXCEPTION_CODES = {
+    'Speeding Exception': 1,
+    'Trajectory Exception': 2,
+    'Collision Exception': 3
+}
+
+
+class TrackLogChunk:
+    """一块预分配的列式缓冲区，每列一个定长 NumPy 数组。"""
+    def __init__(self, rows):
+        self.capacity = rows
+        self.size = 0
+        self.frame_num = np.empty(rows, dtype=np.int64)
+        self.id = np.empty(rows, dtype=np.int64)
+        self.class_id = np.empty(rows, dtype=np.int16)
+        self.boxes = np.empty((rows, 4), dtype=np.int32)
+        self.speed = np.empty(rows, dtype=np.float32)
+        self.exception = np.empty(rows, dtype=np.int8)
+
+
+class TrackLogBuffer:
+    """
+    逐帧跟踪日志：检测结果按列追加到预分配的 NumPy 缓冲区，写满 chunk_rows 行后交给后台线程
+    写成一个 Parquet / Arrow IPC 文件（未安装 pyarrow 时退化为 .npz），然后复用这块缓冲区。
+    始终只有两块缓冲区轮换，内存占用固定；写盘跟不上时追加方会短暂等待。
+    """
+    def __init__(self, output_dir, chunk_rows=65536, file_format='parquet', names=None):
+        if file_format not in ('parquet', 'arrow', 'npz'):
+            raise ValueError(f"不支持的跟踪日志格式: {file_format}")
+        # pyarrow 只在后台写盘线程中导入，不拖慢程序启动
+        if file_format != 'npz' and importlib.util.find_spec("pyarrow") is None:
+            print("未安装 pyarrow，跟踪日志改为输出 .npz 文件。")
+            file_format = 'npz'
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.names = dict(names or {})
+        self.rows_written = 0
+        self.files = []
+
+        self.free_chunks = queue.Queue()
+        for _ in range(2):
+            self.free_chunks.put(TrackLogChunk(chunk_rows))
+        self.pending = queue.Queue()
+        self.current = self.free_chunks.get()
+        self.part_index = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.writer_thread = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer_thread.start()
+
+    def append(self, frame_num, ids, class_ids, boxes, speeds, exceptions, names=None):
+        """
+        追加一帧的全部检测结果（各参数为等长的一维数组，boxes 为 (n, 4)）。
+        :param exceptions: 异常类型编码数组，见 EXCEPTION_CODES
+        """
+        count = len(ids)
+        if count == 0:
+            return
+        with self.lock:
+            if self.closed:
+                return
+            if names:
+                self.names.update(names)
+            start = 0
+            while start < count:
+                chunk = self.current
+                take = min(count - start, chunk.capacity - chunk.size)
+                rows = slice(chunk.size, chunk.size + take)
+                part = slice(start, start + take)
+                chunk.frame_num[rows] = frame_num
+                chunk.id[rows] = ids[part]
+                chunk.class_id[rows] = class_ids[part]
+                chunk.boxes[rows] = boxes[part]
+                chunk.speed[rows] = speeds[part]
+                chunk.exception[rows] = exceptions[part]
+                chunk.size += take
+                start += take
+                if chunk.size == chunk.capacity:
+                    self.hand_off()
+
+    def hand_off(self):
+        # 调用方持有 self.lock
+        if self.current.size == 0:
+            return
+        self.pending.put((self.current, self.part_index))
+        self.part_index += 1
+        self.current = self.free_chunks.get()
+
+    def flush(self):
+        """把未写满的缓冲区也交给后台线程写盘，并等待所有已交付的块写完。"""
+        with self.lock:
+            self.hand_off()
+        self.pending.join()
+
+    def close(self):
+        """写出剩余数据并结束后台线程；之后的 append 调用会被忽略。"""
+        with self.lock:
+            if self.closed:
+                return
+            self.hand_off()
+            self.closed = True
+        self.pending.join()
+        self.pending.put(None)
+        self.writer_thread.join(timeout=5)
+
+    def write_chunks(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.pending.task_done()
+                break
+            chunk, part_index = item
+            try:
+                path = self.write_chunk(chunk, part_index)
+                self.files.append(path)
+                self.rows_written += chunk.size
+            except Exception as e:
+                print(f"写入跟踪日志时发生错误: {e}")
+            finally:
+                chunk.size = 0
+                self.free_chunks.put(chunk)
+                self.pending.task_done()
+
+    def write_chunk(self, chunk, part_index):
+        n = chunk.size
+        dictionary = [self.names.get(i, "unknown") for i in range(max(self.names, default=-1) + 1)] or ["unknown"]
+        base = os.path.join(self.output_dir, f"part-{part_index:05d}")
+        if self.file_format == 'npz':
+            path = base + ".npz"
+            np.savez(path, frame_num=chunk.frame_num[:n], id=chunk.id[:n], class_id=chunk.class_id[:n],
+                     boxes=chunk.boxes[:n], speed=chunk.speed[:n], exception=chunk.exception[:n],
+                     class_names=np.asarray(dictionary))
+            return path
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        class_ids = chunk.class_id[:n].astype(np.int32)
+        # 字典外的类别编号与 npz 格式一样记为 "unknown"，而不是空值
+        invalid = (class_ids < 0) | (class_ids >= len(dictionary))
+        if invalid.any():
+            if "unknown" not in dictionary:
+                dictionary.append("unknown")
+            class_ids[invalid] = dictionary.index("unknown")
+        table = pa.table({
+            'frame_num': chunk.frame_num[:n],
+            'id': chunk.id[:n],
+            'class_name': pa.DictionaryArray.from_arrays(pa.array(class_ids), dictionary),
+            'x1': chunk.boxes[:n, 0],
+            'y1': chunk.boxes[:n, 1],
+            'x2': chunk.boxes[:n, 2],
+            'y2': chunk.boxes[:n, 3],
+            'speed': chunk.speed[:n],
+            'exception': chunk.exception[:n],
+        })
+        if self.file_format == 'parquet':
+            path = base + ".parquet"
+            pq.write_table(table, path)
+        else:
+            path = base + ".arrow"
+            with pa.OSFile(path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        return path
+
+
+def read_track_log(directory):
+    """把一个跟踪日志目录中的全部分块读回为一个 pandas DataFrame，用于离线分析。"""
+    import pandas as pd
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, "part-*"))):
+        if path.endswith(".parquet"):
+            frames.append(pd.read_parquet(path))
+        elif path.endswith(".arrow"):
+            import pyarrow as pa
+
+            with pa.memory_map(path) as source:
+                frames.append(pa.ipc.open_file(source).read_all().to_pandas())
+        elif path.endswith(".npz"):
+            data = np.load(path)
+            names = data['class_names']
+            class_id = data['class_id'].astype(np.int64)
+            valid = (class_id >= 0) & (class_id < len(names))
+            frames.append(pd.DataFrame({
+                'frame_num': data['frame_num'],
+                'id': data['id'],
+                'class_name': np.where(valid, names[np.clip(class_id, 0, len(names) - 1)], "unknown"),
+                'x1': data['boxes'][:, 0],
+                'y1': data['boxes'][:, 1],
+                'x2': data['boxes'][:, 2],
+                'y2': data['boxes'][:, 3],
+                'speed': data['speed'],
+                'exception': data['exception'],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=TRACK_LOG_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,78 @@
+from collections import OrderedDict, deque
+
+
+class TrackState:
+    """单个跟踪目标的全部分析状态（测速、平滑速度、轨迹、过线计数、碰撞与轨迹异常记录、最近检测框）。"""
+    __slots__ = ('track_id', 'last_seen', 'prev_info', 'speed', 'trajectory', 'flow_anchor', 'flow_counted',
+                 'type_counted', 'collisions', 'trajectory_exception_frame', 'box', 'box_frame')
+
+    def __init__(self, track_id, last_seen):
+        self.track_id = track_id
+        self.last_seen = last_seen
+        self.prev_info = None
+        self.speed = None
+        self.trajectory = deque(maxlen=3)
+        # 上一帧的中心点与已计过数的计数线位掩码
+        self.flow_anchor = None
+        self.flow_counted = 0
+        self.type_counted = False
+        self.collisions = {}
+        self.trajectory_exception_frame = None
+        # 最近一次真实检测到的框及其帧号，供恒速运动模型计算逐帧位移
+        self.box = None
+        self.box_frame = None
+
+
+class TrackStateStore:
+    """
+    以跟踪ID为键的状态仓库。每分析一帧调用一次 advance()，超过 ttl_frames 帧未再出现的目标会被淘汰，
+    长时间运行的摄像头会话内存保持平稳。
+    内部用 OrderedDict 按最近出现时间排序，淘汰只需从头部弹出，开销与被淘汰的数量成正比。
+    """
+    def __init__(self, ttl_frames=150):
+        self.ttl_frames = ttl_frames
+        self.tracks = OrderedDict()
+        self.clock = 0
+        self.evicted_count = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self.tracks
+
+    @property
+    def live_count(self):
+        return len(self.tracks)
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def touch(self, track_id):
+        """取得（必要时创建）目标状态，并把它标记为在当前帧出现过。"""
+        state = self.tracks.get(track_id)
+        if state is None:
+            state = TrackState(track_id, self.clock)
+            self.tracks[track_id] = state
+        elif state.last_seen != self.clock:
+            state.last_seen = self.clock
+            self.tracks.move_to_end(track_id)
+        return state
+
+    def advance(self):
+        """进入下一帧并淘汰过期目标，返回本次淘汰的数量。"""
+        self.clock += 1
+        evicted = 0
+        while self.tracks:
+            state = next(iter(self.tracks.values()))
+            if self.clock - state.last_seen <= self.ttl_frames:
+                break
+            self.tracks.popitem(last=False)
+            evicted += 1
+        self.evicted_count += evicted
+        return evicted
+
+    def clear(self):
+        self.tracks.clear()
+        self.clock = 0
+        self.evicted_count = 0
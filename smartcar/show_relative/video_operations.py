@@ -4,10 +4,16 @@ import cv2
 import queue
 import threading
 import time
+from .frame_reader import FrameReader
+from .frame_pool import FramePool, release_queue
+
+# 显示端同时持有的槽位：显示流水线待转换与转换中的各一帧，以及处理结果队列中尚未取走的帧
+DISPLAY_SLOTS = 4
 
 class VideoOperations:
     def __init__(self, app_instance):
         self.app = app_instance
+        self.playback_anchor = None
 
     def check_conflict(self, action):
         # ... (Copy from original file's check_conflict method)
@@ -48,10 +54,9 @@ class VideoOperations:
         if not self.app.video_path:
             return
     
-        if self.app.cap_1 is not None:
-            if self.app.cap_1.isOpened():
-                self.app.cap_1.release()
-            self.app.cap_1 = None
+        if self.app.frame_reader is not None:
+            self.app.frame_reader.stop()
+            self.app.frame_reader = None
     
         cap = cv2.VideoCapture(self.app.video_path)
         if not cap.isOpened():
@@ -74,23 +79,12 @@ class VideoOperations:
         self.app.y_max = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.app.line_y = int(self.app.y_max * 0.5)
         cap.release()
+        self.app.video_shape = (self.app.y_max, video_width, 3)
+        self.create_frame_pool(self.app.video_shape)
     
         with self.app.stats_lock:
-            self.app.tracked_data = self.app.pd.DataFrame(columns=['frame_num', 'id', 'class_name', 'x1', 'y1', 'x2', 'y2', 'speed'])
-            self.app.speed_stats = []
-            self.app.flow_history = []
-            self.app.flow_counter = 0
-            self.app.current_flow_rate = 0
-            self.app.vehicle_positions = {}
-            self.app.collision_records = {}
-            self.app.trajectory_records = set()
-            self.app.speed_history = {}
-            self.app.trajectory_history = {}
-            self.app.processed_objects = {}
-            self.app.vehicle_type_counts = {key: 0 for key in self.app.VEHICLE_TYPE_DISTANCE.keys()}
-            self.app.trajectory_exception_records = set()
-            self.app.counted_vehicle_ids = set()
-            self.app.window_start_time = time.time()
+            self.app.processing_ops.reset_statistics(self.app.processing_ops.session_log_dir(self.app.video_path))
+            self.app.processing_ops.configure_source(self.app.video_path, self.app.video_shape)
     
         cap = cv2.VideoCapture(self.app.video_path)
         if not cap.isOpened():
@@ -102,18 +96,13 @@ class VideoOperations:
             self.app.display_frame(frame, self.app.canvas_original)
             self.app.display_frame(frame, self.app.canvas_processed)
             with self.app.frame_lock:
-                self.app.latest_frame = frame.copy()
+                self.app.latest_frame = frame
     
-            try:
-                self.app.raw_frame_queue.put_nowait((frame.copy(), self.app.current_frame))
-            except queue.Full:
-                try:
-                    self.app.raw_frame_queue.get_nowait()
-                    self.app.raw_frame_queue.put_nowait((frame.copy(), self.app.current_frame))
-                except queue.Empty:
-                    pass
+            slot = self.app.frame_pool.store(self.app.frame_pool.acquire(timeout=0), frame)
+            slot.timestamp = 0.0
+            self.push_raw_frame(slot, self.app.current_frame)
         cap.release()
-        self.app.cap_1 = None
+        self.app.frame_reader = None
         self.app.playing = False
         self.app.current_frame = 0
         self.app.update_status_label()
@@ -135,8 +124,12 @@ class VideoOperations:
             if self.app.current_frame >= self.app.total_frames:
                 self.app.current_frame = 0
                 print("视频已播放完毕，重新开始播放")
+                # 保存上一遍的检测缓存并重新打开，完整的缓存可在这一遍直接回放
+                with self.app.stats_lock:
+                    self.app.processing_ops.open_detection_cache(self.app.video_path)
     
             self.app.playing = True
+            self.playback_anchor = None
             self.play_video()
 
     def stop_playback(self):
@@ -148,10 +141,9 @@ class VideoOperations:
             self.app.playing = False
             print("停止播放。")
 
-        if self.app.cap_1 is not None:
-            if self.app.cap_1.isOpened():
-                self.app.cap_1.release()
-            self.app.cap_1 = None
+        if self.app.frame_reader is not None:
+            self.app.frame_reader.stop()
+            self.app.frame_reader = None
 
         if self.app.video_path:
             cap = cv2.VideoCapture(self.app.video_path)
@@ -161,57 +153,72 @@ class VideoOperations:
                     self.app.display_frame(frame, self.app.canvas_original)
                     self.app.display_frame(frame, self.app.canvas_processed)
                     with self.app.frame_lock:
-                        self.app.latest_frame = frame.copy()
+                        self.app.latest_frame = frame
             cap.release()
 
-            with self.app.raw_frame_queue.mutex:
-                self.app.raw_frame_queue.queue.clear()
-            with self.app.processed_frame_queue.mutex:
-                self.app.processed_frame_queue.queue.clear()
+            release_queue(self.app.raw_frame_queue)
+            release_queue(self.app.processed_frame_queue)
+            with self.app.stats_lock:
+                self.app.processing_ops.open_detection_cache(self.app.video_path)
 
             self.app.update_status_label()
             self.app.current_frame = 0
 
     def play_video(self):
-        # ... (Copy from original file's play_video method)
         if not self.app.playing:
             return
 
-        if self.app.cap_1 is None:
-            self.app.cap_1 = cv2.VideoCapture(self.app.video_path)
-            if not self.app.cap_1.isOpened():
+        if self.app.frame_reader is None:
+            # 批大小可能已在参数设置中修改，槽位数随之重新估计
+            if self.app.frame_pool is None or self.app.frame_pool.shape != self.app.video_shape or \
+                    len(self.app.frame_pool) != self.frame_pool_size():
+                self.create_frame_pool(self.app.video_shape)
+            reader = FrameReader(self.app.video_path, buffer_size=self.app.prefetch_size, pool=self.app.frame_pool,
+                                 monitor=self.app.perf_monitor)
+            if not reader.isOpened():
                 messagebox.showerror("错误", "无法打开视频。")
-                self.app.cap_1 = None
+                reader.stop()
                 self.app.playing = False
                 return
+            self.app.frame_reader = reader.start()
             self.app.current_vehicle_id = 0 
             self.app.current_frame = 0 
-            
-        ret, frame = self.app.cap_1.read()
-        if ret:
-            self.app.display_frame(frame, self.app.canvas_original)
-            try:
-                self.app.raw_frame_queue.put_nowait((frame.copy(), self.app.current_frame))
-            except queue.Full:
-                try:
-                    self.app.raw_frame_queue.get_nowait()
-                    self.app.raw_frame_queue.put_nowait((frame.copy(), self.app.current_frame))
-                except queue.Empty:
-                    pass
+            self.playback_anchor = None
 
-            self.app.current_frame += 1
-            self.app.update_status_label()
+        # 解码在后台线程进行，这里只从预读缓冲区取帧并显示
+        try:
+            item = self.app.frame_reader.read()
+        except queue.Empty:
+            self.app.root.after(5, self.play_video)
+            return
 
-            if self.app.current_frame < self.app.total_frames:
-                self.app.root.after(int(1000 / self.app.fps), self.play_video)
-            else:
-                self.app.playing = False
-                self.app.cap_1.release()
-                print("视频播放完毕。")
-        else:
+        if item is None:
             self.app.playing = False
-            self.app.cap_1.release()
+            self.app.frame_reader.stop()
+            self.app.frame_reader = None
+            cache = self.app.processing_ops.detection_cache
+            if cache is not None:
+                cache.mark_end(self.app.current_frame)
             print("视频播放完毕。")
+            return
+
+        slot, frame_num = item
+        self.app.display_frame(slot.frame, self.app.canvas_original)
+        self.push_raw_frame(slot, frame_num)
+
+        self.app.current_frame = frame_num + 1
+        self.app.update_status_label()
+
+        # 按绝对时间表排程下一帧，避免 after() 的抖动和界面耗时逐帧累积；落后过多时重新对齐
+        now = time.perf_counter()
+        if self.playback_anchor is None:
+            self.playback_anchor = (now, self.app.current_frame)
+        anchor_time, anchor_frame = self.playback_anchor
+        target_time = anchor_time + (self.app.current_frame - anchor_frame) / self.app.fps
+        if now - target_time > 0.5:
+            self.playback_anchor = (now, self.app.current_frame)
+            target_time = now
+        self.app.root.after(max(1, int((target_time - now) * 1000)), self.play_video)
 
     def toggle_virtual_camera(self):
         # ... (Copy from original file's toggle_virtual_camera method)
@@ -230,7 +237,6 @@ class VideoOperations:
                     return
     
                 self.app.current_vehicle_id = 0
-                self.app.counted_vehicle_ids = set()
                 self.app.virtual_cam_playing = True
                 self.app.video_menu.entryconfig(1, label="停止摄像头")
                 self.app.button_connect_camera.config(text="停止摄像头")
@@ -238,12 +244,16 @@ class VideoOperations:
                 print("摄像头已连接。")
     
                 with self.app.stats_lock:
-                    self.app.prev_info = {}
-                    self.app.speed_history = {}
-                    self.app.trajectory_history = {}
+                    self.app.track_store.clear()
+                    self.app.processing_ops.open_track_log(self.app.processing_ops.session_log_dir("camera"))
+                    self.app.processing_ops.reset_motion()
+                    self.app.processing_ops.configure_source(None, (720, 1280, 3))
     
+                release_queue(self.app.raw_frame_queue)
+                release_queue(self.app.processed_frame_queue)
                 self.app.raw_frame_queue = queue.Queue(maxsize=50)
                 self.app.processed_frame_queue = queue.Queue(maxsize=50)
+                self.create_frame_pool((720, 1280, 3), prefetch=False)
     
                 self.app.virtual_cam_thread = threading.Thread(target=self.play_virtual_camera, daemon=True)
                 self.app.virtual_cam_thread.start()
@@ -264,25 +274,34 @@ class VideoOperations:
 
     def play_virtual_camera(self):
         # ... (Copy from original file's play_virtual_camera method)
+        capture_buffer = None
         while self.app.virtual_cam_playing and self.app.virtual_cam_cap.isOpened():
-            ret, frame = self.app.virtual_cam_cap.read()
+            start = time.perf_counter()
+            ret, capture_buffer = self.app.virtual_cam_cap.read(capture_buffer)
+            # 摄像头帧以采集时刻计时，与摄像头实际帧率、处理速度和丢帧无关
+            captured_at = time.monotonic()
+            if ret:
+                self.app.perf_monitor.record('decode', time.perf_counter() - start)
             if not ret:
                 continue
 
-            frame = cv2.resize(frame, (1280, 720))
+            # 帧池耗尽说明下游来不及处理，直接丢弃本帧
+            try:
+                slot = self.app.frame_pool.acquire(timeout=0)
+            except queue.Empty:
+                self.app.perf_monitor.drop("帧池耗尽")
+                time.sleep(1 / 60)
+                continue
+            self.app.frame_pool.store(slot, capture_buffer)
+            slot.timestamp = captured_at
 
-            self.app.display_frame(frame, self.app.canvas_original)
+            self.app.display_frame(slot.frame, self.app.canvas_original)
             try:
                 with self.app.frame_lock:
                     self.app.current_frame += 1
                     frame_num = self.app.current_frame
 
-                if self.app.raw_frame_queue.full():
-                    try:
-                        self.app.raw_frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                self.app.raw_frame_queue.put_nowait((frame.copy(), frame_num))
+                self.push_raw_frame(slot, frame_num)
             except Exception as e:
                 print(f"帧队列操作错误: {e}")
 
@@ -292,4 +311,33 @@ class VideoOperations:
             self.app.virtual_cam_cap.release()
         self.app.virtual_cam_playing = False
         self.app.button_connect_camera.config(text="连接摄像头")
-        self.app.update_status_label() 
\ No newline at end of file
+        self.app.update_status_label()
+
+    def create_frame_pool(self, shape, prefetch=True):
+        self.app.frame_pool = FramePool(self.frame_pool_size(prefetch), shape)
+
+    def frame_pool_size(self, prefetch=True):
+        # 槽位数按实际同时在用的帧估计，而不是按两个帧队列的容量：预读缓冲区、正在处理与排队等待的各一批、
+        # 显示端（待转换、转换中与队列中）的几帧，再加采集端手中的一帧。下游跟不上时视频预读在 acquire() 处等待，
+        # 摄像头直接丢帧，不会让帧在队列中越积越多
+        batch_size = max(1, self.app.inference_batch_size) if prefetch else 1
+        num_slots = 2 * batch_size + DISPLAY_SLOTS + 2
+        if prefetch:
+            num_slots += self.app.prefetch_size
+        return num_slots
+
+    def push_raw_frame(self, slot, frame_num):
+        """把槽位交给处理线程；队列已满时丢弃最旧的一帧并归还其槽位。"""
+        slot.queued_at = time.perf_counter()
+        try:
+            self.app.raw_frame_queue.put_nowait((slot, frame_num))
+        except queue.Full:
+            self.app.perf_monitor.drop("处理队列已满")
+            try:
+                self.app.raw_frame_queue.get_nowait()[0].release()
+            except queue.Empty:
+                pass
+            try:
+                self.app.raw_frame_queue.put_nowait((slot, frame_num))
+            except queue.Full:
+                slot.release()